@@ -0,0 +1,97 @@
+"""Compare stdlib json with the shared JSON codec on nlp.extracted events.
+
+Usage: python scripts/benchmarks/bench_json_codec.py [--entities 100 1000 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "shared"))
+import json_codec  # noqa: E402
+
+
+def make_event(entity_count: int) -> dict:
+    entities = []
+    for i in range(entity_count):
+        start = i * 120
+        if i % 3 == 0:
+            entities.append(
+                {
+                    "type": "OBLIGATION",
+                    "text": "Covered institutions shall maintain capital of at "
+                    f"least {i % 50} percent within 30 days.",
+                    "start": start,
+                    "end": start + 90,
+                    "attrs": {},
+                }
+            )
+        elif i % 3 == 1:
+            entities.append(
+                {
+                    "type": "THRESHOLD",
+                    "text": f"{i % 50} percent",
+                    "start": start + 50,
+                    "end": start + 60,
+                    "attrs": {
+                        "value": float(i % 50),
+                        "unit": "percent",
+                        "unit_normalized": "percent",
+                    },
+                }
+            )
+        else:
+            entities.append(
+                {
+                    "type": "JURISDICTION",
+                    "text": "European Union",
+                    "start": start,
+                    "end": start + 14,
+                    "attrs": {"name": "EU"},
+                }
+            )
+    return {
+        "event_id": "5b8e3d0c-0f4e-4a55-9a55-0c1b7f0b9a10",
+        "document_id": "doc-benchmark",
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "source_url": "https://example.com/rule",
+        "entities": entities,
+    }
+
+
+def _per_call_us(stmt, number: int) -> float:
+    best = min(timeit.repeat(stmt, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, nargs="+", default=[100, 1_000, 10_000])
+    args = parser.parse_args()
+
+    print(f"codec backend: {json_codec.BACKEND}")
+    print(
+        f"{'entities':>9} {'size KiB':>9} {'json enc us':>12} {'codec enc us':>13}"
+        f" {'json dec us':>12} {'codec dec us':>13} {'saved/event us':>15}"
+    )
+    for count in args.entities:
+        event = make_event(count)
+        payload = json.dumps(event).encode("utf-8")
+        number = max(1, 20_000 // count)
+        std_enc = _per_call_us(lambda: json.dumps(event).encode("utf-8"), number)
+        fast_enc = _per_call_us(lambda: json_codec.dumps(event), number)
+        std_dec = _per_call_us(lambda: json.loads(payload.decode("utf-8")), number)
+        fast_dec = _per_call_us(lambda: json_codec.loads(payload), number)
+        saved = (std_enc + std_dec) - (fast_enc + fast_dec)
+        print(
+            f"{count:>9} {len(payload) / 1024:>9.1f} {std_enc:>12.1f} {fast_enc:>13.1f}"
+            f" {std_dec:>12.1f} {fast_dec:>13.1f} {saved:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
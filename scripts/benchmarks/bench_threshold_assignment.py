@@ -0,0 +1,117 @@
+"""Time threshold-to-obligation assignment in the graph upsert on large documents.
+
+Compares ``build_obligations`` (bisect over sorted threshold starts) with the
+previous all-pairs containment scan. The scan is quadratic, so it is timed on
+a sample of obligations and scaled to the full document.
+
+Usage: python scripts/benchmarks/bench_threshold_assignment.py [--entities 5000 50000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "services" / "graph"))
+from app.provisions import as_table, build_obligations  # noqa: E402
+
+
+def make_entities(entity_count: int, seed: int = 7) -> list[dict]:
+    """Obligations of varying length with thresholds inside, across and between them."""
+
+    rng = random.Random(seed)
+    entities: list[dict] = []
+    cursor = 0
+    while len(entities) < entity_count:
+        length = rng.randint(80, 600)
+        entities.append(
+            {
+                "type": "OBLIGATION",
+                "text": "x" * length,
+                "start": cursor,
+                "end": cursor + length,
+                "attrs": {"concept": rng.choice(["capital", "reporting", None])},
+            }
+        )
+        for _ in range(rng.randint(0, 3)):
+            start = cursor + rng.randint(0, length + 40)
+            entities.append(
+                {
+                    "type": "THRESHOLD",
+                    "text": "5 percent",
+                    "start": start,
+                    "end": start + 9,
+                    "attrs": {
+                        "value": 5.0,
+                        "unit": "percent",
+                        "unit_normalized": "percent",
+                    },
+                }
+            )
+        cursor += length + rng.randint(1, 50)
+    return entities[:entity_count]
+
+
+def scan_assignment(table, obligation_rows) -> list[list[int]]:
+    """The previous O(obligations x thresholds) scan, keeping every match."""
+
+    threshold_rows = table.view("THRESHOLD").rows
+    starts, ends = table.starts, table.ends
+    matches = []
+    for row in obligation_rows:
+        start, end = starts[row], ends[row]
+        matches.append(
+            [
+                t_row
+                for t_row in threshold_rows
+                if start <= starts[t_row] <= end and ends[t_row] <= end
+            ]
+        )
+    return matches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, nargs="+", default=[5_000, 50_000])
+    parser.add_argument(
+        "--scan-sample", type=int, default=500, help="Obligations timed for the scan"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'entities':>9} {'obligations':>12} {'thresholds':>11} {'linked':>7}"
+        f" {'sweep ms':>9} {'scan ms (est)':>14} {'speedup':>8}"
+    )
+    for count in args.entities:
+        table = as_table(make_entities(count))
+        obligation_rows = list(table.view("OBLIGATION").rows)
+
+        began = time.perf_counter()
+        obligations = build_obligations("doc-benchmark", table)
+        sweep_ms = (time.perf_counter() - began) * 1000
+
+        sample = obligation_rows[: args.scan_sample]
+        began = time.perf_counter()
+        expected = scan_assignment(table, sample)
+        scan_ms = (
+            (time.perf_counter() - began) * 1000 * len(obligation_rows) / len(sample)
+        )
+
+        for ob, rows in zip(obligations, expected):
+            pids = [f"doc-benchmark:{table.starts[r]}:{table.ends[r]}" for r in rows]
+            assert sorted(t["pid"] for t in ob["thresholds"]) == sorted(pids)
+
+        linked = sum(len(ob["thresholds"]) for ob in obligations)
+        print(
+            f"{count:>9} {len(obligation_rows):>12} {len(table.view('THRESHOLD')):>11}"
+            f" {linked:>7} {sweep_ms:>9.1f} {scan_ms:>14.1f}"
+            f" {scan_ms / sweep_ms:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
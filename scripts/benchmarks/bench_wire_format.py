@@ -0,0 +1,57 @@
+"""Bytes per nlp.extracted event for each wire format and compression codec.
+
+Usage: python scripts/benchmarks/bench_wire_format.py [--entities 100 1000 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "shared"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_json_codec import make_event  # noqa: E402
+from wire_format import JSON, MSGPACK_V1, encode_event  # noqa: E402
+
+
+def _compressors() -> dict:
+    codecs = {"none": lambda data: data, "gzip": gzip.compress}
+    try:
+        import lz4.frame
+
+        codecs["lz4"] = lz4.frame.compress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+
+        codecs["zstd"] = zstandard.ZstdCompressor().compress
+    except ImportError:
+        pass
+    return codecs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, nargs="+", default=[100, 1_000, 10_000])
+    args = parser.parse_args()
+
+    codecs = _compressors()
+    print(
+        f"{'entities':>9} {'format':>11}"
+        + "".join(f" {c + ' KiB':>10}" for c in codecs)
+    )
+    for count in args.entities:
+        event = make_event(count)
+        for fmt in (JSON, MSGPACK_V1):
+            value, _ = encode_event(event, fmt)
+            sizes = "".join(
+                f" {len(compress(value)) / 1024:>10.1f}" for compress in codecs.values()
+            )
+            print(f"{count:>9} {fmt:>11}{sizes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,18 @@
 from __future__ import annotations
 
 import logging
+import sys
+from pathlib import Path
 
 import structlog
 from app.config import get_settings
 from app.routes import router
 from fastapi import FastAPI
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "shared"))
+from json_codec import FastJSONResponse
+
 
 def _configure_logging(level: str) -> None:
     structlog.configure(
@@ -33,5 +39,6 @@ app = FastAPI(
     title="RegEngine Admin API",
     version="0.2.0",
     description="API key management and administration",
+    default_response_class=FastJSONResponse,
 )
 app.include_router(router)
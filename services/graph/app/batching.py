@@ -0,0 +1,81 @@
+"""Accumulate consumed records into multi-document graph transactions."""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from kafka import TopicPartition
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from retry_ladder import next_offsets
+
+
+class UpsertBatch:
+    """Records consumed since the last graph commit, in consumption order.
+
+    Records that still need a graph write carry their upsert parameters;
+    records that were already skipped or routed to a retry topic carry
+    ``None`` and only contribute their offset. Offsets are committed once the
+    batch's transaction has committed.
+    """
+
+    def __init__(self, max_docs: int, window_s: float) -> None:
+        self.max_docs = max_docs
+        self.window_s = window_s
+        self.entries: List[Tuple[object, Optional[dict]]] = []
+        self._doc_count = 0
+        self._started_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, record, params: Optional[dict] = None) -> None:
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+        self.entries.append((record, params))
+        if params is not None:
+            self._doc_count += 1
+
+    @property
+    def docs(self) -> List[Tuple[object, dict]]:
+        return [
+            (record, params) for record, params in self.entries if params is not None
+        ]
+
+    def capacity(self) -> int:
+        """Records the next poll may return without overfilling the batch."""
+
+        return max(1, self.max_docs - self._doc_count)
+
+    def remaining_s(self) -> float:
+        """Seconds until the batch window closes; zero for an empty batch."""
+
+        if self._started_at is None:
+            return 0.0
+        return max(0.0, self._started_at + self.window_s - time.monotonic())
+
+    def due(self) -> bool:
+        if not self.entries:
+            return False
+        return self._doc_count >= self.max_docs or self.remaining_s() == 0.0
+
+    def offsets(self, failed: Optional[Dict[TopicPartition, int]] = None) -> dict:
+        """Offsets to commit, stopping each partition before its failed offset."""
+
+        failed = failed or {}
+        offsets: dict = {}
+        for record, _ in self.entries:
+            tp = TopicPartition(record.topic, record.partition)
+            if tp in failed and record.offset >= failed[tp]:
+                continue
+            offsets.update(next_offsets(record))
+        return offsets
+
+    def clear(self) -> None:
+        self.entries = []
+        self._doc_count = 0
+        self._started_at = None
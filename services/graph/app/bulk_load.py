@@ -0,0 +1,411 @@
+"""Rebuild the regulatory graph in bulk from extracted documents.
+
+Examples::
+
+    # Offline: write neo4j-admin import CSVs from the NLP state in S3
+    python -m app.bulk_load --source s3 --csv-dir /data/import
+
+    # Online: replay nlp.extracted (both lanes) into a running database
+    python -m app.bulk_load --source kafka --online --batch-size 5000
+
+Events are read from the ``nlp.extracted`` topics (claim-checked payloads are
+fetched from S3) or from the per-document NLP state objects under
+``NLP_STATE_PREFIX``. Only the latest version of each document is kept, and
+nodes and relationships are deduplicated in memory before anything is
+written. ``--csv-dir`` writes one CSV per node label and relationship type in
+the layout ``neo4j-admin database import full`` expects, plus an
+``import.sh`` with the matching command; ``--online`` loads the same rows
+through batched ``UNWIND`` statements instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import structlog
+from kafka import KafkaConsumer, TopicPartition
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from claim_check import is_pointer, ref_uri, resolve_event
+from graph_migrations import migrate, run_step
+from json_codec import loads
+from lanes import LANES, lane_topic
+from wire_format import decode_event
+
+from .config import settings
+from .migrations import COMPARISON_BACKFILL, MIGRATIONS, SCOPE, VERSION_BACKFILL
+from .neo4j_utils import document_params, driver
+from .s3_utils import get_bytes, iter_keys, split_s3_uri
+
+logger = structlog.get_logger("graph-bulk-load")
+
+Key = Tuple[object, ...]
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    """A node label, its merge key and its properties with import types."""
+
+    label: str
+    key: Tuple[str, ...]
+    fields: Tuple[Tuple[str, str], ...]
+
+
+@dataclass(frozen=True)
+class RelSpec:
+    type: str
+    start: str
+    end: str
+
+
+NODES = {
+    spec.label: spec
+    for spec in (
+        NodeSpec(
+            "Document",
+            ("id",),
+            (("id", "string"), ("source_url", "string"), ("created_at", "long")),
+        ),
+        NodeSpec("Jurisdiction", ("name",), (("name", "string"),)),
+        NodeSpec("Concept", ("name",), (("name", "string"),)),
+        NodeSpec(
+            "Provision",
+            ("pid",),
+            (
+                ("pid", "string"),
+                ("text", "string"),
+                ("hash", "string"),
+                ("tx_from", "long"),
+                ("valid_from", "long"),
+                ("updated_at", "long"),
+                ("start", "long"),
+                ("end", "long"),
+                ("page", "long"),
+            ),
+        ),
+        NodeSpec(
+            "Threshold",
+            ("pid",),
+            (
+                ("pid", "string"),
+                ("value", "double"),
+                ("unit", "string"),
+                ("unit_normalized", "string"),
+            ),
+        ),
+    )
+}
+
+RELATIONSHIPS = {
+    spec.type: spec
+    for spec in (
+        RelSpec("MENTIONS", "Document", "Jurisdiction"),
+        RelSpec("IN_DOCUMENT", "Provision", "Document"),
+        RelSpec("ABOUT", "Provision", "Concept"),
+        RelSpec("APPLIES_TO", "Provision", "Jurisdiction"),
+        RelSpec("HAS_THRESHOLD", "Provision", "Threshold"),
+    )
+}
+
+
+class GraphSnapshot:
+    """Deduplicated nodes and relationships for a set of documents.
+
+    Mirrors what :data:`~app.neo4j_utils.CYPHER_UPSERT` writes for each
+    document, keyed the same way the upsert merges.
+    """
+
+    def __init__(self, loaded_at: Optional[int] = None) -> None:
+        self.loaded_at = loaded_at or int(time.time() * 1000)
+        self.nodes: Dict[str, Dict[Key, dict]] = {label: {} for label in NODES}
+        self.relationships: Dict[str, Set[Tuple[Key, Key]]] = {
+            rel: set() for rel in RELATIONSHIPS
+        }
+
+    def _node(self, label: str, props: dict) -> Key:
+        key = tuple(props[field] for field in NODES[label].key)
+        self.nodes[label].setdefault(key, props)
+        return key
+
+    def _link(self, rel: str, start: Key, end: Key) -> None:
+        self.relationships[rel].add((start, end))
+
+    def add_document(self, params: dict) -> None:
+        """Add one document in :func:`~app.neo4j_utils.document_params` form."""
+
+        now = self.loaded_at
+        doc_id = params["doc_id"]
+        doc = self._node(
+            "Document",
+            {"id": doc_id, "source_url": params["source_url"], "created_at": now},
+        )
+        jurisdictions = [
+            self._node("Jurisdiction", {"name": name})
+            for name in params["jurisdictions"]
+        ]
+        for jurisdiction in jurisdictions:
+            self._link("MENTIONS", doc, jurisdiction)
+        for ob in params["obligations"]:
+            provision = self._node(
+                "Provision",
+                {
+                    "pid": ob["pid"],
+                    "text": ob["text"],
+                    "hash": ob["hash"],
+                    "tx_from": now,
+                    "valid_from": now,
+                    "updated_at": now,
+                    "start": ob["start"],
+                    "end": ob["end"],
+                    "page": ob["page"],
+                },
+            )
+            concept = self._node("Concept", {"name": ob["concept"] or "unspecified"})
+            self._link("IN_DOCUMENT", provision, doc)
+            self._link("ABOUT", provision, concept)
+            for jurisdiction in jurisdictions:
+                self._link("APPLIES_TO", provision, jurisdiction)
+            for threshold in ob["thresholds"]:
+                self._link(
+                    "HAS_THRESHOLD", provision, self._node("Threshold", threshold)
+                )
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            **{label: len(nodes) for label, nodes in self.nodes.items()},
+            **{rel: len(pairs) for rel, pairs in self.relationships.items()},
+        }
+
+
+def _import_id(key: Key) -> str:
+    return ":".join(str(part) for part in key)
+
+
+def _cell(value) -> object:
+    return "" if value is None else value
+
+
+def write_csv(snapshot: GraphSnapshot, out_dir: Path) -> List[str]:
+    """Write import CSVs and ``import.sh``; return the neo4j-admin arguments."""
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    args = []
+    for label, spec in NODES.items():
+        path = out_dir / f"nodes_{label}.csv"
+        with path.open("w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(
+                [f":ID({label})"] + [f"{name}:{kind}" for name, kind in spec.fields]
+            )
+            for key, props in snapshot.nodes[label].items():
+                writer.writerow(
+                    [_import_id(key)]
+                    + [_cell(props.get(name)) for name, _ in spec.fields]
+                )
+        args.append(f"--nodes={label}={path.name}")
+    for rel, spec in RELATIONSHIPS.items():
+        path = out_dir / f"rels_{rel}.csv"
+        with path.open("w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow([f":START_ID({spec.start})", f":END_ID({spec.end})"])
+            for start, end in snapshot.relationships[rel]:
+                writer.writerow([_import_id(start), _import_id(end)])
+        args.append(f"--relationships={rel}={path.name}")
+
+    script = out_dir / "import.sh"
+    script.write_text(
+        "#!/bin/sh\n"
+        "# Run from this directory against a stopped, empty database.\n"
+        'cd "$(dirname "$0")"\n'
+        "exec neo4j-admin database import full --overwrite-destination=true \\\n  "
+        + " \\\n  ".join(args)
+        + ' \\\n  "${NEO4J_DATABASE:-neo4j}"\n',
+        encoding="utf-8",
+    )
+    script.chmod(0o755)
+    return args
+
+
+def _chunks(rows: Sequence, size: int) -> Iterator[Sequence]:
+    for offset in range(0, len(rows), size):
+        yield rows[offset : offset + size]
+
+
+def _match(label: str, var: str, param: str) -> str:
+    fields = ", ".join(
+        f"{name}: {param}[{i}]" for i, name in enumerate(NODES[label].key)
+    )
+    return f"({var}:{label} {{{fields}}})"
+
+
+def load_online(snapshot: GraphSnapshot, batch_size: int) -> None:
+    """Merge the snapshot into a running database with batched UNWINDs."""
+
+    with driver().session() as session:
+        migrate(session, SCOPE, MIGRATIONS)
+        for label, spec in NODES.items():
+            statement = (
+                f"UNWIND $rows AS row MERGE {_match(label, 'n', 'row.key')} "
+                "SET n += row.props"
+            )
+            rows = [
+                {"key": list(key), "props": props}
+                for key, props in snapshot.nodes[label].items()
+            ]
+            for chunk in _chunks(rows, batch_size):
+                session.execute_write(
+                    lambda tx, chunk=chunk: tx.run(statement, rows=chunk).consume()
+                )
+            logger.info("bulk_load_nodes", label=label, count=len(rows))
+        for rel, spec in RELATIONSHIPS.items():
+            statement = (
+                f"UNWIND $rows AS row MATCH {_match(spec.start, 'a', 'row.start')} "
+                f"MATCH {_match(spec.end, 'b', 'row.end')} MERGE (a)-[:{rel}]->(b)"
+            )
+            rows = [
+                {"start": list(start), "end": list(end)}
+                for start, end in snapshot.relationships[rel]
+            ]
+            for chunk in _chunks(rows, batch_size):
+                session.execute_write(
+                    lambda tx, chunk=chunk: tx.run(statement, rows=chunk).consume()
+                )
+            logger.info("bulk_load_relationships", type=rel, count=len(rows))
+        for step in (*COMPARISON_BACKFILL, *VERSION_BACKFILL):
+            run_step(session, step, batch_size)
+
+
+def iter_kafka_events(
+    bootstrap_servers: str, topics: Iterable[str], idle_timeout_ms: int
+) -> Iterator[dict]:
+    """Read every committed event from the start of ``topics`` to their end."""
+
+    consumer = KafkaConsumer(
+        bootstrap_servers=bootstrap_servers,
+        enable_auto_commit=False,
+        isolation_level="read_committed",
+        consumer_timeout_ms=idle_timeout_ms,
+    )
+    try:
+        partitions = [
+            TopicPartition(topic, partition)
+            for topic in topics
+            for partition in consumer.partitions_for_topic(topic) or ()
+        ]
+        consumer.assign(partitions)
+        consumer.seek_to_beginning(*partitions)
+        end_offsets = consumer.end_offsets(partitions)
+        pending = {tp for tp, end in end_offsets.items() if end > 0}
+        for record in consumer:
+            tp = TopicPartition(record.topic, record.partition)
+            try:
+                yield decode_event(record.value, record.headers)
+            except ValueError as exc:
+                logger.warning(
+                    "bulk_load_undecodable", topic=record.topic, error=str(exc)
+                )
+            if record.offset + 1 >= end_offsets[tp]:
+                pending.discard(tp)
+            if not pending:
+                break
+    finally:
+        consumer.close()
+
+
+def iter_state_events(bucket: str, prefix: str, workers: int) -> Iterator[dict]:
+    """Read the latest NLP state object of every document."""
+
+    keys = iter_keys(bucket, f"{prefix.rstrip('/')}/by-document-id/")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for body in pool.map(lambda key: get_bytes(bucket, key), keys):
+            yield loads(body)
+
+
+def latest_documents(events: Iterable[dict]) -> Dict[str, dict]:
+    """Keep the newest event per document, by event timestamp then read order."""
+
+    latest: Dict[str, dict] = {}
+    for evt in events:
+        doc_id = evt.get("document_id")
+        if not doc_id:
+            continue
+        current = latest.get(doc_id)
+        if current is None or (evt.get("timestamp") or "") >= (
+            current.get("timestamp") or ""
+        ):
+            latest[doc_id] = evt
+    return latest
+
+
+def build_snapshot(events: Iterable[dict]) -> GraphSnapshot:
+    snapshot = GraphSnapshot()
+    for evt in latest_documents(events).values():
+        if is_pointer(evt):
+            evt = resolve_event(evt, get_bytes(*split_s3_uri(ref_uri(evt))))
+        snapshot.add_document(
+            document_params(
+                evt["document_id"], evt.get("source_url"), evt.get("entities", [])
+            )
+        )
+    return snapshot
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=("kafka", "s3"), required=True)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--csv-dir", type=Path, help="Write neo4j-admin import CSVs")
+    target.add_argument(
+        "--online", action="store_true", help="Load into the running database"
+    )
+    parser.add_argument(
+        "--topics",
+        nargs="+",
+        default=[lane_topic(settings.topic_in, lane) for lane in LANES],
+    )
+    parser.add_argument("--bootstrap-servers", default=settings.kafka_bootstrap)
+    parser.add_argument("--idle-timeout-ms", type=int, default=10_000)
+    parser.add_argument("--bucket", default=settings.processed_bucket)
+    parser.add_argument("--prefix", default=settings.nlp_state_prefix)
+    parser.add_argument("--s3-workers", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    began = time.perf_counter()
+    if args.source == "kafka":
+        events = iter_kafka_events(
+            args.bootstrap_servers, args.topics, args.idle_timeout_ms
+        )
+    else:
+        events = iter_state_events(args.bucket, args.prefix, args.s3_workers)
+    snapshot = build_snapshot(events)
+    print(f"read {len(snapshot.nodes['Document'])} document(s)")
+    for name, count in snapshot.counts().items():
+        print(f"  {name:<14} {count:>10}")
+
+    if args.online:
+        load_online(snapshot, args.batch_size)
+        print(f"loaded online in {time.perf_counter() - began:.1f}s")
+    else:
+        write_csv(snapshot, args.csv_dir)
+        print(
+            f"wrote CSVs to {args.csv_dir} in {time.perf_counter() - began:.1f}s; "
+            f"run {args.csv_dir / 'import.sh'} with Neo4j stopped, then "
+            "`python -m app.migrations apply` to build the comparison index"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""Garbage collection of provisions from superseded document versions.
+
+Provision pids are offset based, so a re-extracted document closes the
+provisions whose text moved (``valid_to`` is set by the upsert) and merges
+new ones. Closed provisions older than the retention window, and thresholds
+that no provision links to any more, are removed here in bounded batches:
+each batch is its own write transaction, so the consumer's upserts are
+never blocked for long.
+
+Usage::
+
+    python -m app.compaction --dry-run          # report what would be removed
+    python -m app.compaction --retention-hours 24 --archive
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import structlog
+from prometheus_client import Counter, Histogram
+
+from .config import settings
+from .neo4j_utils import driver
+
+logger = structlog.get_logger("graph-compaction")
+
+COMPACTED_NODES = Counter(
+    "graph_compaction_nodes_total",
+    "Stale nodes removed by graph compaction",
+    ["kind", "action"],
+)
+COMPACTION_BATCH_SECONDS = Histogram(
+    "graph_compaction_batch_seconds", "Duration of one compaction batch transaction"
+)
+
+# Thresholds still linked from a provision outside the batch are kept; a
+# later batch or the orphan sweep removes them once they are unreferenced.
+CYPHER_DELETE_STALE = """
+MATCH (p:Provision)
+WHERE p.valid_to < $cutoff
+WITH p LIMIT $batch_size
+WITH collect(p) AS stale
+CALL {
+  WITH stale
+  UNWIND stale AS p
+  MATCH (p)-[:HAS_THRESHOLD]->(t:Threshold)
+  WHERE NOT EXISTS {
+    MATCH (other)-[:HAS_THRESHOLD]->(t) WHERE NOT other IN stale
+  }
+  WITH DISTINCT t
+  DETACH DELETE t
+  RETURN count(t) AS thresholds
+}
+FOREACH (p IN stale | DETACH DELETE p)
+RETURN size(stale) AS provisions, thresholds
+"""
+
+# Archived provisions keep their text, hash, offsets, validity and document
+# link for audit, but drop out of every (:Provision) traversal.
+CYPHER_ARCHIVE_STALE = """
+MATCH (p:Provision)
+WHERE p.valid_to < $cutoff
+WITH p LIMIT $batch_size
+OPTIONAL MATCH (p)-[r:ABOUT|APPLIES_TO]->()
+DELETE r
+WITH DISTINCT p
+REMOVE p:Provision
+SET p:ArchivedProvision, p.archived_at = timestamp()
+RETURN count(p) AS provisions, 0 AS thresholds
+"""
+
+# Thresholds detached by the upsert when a provision's thresholds change.
+CYPHER_DELETE_ORPHAN_THRESHOLDS = """
+MATCH (t:Threshold)
+WHERE NOT EXISTS { ()-[:HAS_THRESHOLD]->(t) }
+WITH t LIMIT $batch_size
+DETACH DELETE t
+RETURN count(t) AS n
+"""
+
+CYPHER_REPORT_STALE = """
+MATCH (p:Provision)
+WHERE p.valid_to < $cutoff
+RETURN count(p) AS provisions, min(p.valid_to) AS oldest
+"""
+
+CYPHER_REPORT_THRESHOLDS = """
+OPTIONAL MATCH (p:Provision)-[:HAS_THRESHOLD]->(t:Threshold)
+WHERE p.valid_to < $cutoff
+  AND NOT EXISTS {
+    MATCH (other)-[:HAS_THRESHOLD]->(t)
+    WHERE NOT (other:Provision AND other.valid_to < $cutoff)
+  }
+WITH count(DISTINCT t) AS with_stale
+OPTIONAL MATCH (orphan:Threshold)
+WHERE NOT EXISTS { ()-[:HAS_THRESHOLD]->(orphan) }
+RETURN with_stale, count(orphan) AS orphans
+"""
+
+
+@dataclass
+class CompactionReport:
+    """What a compaction run with the same cutoff would remove."""
+
+    cutoff: int
+    stale_provisions: int
+    oldest_valid_to: Optional[int]
+    thresholds_with_stale: int
+    orphan_thresholds: int
+
+
+@dataclass
+class CompactionResult:
+    provisions: int = 0
+    thresholds: int = 0
+    batches: int = 0
+
+
+def cutoff_ms(retention_s: float, now: Optional[float] = None) -> int:
+    """``valid_to`` timestamp (Neo4j milliseconds) before which provisions are stale."""
+
+    now = time.time() if now is None else now
+    return int((now - retention_s) * 1000)
+
+
+def report(session, cutoff: int) -> CompactionReport:
+    stale = session.run(CYPHER_REPORT_STALE, cutoff=cutoff).single()
+    thresholds = session.run(CYPHER_REPORT_THRESHOLDS, cutoff=cutoff).single()
+    return CompactionReport(
+        cutoff=cutoff,
+        stale_provisions=stale["provisions"],
+        oldest_valid_to=stale["oldest"],
+        thresholds_with_stale=thresholds["with_stale"],
+        orphan_thresholds=thresholds["orphans"],
+    )
+
+
+def _batch(session, statement: str, **params):
+    # Readers already dropped these provisions when the version stamped on
+    # their closing reached them, so deleting them needs no reset.
+    def work(tx):
+        return tx.run(statement, **params).single()
+
+    with COMPACTION_BATCH_SECONDS.time():
+        return session.execute_write(work)
+
+
+def compact(
+    session,
+    cutoff: int,
+    batch_size: int,
+    archive: bool = False,
+    max_batches: Optional[int] = None,
+    pause_s: float = 0.0,
+    stop: Optional[threading.Event] = None,
+) -> CompactionResult:
+    """Remove or archive stale provisions, then orphaned thresholds.
+
+    Runs batches until nothing is left, ``max_batches`` is reached or
+    ``stop`` is set, sleeping ``pause_s`` between batches.
+    """
+
+    stop = stop or threading.Event()
+    result = CompactionResult()
+    action = "archived" if archive else "deleted"
+    statement = CYPHER_ARCHIVE_STALE if archive else CYPHER_DELETE_STALE
+
+    def more() -> bool:
+        if result.batches and pause_s:
+            stop.wait(pause_s)
+        if stop.is_set():
+            return False
+        return max_batches is None or result.batches < max_batches
+
+    while more():
+        row = _batch(session, statement, cutoff=cutoff, batch_size=batch_size)
+        result.batches += 1
+        result.provisions += row["provisions"]
+        result.thresholds += row["thresholds"]
+        COMPACTED_NODES.labels(kind="provision", action=action).inc(row["provisions"])
+        COMPACTED_NODES.labels(kind="threshold", action="deleted").inc(
+            row["thresholds"]
+        )
+        if row["provisions"] < batch_size:
+            break
+
+    while more():
+        row = _batch(session, CYPHER_DELETE_ORPHAN_THRESHOLDS, batch_size=batch_size)
+        result.batches += 1
+        result.thresholds += row["n"]
+        COMPACTED_NODES.labels(kind="threshold", action="deleted").inc(row["n"])
+        if row["n"] < batch_size:
+            break
+
+    logger.info(
+        "graph_compaction_done",
+        cutoff=cutoff,
+        action=action,
+        provisions=result.provisions,
+        thresholds=result.thresholds,
+        batches=result.batches,
+    )
+    return result
+
+
+class CompactionJob:
+    """Runs :func:`compact` every ``interval_s`` seconds on a daemon thread."""
+
+    def __init__(
+        self,
+        interval_s: float,
+        retention_s: float,
+        batch_size: int,
+        archive: bool = False,
+        pause_s: float = 0.0,
+    ) -> None:
+        self.interval_s = interval_s
+        self.retention_s = retention_s
+        self.batch_size = batch_size
+        self.archive = archive
+        self.pause_s = pause_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> CompactionResult:
+        with driver().session() as session:
+            return compact(
+                session,
+                cutoff_ms(self.retention_s),
+                self.batch_size,
+                archive=self.archive,
+                pause_s=self.pause_s,
+                stop=self._stop,
+            )
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.run_once()
+            except Exception:  # pragma: no cover - requires infra
+                logger.exception("graph_compaction_failed")
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="graph-compaction", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_s)
+
+
+def job_from_settings() -> Optional[CompactionJob]:
+    if settings.compaction_interval_s <= 0:
+        return None
+    return CompactionJob(
+        interval_s=settings.compaction_interval_s,
+        retention_s=settings.compaction_retention_s,
+        batch_size=settings.compaction_batch_size,
+        archive=settings.compaction_archive,
+        pause_s=settings.compaction_pause_ms / 1000,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact stale graph provisions")
+    parser.add_argument(
+        "--retention-hours",
+        type=float,
+        default=settings.compaction_retention_s / 3600,
+        help="Keep closed provisions for this long",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.compaction_batch_size
+    )
+    parser.add_argument("--max-batches", type=int, default=None)
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        default=settings.compaction_archive,
+        help="Relabel stale provisions as ArchivedProvision instead of deleting",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only report what would be removed"
+    )
+    args = parser.parse_args(argv)
+
+    cutoff = cutoff_ms(args.retention_hours * 3600)
+    with driver().session() as session:
+        if args.dry_run:
+            found = report(session, cutoff)
+            print(f"cutoff (valid_to before): {found.cutoff}")
+            print(f"stale provisions:         {found.stale_provisions}")
+            print(f"oldest valid_to:          {found.oldest_valid_to}")
+            print(f"thresholds with them:     {found.thresholds_with_stale}")
+            print(f"orphan thresholds:        {found.orphan_thresholds}")
+            return 0
+        result = compact(
+            session,
+            cutoff,
+            args.batch_size,
+            archive=args.archive,
+            max_batches=args.max_batches,
+        )
+    print(
+        f"{'archived' if args.archive else 'deleted'} {result.provisions} provision(s),"
+        f" deleted {result.thresholds} threshold(s) in {result.batches} batch(es)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,10 +13,50 @@ class Settings(BaseSettings):
         default="redpanda:9092", alias="KAFKA_BOOTSTRAP_SERVERS"
     )
     topic_in: str = Field(default="nlp.extracted", alias="KAFKA_TOPIC_NLP")
+    graph_backend: str = Field(default="neo4j", alias="GRAPH_BACKEND")
+    sqlite_path: str = Field(default="graph.sqlite3", alias="GRAPH_SQLITE_PATH")
     neo4j_uri: str = Field(default="bolt://neo4j:7687", alias="NEO4J_URI")
     neo4j_user: str = Field(default="neo4j", alias="NEO4J_USER")
     neo4j_password: str = Field(..., alias="NEO4J_PASSWORD")
+    aws_endpoint_url: str | None = Field(default=None, alias="AWS_ENDPOINT_URL")
+    processed_bucket: str = Field(
+        default="reg-engine-processed-data-dev", alias="PROCESSED_DATA_BUCKET"
+    )
+    nlp_state_prefix: str = Field(default="nlp/state", alias="NLP_STATE_PREFIX")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    consumer_mode: str = Field(default="thread", alias="CONSUMER_MODE")
+    consumer_workers: int = Field(default=1, ge=1, alias="CONSUMER_WORKERS")
+    bulk_consumer_workers: int = Field(default=1, ge=0, alias="BULK_CONSUMER_WORKERS")
+    upsert_batch_size: int = Field(default=100, ge=1, alias="GRAPH_UPSERT_BATCH_SIZE")
+    upsert_batch_window_ms: int = Field(
+        default=1_000, ge=0, alias="GRAPH_UPSERT_BATCH_WINDOW_MS"
+    )
+    compaction_interval_s: int = Field(
+        default=3_600, ge=0, alias="GRAPH_COMPACTION_INTERVAL_S"
+    )
+    compaction_retention_s: int = Field(
+        default=7 * 24 * 3_600, ge=0, alias="GRAPH_COMPACTION_RETENTION_S"
+    )
+    compaction_batch_size: int = Field(
+        default=1_000, ge=1, alias="GRAPH_COMPACTION_BATCH_SIZE"
+    )
+    compaction_pause_ms: int = Field(
+        default=100, ge=0, alias="GRAPH_COMPACTION_PAUSE_MS"
+    )
+    compaction_archive: bool = Field(default=False, alias="GRAPH_COMPACTION_ARCHIVE")
+    unavailable_backoff_ms: int = Field(
+        default=5_000, ge=0, alias="GRAPH_UNAVAILABLE_BACKOFF_MS"
+    )
+    retry_delays_ms: str = Field(default="5000,60000,600000", alias="RETRY_DELAYS_MS")
+    claim_check_prefetch_workers: int = Field(
+        default=4, ge=1, alias="CLAIM_CHECK_PREFETCH_WORKERS"
+    )
+    schema_validation_sample_rate: int = Field(
+        default=100, ge=0, alias="SCHEMA_VALIDATION_SAMPLE_RATE"
+    )
+    schema_validation_warmup: int = Field(
+        default=1_000, ge=0, alias="SCHEMA_VALIDATION_WARMUP"
+    )
 
 
 @lru_cache(maxsize=1)
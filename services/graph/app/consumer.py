@@ -1,22 +1,40 @@
 from __future__ import annotations
 
-import json
+import sys
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
 
 import structlog
-from kafka import KafkaConsumer
+from kafka import KafkaConsumer, KafkaProducer, TopicPartition
 from kafka.admin import KafkaAdminClient, NewTopic
 from kafka.errors import TopicAlreadyExistsError
 from prometheus_client import Counter
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from claim_check import ClaimCheckError, is_pointer, ref_uri, resolve_event
+from lanes import STANDARD, lane_group, lane_topic
+from retry_ladder import DelayGate, RetryLadder, parse_delays
+from schema_validation import SchemaValidationError, sampled_validator
+from wire_format import decode_event
+
+from .batching import UpsertBatch
 from .config import settings
-from .neo4j_utils import driver, upsert_from_entities
+from .neo4j_utils import document_params
+from .s3_utils import get_bytes, split_s3_uri
+from .store import UNAVAILABLE_ERRORS, write_batch
 
 logger = structlog.get_logger("graph-consumer")
 
 MESSAGES_COUNTER = Counter(
     "graph_consumer_messages_total", "Graph consumer messages", ["status"]
 )
+COMMIT_FAILURES = Counter(
+    "graph_consumer_commit_failures_total", "Graph consumer offset commit failures"
+)
+
+GROUP_ID = "graph-service"
 
 _shutdown_event = threading.Event()
 
@@ -38,48 +56,243 @@ def _ensure_topic(topic: str) -> None:
                 pass
 
 
+def _decode(record) -> tuple[dict | None, Exception | None]:
+    try:
+        return decode_event(record.value, record.headers), None
+    except ValueError as exc:
+        logger.error("graph_undecodable_event", offset=record.offset, error=str(exc))
+        return None, exc
+
+
+def _prefetch_claims(
+    executor: ThreadPoolExecutor, events: list[dict | None]
+) -> dict[str, Future]:
+    """Start fetching claimed entity payloads for every pointer in the batch."""
+
+    futures: dict[str, Future] = {}
+    for evt in events:
+        if evt is None or not is_pointer(evt):
+            continue
+        uri = ref_uri(evt)
+        if uri and uri not in futures:
+            futures[uri] = executor.submit(get_bytes, *split_s3_uri(uri))
+    return futures
+
+
 def stop_consumer() -> None:
     _shutdown_event.set()
 
 
-def run_consumer() -> None:
-    _ensure_topic(settings.topic_in)
+def _resolve_claim(evt: dict, claims: dict[str, Future]) -> dict:
+    uri = ref_uri(evt)
+    if uri is None or uri not in claims:
+        raise ClaimCheckError("Pointer event without a claim-check URI")
+    return resolve_event(evt, claims[uri].result())
+
+
+def _params(evt: dict, claims: dict[str, Future], validator) -> dict:
+    if is_pointer(evt):
+        evt = _resolve_claim(evt, claims)
+    validator(evt)
+    return document_params(
+        evt["document_id"], evt.get("source_url"), evt.get("entities", [])
+    )
+
+
+def _route_failure(
+    producer: KafkaProducer,
+    ladder: RetryLadder,
+    record,
+    error: Exception,
+    permanent: bool,
+) -> bool:
+    """Move a failed record down the retry ladder; return whether it was routed."""
+
+    MESSAGES_COUNTER.labels(status="invalid" if permanent else "error").inc()
+    try:
+        ladder.route(producer, record, error, permanent=permanent)
+    except Exception as exc:  # pragma: no cover - requires infra
+        logger.exception(
+            "graph_retry_route_failed", offset=record.offset, error=str(exc)
+        )
+        return False
+    return True
+
+
+def _flush(
+    consumer: KafkaConsumer,
+    producer: KafkaProducer,
+    ladder: RetryLadder,
+    batch: UpsertBatch,
+) -> None:
+    """Write the batch in one transaction, then commit its offsets.
+
+    If the batch transaction fails, its documents are written one by one so a
+    single bad document is routed down the retry ladder instead of failing
+    the whole batch. If the store itself is unavailable, every partition is
+    rewound to its first unwritten document and the consumer backs off.
+    """
+
+    docs = batch.docs
+    failed: dict[TopicPartition, int] = {}
+    unavailable: Exception | None = None
+    if docs:
+        try:
+            write_batch([params for _, params in docs])
+        except UNAVAILABLE_ERRORS as exc:
+            unavailable = exc
+            for record, _ in docs:
+                failed.setdefault(
+                    TopicPartition(record.topic, record.partition), record.offset
+                )
+        except Exception as exc:
+            logger.warning("graph_batch_upsert_failed", size=len(docs), error=str(exc))
+            for record, params in docs:
+                tp = TopicPartition(record.topic, record.partition)
+                if tp in failed:
+                    continue
+                if unavailable is not None:
+                    failed[tp] = record.offset
+                    continue
+                try:
+                    write_batch([params])
+                except UNAVAILABLE_ERRORS as doc_exc:
+                    unavailable = doc_exc
+                    failed[tp] = record.offset
+                except Exception as doc_exc:
+                    logger.exception(
+                        "graph_upsert_err",
+                        doc_id=params["doc_id"],
+                        error=str(doc_exc),
+                    )
+                    if not _route_failure(producer, ladder, record, doc_exc, False):
+                        failed[tp] = record.offset
+                else:
+                    MESSAGES_COUNTER.labels(status="success").inc()
+        else:
+            MESSAGES_COUNTER.labels(status="success").inc(len(docs))
+            logger.info("graph_upsert_ok", documents=len(docs))
+    offsets = batch.offsets(failed)
+    if offsets:
+        try:
+            consumer.commit(offsets)
+        except Exception as exc:
+            # The upserts are idempotent; the records are redelivered to
+            # whichever consumer owns their partitions after a rebalance.
+            COMMIT_FAILURES.inc()
+            logger.warning(
+                "graph_commit_failed", partitions=len(offsets), error=str(exc)
+            )
+    for tp, offset in failed.items():
+        # Retry the record on the next poll rather than committing past it.
+        consumer.seek(tp, offset)
+    batch.clear()
+    if unavailable is not None:
+        logger.warning(
+            "graph_store_unavailable",
+            partitions=len(failed),
+            backoff_ms=settings.unavailable_backoff_ms,
+            error=str(unavailable),
+        )
+        _shutdown_event.wait(settings.unavailable_backoff_ms / 1000)
+
+
+def run_consumer(lane: str = STANDARD) -> None:
+    """Consume one priority lane until :func:`stop_consumer` is called."""
+
+    ladder = RetryLadder(
+        lane_topic(settings.topic_in, lane), parse_delays(settings.retry_delays_ms)
+    )
+    for topic in [ladder.topic, *ladder.topics]:
+        _ensure_topic(topic)
     consumer = KafkaConsumer(
-        settings.topic_in,
+        *ladder.source_topics,
         bootstrap_servers=settings.kafka_bootstrap,
-        value_deserializer=lambda v: json.loads(v.decode("utf-8")),
         enable_auto_commit=False,
         auto_offset_reset="earliest",
-        group_id="graph-service",
+        group_id=lane_group(GROUP_ID, lane),
+        isolation_level="read_committed",
     )
+    producer = KafkaProducer(
+        bootstrap_servers=settings.kafka_bootstrap,
+        linger_ms=50,
+        retries=5,
+        acks="all",
+    )
+    validator = sampled_validator(
+        "nlp.extracted",
+        sample_rate=settings.schema_validation_sample_rate,
+        warmup=settings.schema_validation_warmup,
+    )
+    prefetcher = ThreadPoolExecutor(
+        max_workers=settings.claim_check_prefetch_workers,
+        thread_name_prefix="claim-prefetch",
+    )
+    batch = UpsertBatch(
+        settings.upsert_batch_size, settings.upsert_batch_window_ms / 1000
+    )
+    gate = DelayGate()
     while not _shutdown_event.is_set():
-        message = consumer.poll(timeout_ms=500)
+        gate.release_due(consumer)
+        timeout_ms = 500
+        if len(batch):
+            timeout_ms = min(timeout_ms, int(batch.remaining_s() * 1000))
+        # Each document in a poll joins the batch, so cap the poll at what the
+        # batch has room for.
+        message = consumer.poll(timeout_ms=timeout_ms, max_records=batch.capacity())
         if not message:
+            if batch.due():
+                _flush(consumer, producer, ladder, batch)
             continue
-        for records in message.values():
-            for record in records:
-                evt = record.value
-                doc_id = evt.get("document_id")
-                entities = evt.get("entities", [])
-                source_url = evt.get("source_url")
-                if not doc_id:
+        batches = [
+            (tp, [(record, *_decode(record)) for record in records])
+            for tp, records in message.items()
+        ]
+        claims = _prefetch_claims(
+            prefetcher, [evt for _, decoded in batches for _, evt, _ in decoded]
+        )
+        flush_now = False
+        for tp, decoded in batches:
+            for record, evt, decode_error in decoded:
+                if gate.hold(consumer, record, ladder.not_before(record)):
+                    break
+                if decode_error is not None:
+                    error, permanent = decode_error, True
+                elif not evt.get("document_id"):
                     logger.warning("missing_document_id", event=evt)
                     MESSAGES_COUNTER.labels(status="skipped").inc()
-                    consumer.commit()
+                    batch.add(record)
                     continue
-                try:
-                    with driver().session() as session:
-                        with session.begin_transaction() as tx:
-                            upsert_from_entities(session, doc_id, source_url, entities)
-                            tx.commit()
-                    logger.info(
-                        "graph_upsert_ok", doc_id=doc_id, entity_count=len(entities)
-                    )
-                    MESSAGES_COUNTER.labels(status="success").inc()
-                    consumer.commit()
-                except Exception as exc:  # pragma: no cover - requires infra
-                    logger.exception(
-                        "graph_upsert_err", doc_id=doc_id, error=str(exc)
-                    )
-                    MESSAGES_COUNTER.labels(status="error").inc()
+                else:
+                    try:
+                        batch.add(record, _params(evt, claims, validator))
+                        continue
+                    except (SchemaValidationError, ClaimCheckError) as exc:
+                        logger.error(
+                            "graph_invalid_event",
+                            doc_id=evt["document_id"],
+                            error=str(exc),
+                        )
+                        error, permanent = exc, True
+                    except Exception as exc:
+                        logger.exception(
+                            "graph_prepare_err",
+                            doc_id=evt["document_id"],
+                            error=str(exc),
+                        )
+                        error, permanent = exc, False
+                if _route_failure(producer, ladder, record, error, permanent):
+                    batch.add(record)
+                    continue
+                # Commit what precedes the record and retry it on the next
+                # poll rather than committing past it.
+                consumer.seek(tp, record.offset)
+                flush_now = True
+                break
+        if flush_now or batch.due():
+            _flush(consumer, producer, ladder, batch)
+    if len(batch):
+        _flush(consumer, producer, ladder, batch)
+    prefetcher.shutdown(wait=False, cancel_futures=True)
     consumer.close()
+    producer.close()
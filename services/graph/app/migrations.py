@@ -0,0 +1,213 @@
+"""Neo4j migrations owned by the graph service.
+
+Usage::
+
+    python -m app.migrations status    # list applied and pending migrations
+    python -m app.migrations apply     # apply pending migrations
+    python -m app.migrations explain   # flag label scans in upsert statements
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from graph_migrations import Migration, Statement, Step, apply_on_startup, run_cli
+
+from .compaction import (
+    CYPHER_DELETE_ORPHAN_THRESHOLDS,
+    CYPHER_DELETE_STALE,
+    CYPHER_REPORT_STALE,
+)
+from .neo4j_utils import (
+    CYPHER_CLOSE_PROVISIONS,
+    CYPHER_STORED_PROVISIONS,
+    CYPHER_UPSERT,
+    driver,
+)
+
+SCOPE = "graph"
+
+# Also run by the bulk loader, whose rows carry neither comparison entries
+# nor change versions.
+COMPARISON_BACKFILL = (
+    Step(
+        """
+        MATCH (p:Provision)-[r:HAS_THRESHOLD]->(t:Threshold)
+        WHERE r.concept IS NULL
+        WITH p, r, t LIMIT $batch_size
+        MATCH (p)-[:IN_DOCUMENT]->(d:Document)
+        OPTIONAL MATCH (p)-[:ABOUT]->(c:Concept)
+        WITH p, r, t, d, head(collect(c.name)) AS concept
+        SET r.concept = coalesce(concept, 'unspecified'),
+            r.unit = t.unit_normalized, r.value = t.value,
+            r.created_at = d.created_at,
+            r.jurisdictions = [(p)-[:APPLIES_TO]->(j:Jurisdiction) | j.name]
+        RETURN count(*) AS n
+        """,
+        batched=True,
+    ),
+    Step(
+        """
+        MATCH ()-[r:HAS_THRESHOLD]->()
+        WHERE r.unit IS NOT NULL AND r.value IS NOT NULL
+        WITH DISTINCT r.concept AS concept, r.unit AS unit
+        MERGE (g:ComparisonGroup {key: concept + '|' + unit})
+          ON CREATE SET g.concept = concept, g.unit = unit
+        """,
+    ),
+)
+
+VERSION_BACKFILL = (
+    Step(
+        """
+        MATCH (p:Provision)
+        WHERE p.version IS NULL
+        WITH p LIMIT $batch_size
+        SET p.version = 0
+        RETURN count(*) AS n
+        """,
+        batched=True,
+    ),
+)
+
+MIGRATIONS = (
+    Migration(
+        1,
+        "Move provenance offsets and page onto Provision",
+        (
+            Step(
+                """
+                MATCH (p:Provision)-[r:PROVENANCE]->(prov:Provenance)
+                WITH p, r, prov LIMIT $batch_size
+                SET p.start = prov.start, p.end = prov.end,
+                    p.page = coalesce(prov.page, p.page)
+                DELETE r
+                RETURN count(*) AS n
+                """,
+                batched=True,
+            ),
+            Step(
+                """
+                MATCH (prov:Provenance)
+                WITH prov LIMIT $batch_size
+                DETACH DELETE prov
+                RETURN count(*) AS n
+                """,
+                batched=True,
+            ),
+            Step("DROP INDEX provenance_span IF EXISTS"),
+        ),
+    ),
+    Migration(
+        2,
+        "Key constraints for merged nodes",
+        (
+            Step(
+                "CREATE CONSTRAINT doc_id IF NOT EXISTS "
+                "FOR (d:Document) REQUIRE d.id IS UNIQUE"
+            ),
+            Step(
+                "CREATE CONSTRAINT prov_pid IF NOT EXISTS "
+                "FOR (p:Provision) REQUIRE p.pid IS UNIQUE"
+            ),
+            Step(
+                "CREATE CONSTRAINT thr_pid IF NOT EXISTS "
+                "FOR (t:Threshold) REQUIRE t.pid IS UNIQUE"
+            ),
+            Step(
+                "CREATE CONSTRAINT jur_name IF NOT EXISTS "
+                "FOR (j:Jurisdiction) REQUIRE j.name IS UNIQUE"
+            ),
+            Step("CREATE INDEX concept_name IF NOT EXISTS FOR (c:Concept) ON (c.name)"),
+        ),
+    ),
+    Migration(
+        3,
+        "Range index for compaction of closed provisions",
+        (
+            Step(
+                "CREATE INDEX provision_valid_to IF NOT EXISTS "
+                "FOR (p:Provision) ON (p.valid_to)"
+            ),
+        ),
+    ),
+    Migration(
+        4,
+        "Threshold comparison index for arbitrage",
+        (
+            Step(
+                "CREATE CONSTRAINT comparison_group_key IF NOT EXISTS "
+                "FOR (g:ComparisonGroup) REQUIRE g.key IS UNIQUE"
+            ),
+            Step(
+                "CREATE INDEX has_threshold_comparison IF NOT EXISTS "
+                "FOR ()-[r:HAS_THRESHOLD]-() ON (r.concept, r.unit, r.value)"
+            ),
+            *COMPARISON_BACKFILL,
+        ),
+    ),
+    Migration(
+        5,
+        "Graph change version for incremental readers",
+        (
+            Step(
+                "CREATE CONSTRAINT graph_meta_id IF NOT EXISTS "
+                "FOR (m:GraphMeta) REQUIRE m.id IS UNIQUE"
+            ),
+            Step(
+                "CREATE INDEX provision_version IF NOT EXISTS "
+                "FOR (p:Provision) ON (p.version)"
+            ),
+            *VERSION_BACKFILL,
+        ),
+    ),
+)
+
+
+def statements() -> Dict[str, Statement]:
+    """Statements run by the consumer and compaction, with sample parameters."""
+
+    doc = {
+        "doc_id": "explain",
+        "source_url": None,
+        "jurisdictions": ["Unknown"],
+        "obligations": [],
+    }
+    compaction = {"cutoff": 0, "batch_size": 1_000}
+    return {
+        "upsert": Statement(CYPHER_UPSERT, {"docs": [doc], "version": 1}),
+        "stored_provisions": Statement(
+            CYPHER_STORED_PROVISIONS, {"doc_ids": ["explain"]}
+        ),
+        "close_provisions": Statement(
+            CYPHER_CLOSE_PROVISIONS, {"pids": ["explain"], "version": 1}
+        ),
+        "compact_stale": Statement(CYPHER_DELETE_STALE, compaction),
+        "report_stale": Statement(CYPHER_REPORT_STALE, compaction),
+        # Orphans are only found by scanning; the sweep runs in small batches.
+        "compact_orphans": Statement(
+            CYPHER_DELETE_ORPHAN_THRESHOLDS, compaction, allow_scans=("Threshold",)
+        ),
+    }
+
+
+def migrate_on_startup() -> None:
+    apply_on_startup(lambda: driver().session(), SCOPE, MIGRATIONS)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    return run_cli(
+        argv,
+        scope=SCOPE,
+        migrations=MIGRATIONS,
+        statements=statements,
+        session_factory=lambda: driver().session(),
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
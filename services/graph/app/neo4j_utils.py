@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-import hashlib
 import threading
-from typing import List
+from typing import Dict, List
 
 from neo4j import GraphDatabase
 
 from .config import settings
+from .provisions import (
+    EntityTable,
+    as_table,
+    build_obligations,
+    collect_jurisdictions,
+    plan_changes,
+)
 
 _driver = None
 _driver_lock = threading.Lock()
@@ -31,86 +37,168 @@ def close_driver() -> None:
         _driver = None
 
 
+# One statement upserts a whole batch of documents; each document runs in its
+# own subquery so the per-document UNWINDs cannot multiply rows across docs.
+# Only new or changed provisions are passed in ``doc.obligations``.
 CYPHER_UPSERT = """
-MERGE (d:Document {id: $doc_id})
-  ON CREATE SET d.source_url = $source_url, d.created_at = timestamp()
-  ON MATCH SET  d.source_url = coalesce($source_url, d.source_url)
-WITH d
-UNWIND $jurisdictions AS jname
-  MERGE (j:Jurisdiction {name: jname})
-  MERGE (d)-[:MENTIONS]->(j)
-WITH d, collect(j) AS jurisdiction_nodes
-UNWIND $obligations AS ob
-  MERGE (c:Concept {name: coalesce(ob.concept, 'unspecified')})
-  MERGE (p:Provision {pid: ob.pid})
-    ON CREATE SET p.text = ob.text, p.tx_from = timestamp(), p.valid_from = timestamp(), p.hash = ob.hash
-    ON MATCH  SET p.text = ob.text, p.hash = ob.hash
-  MERGE (p)-[:IN_DOCUMENT]->(d)
-  MERGE (p)-[:ABOUT]->(c)
-  FOREACH (jn IN jurisdiction_nodes |
-    MERGE (p)-[:APPLIES_TO]->(jn)
-  )
-  FOREACH (_ IN CASE WHEN ob.threshold_is_set THEN [1] ELSE [] END |
-    MERGE (t:Threshold {pid: ob.pid})
-      ON CREATE SET t.value = ob.threshold_value, t.unit = ob.threshold_unit, t.unit_normalized = ob.threshold_unit_normalized
-      ON MATCH  SET t.value = ob.threshold_value, t.unit = ob.threshold_unit, t.unit_normalized = ob.threshold_unit_normalized
-    MERGE (p)-[:HAS_THRESHOLD]->(t)
-  )
-  WITH p, ob
-  MERGE (prov:Provenance {doc_id: $doc_id, start: ob.start, end: ob.end})
-    ON CREATE SET prov.page = ob.page
-    ON MATCH SET prov.page = coalesce(ob.page, prov.page)
-  MERGE (p)-[:PROVENANCE]->(prov)
+UNWIND $docs AS doc
+CALL {
+  WITH doc
+  MERGE (d:Document {id: doc.doc_id})
+    ON CREATE SET d.source_url = doc.source_url, d.created_at = timestamp()
+    ON MATCH SET  d.source_url = coalesce(doc.source_url, d.source_url)
+  WITH doc, d
+  UNWIND doc.jurisdictions AS jname
+    MERGE (j:Jurisdiction {name: jname})
+    MERGE (d)-[:MENTIONS]->(j)
+  WITH doc, d, collect(j) AS jurisdiction_nodes
+  UNWIND doc.obligations AS ob
+    MERGE (c:Concept {name: coalesce(ob.concept, 'unspecified')})
+    MERGE (p:Provision {pid: ob.pid})
+      ON CREATE SET p.tx_from = timestamp(), p.valid_from = timestamp()
+      ON MATCH  SET p.valid_to = null, p.tx_to = null
+    SET p.text = ob.text, p.hash = ob.hash, p.updated_at = timestamp(),
+        p.version = $version,
+        p.start = ob.start, p.end = ob.end, p.page = ob.page
+    MERGE (p)-[:IN_DOCUMENT]->(d)
+    MERGE (p)-[:ABOUT]->(c)
+    FOREACH (jn IN jurisdiction_nodes |
+      MERGE (p)-[:APPLIES_TO]->(jn)
+    )
+    // Detach the concept and jurisdictions an amendment replaced.
+    FOREACH (stale IN [(p)-[r:ABOUT]->(old:Concept) WHERE old.name <> c.name | r] |
+      DELETE stale
+    )
+    FOREACH (stale IN [(p)-[r:APPLIES_TO]->(old:Jurisdiction)
+                       WHERE NOT old.name IN doc.jurisdictions | r] |
+      DELETE stale
+    )
+    // Detach thresholds that are no longer inside this provision.
+    FOREACH (stale IN [(p)-[r:HAS_THRESHOLD]->(old:Threshold)
+                       WHERE NOT old.pid IN [th IN ob.thresholds | th.pid] | r] |
+      DELETE stale
+    )
+    // Each HAS_THRESHOLD edge carries the comparison entry the arbitrage
+    // top-k scan reads through the (concept, unit, value) relationship index.
+    FOREACH (th IN ob.thresholds |
+      MERGE (t:Threshold {pid: th.pid})
+        SET t.value = th.value, t.unit = th.unit, t.unit_normalized = th.unit_normalized
+      MERGE (p)-[r:HAS_THRESHOLD]->(t)
+        SET r.concept = c.name, r.unit = th.unit_normalized, r.value = th.value,
+            r.created_at = d.created_at, r.jurisdictions = doc.jurisdictions
+    )
+    FOREACH (th IN [x IN ob.thresholds
+                    WHERE x.unit_normalized IS NOT NULL AND x.value IS NOT NULL] |
+      MERGE (g:ComparisonGroup {key: c.name + '|' + th.unit_normalized})
+        ON CREATE SET g.concept = c.name, g.unit = th.unit_normalized
+    )
+}
 """
 
 
-def upsert_from_entities(
-    session, doc_id: str, source_url: str | None, entities: List[dict]
-):
-    jurisdictions = sorted(
-        {
-            e.get("attrs", {}).get("name")
-            for e in entities
-            if e.get("type") == "JURISDICTION"
-            and e.get("attrs")
-            and e["attrs"].get("name")
-        }
-    ) or ["Unknown"]
-
-    obligations = []
-    obligation_entities = [e for e in entities if e.get("type") == "OBLIGATION"]
-    thresholds = [e for e in entities if e.get("type") == "THRESHOLD"]
-
-    for entity in obligation_entities:
-        pid = f"{doc_id}:{entity['start']}:{entity['end']}"
-        contained_thresholds = [
-            t
-            for t in thresholds
-            if entity["start"] <= t.get("start", 0) <= entity["end"]
-            and t.get("end", 0) <= entity["end"]
-        ]
-        threshold = contained_thresholds[0] if contained_thresholds else None
-        threshold_attrs = threshold.get("attrs", {}) if threshold else {}
-        obligations.append(
-            {
-                "pid": pid,
-                "text": entity.get("text", ""),
-                "hash": hashlib.sha256(entity.get("text", "").encode()).hexdigest()[:16],
-                "start": entity.get("start"),
-                "end": entity.get("end"),
-                "concept": entity.get("attrs", {}).get("concept"),
-                "page": entity.get("attrs", {}).get("page"),
-                "threshold_is_set": bool(threshold),
-                "threshold_value": threshold_attrs.get("value"),
-                "threshold_unit": threshold_attrs.get("unit"),
-                "threshold_unit_normalized": threshold_attrs.get("unit_normalized"),
-            }
+# Graph change version. Every write transaction that changes provisions bumps
+# it first; the node lock is held until commit, so versions commit in order
+# and a reader that has seen version v needs only provisions with
+# p.version > v. reset_version marks deletions of provisions readers have not
+# seen closed, which they cannot follow incrementally; compaction only deletes
+# provisions closed longer than its retention ago, so it leaves it alone.
+CYPHER_BUMP_VERSION = """
+MERGE (m:GraphMeta {id: 'graph'})
+SET m.version = coalesce(m.version, 0) + 1, m.updated_at = timestamp()
+RETURN m.version AS version
+"""
+
+CYPHER_BUMP_RESET_VERSION = """
+MERGE (m:GraphMeta {id: 'graph'})
+SET m.version = coalesce(m.version, 0) + 1, m.updated_at = timestamp(),
+    m.reset_version = m.version
+"""
+
+
+# Open provisions of each document, read once per batch to compute the delta.
+CYPHER_STORED_PROVISIONS = """
+UNWIND $doc_ids AS doc_id
+MATCH (d:Document {id: doc_id})
+RETURN doc_id, d.source_url AS source_url,
+       [(p:Provision)-[:IN_DOCUMENT]->(d) WHERE p.valid_to IS NULL | [p.pid, p.hash]]
+         AS provisions
+"""
+
+CYPHER_CLOSE_PROVISIONS = """
+UNWIND $pids AS pid
+MATCH (p:Provision {pid: pid})
+WHERE p.valid_to IS NULL
+SET p.valid_to = timestamp(), p.tx_to = timestamp(), p.updated_at = timestamp(),
+    p.version = $version
+"""
+
+
+def document_params(
+    doc_id: str, source_url: str | None, entities: List[dict] | EntityTable
+) -> dict:
+    """Parameters of one document in the ``$docs`` list of :data:`CYPHER_UPSERT`."""
+
+    table = as_table(entities)
+    jurisdictions = collect_jurisdictions(table)
+    return {
+        "doc_id": doc_id,
+        "source_url": source_url,
+        "jurisdictions": jurisdictions,
+        "obligations": build_obligations(doc_id, table, jurisdictions),
+    }
+
+
+def upsert_documents(tx, docs: List[dict]) -> Dict[str, int]:
+    """Transaction function for ``session.execute_write``.
+
+    Reads the stored provision hashes of every document in one query, writes
+    only new or changed provisions and closes the validity of provisions
+    that are no longer extracted. Documents with nothing to change are not
+    written at all. Returns provision counts by kind of change.
+    """
+
+    # Only the latest version of a document in the batch is written.
+    docs = list({doc["doc_id"]: doc for doc in docs}.values())
+    stored = {
+        row["doc_id"]: row
+        for row in tx.run(CYPHER_STORED_PROVISIONS, doc_ids=[d["doc_id"] for d in docs])
+    }
+    counts = {"new_or_changed": 0, "unchanged": 0, "removed": 0}
+    writes, removed = [], []
+    for doc in docs:
+        row = stored.get(doc["doc_id"])
+        if row is None:
+            counts["new_or_changed"] += len(doc["obligations"])
+            writes.append(doc)
+            continue
+        changed, gone, unchanged = plan_changes(
+            doc["obligations"], dict(row["provisions"])
         )
+        counts["new_or_changed"] += len(changed)
+        counts["unchanged"] += unchanged
+        counts["removed"] += len(gone)
+        removed.extend(gone)
+        new_source_url = doc["source_url"] and doc["source_url"] != row["source_url"]
+        if changed or new_source_url:
+            writes.append({**doc, "obligations": changed})
+    if not writes and not removed:
+        return counts
+    version = tx.run(CYPHER_BUMP_VERSION).single()["version"]
+    if writes:
+        tx.run(CYPHER_UPSERT, docs=writes, version=version).consume()
+    if removed:
+        tx.run(CYPHER_CLOSE_PROVISIONS, pids=removed, version=version).consume()
+    return counts
 
-    session.run(
-        CYPHER_UPSERT,
-        doc_id=doc_id,
-        source_url=source_url,
-        jurisdictions=jurisdictions,
-        obligations=obligations,
-    )
+
+def write_documents(session, docs: List[dict]) -> Dict[str, int]:
+    """Upsert documents in one managed write transaction."""
+
+    # execute_write retries transient errors (deadlocks, leader switches).
+    return session.execute_write(upsert_documents, docs)
+
+
+def upsert_from_entities(
+    session, doc_id: str, source_url: str | None, entities: List[dict] | EntityTable
+):
+    write_documents(session, [document_params(doc_id, source_url, entities)])
@@ -0,0 +1,130 @@
+"""Turn extracted entities into graph upsert parameters."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import sys
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from entity_table import EntityTable
+
+
+def as_table(entities: Union[EntityTable, List[dict]]) -> EntityTable:
+    if isinstance(entities, EntityTable):
+        return entities
+    return EntityTable.from_dicts(entities)
+
+
+def collect_jurisdictions(table: EntityTable) -> List[str]:
+    view = table.view("JURISDICTION")
+    names = set()
+    for row in view.rows:
+        name_id = table.names[row]
+        if name_id >= 0 and table.strings[name_id]:
+            names.add(table.strings[name_id])
+    return sorted(names) or ["Unknown"]
+
+
+def _threshold_params(doc_id: str, table: EntityTable, row: int) -> dict:
+    value = table.values[row]
+    start, end = table.starts[row], table.ends[row]
+    return {
+        "pid": f"{doc_id}:{start}:{end}",
+        "value": None if math.isnan(value) else value,
+        "unit": table.string(table.units[row]),
+        "unit_normalized": table.string(table.units_normalized[row]),
+    }
+
+
+def provision_hash(obligation: dict, jurisdictions: Sequence[str]) -> str:
+    """Fingerprint of everything the upsert writes for one provision.
+
+    Uses stdlib ``json`` with sorted keys so the hash is stable across
+    processes and codec backends.
+    """
+
+    content = {
+        "text": obligation["text"],
+        "concept": obligation["concept"],
+        "page": obligation["page"],
+        "thresholds": obligation["thresholds"],
+        "jurisdictions": list(jurisdictions),
+    }
+    encoded = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def build_obligations(
+    doc_id: str, table: EntityTable, jurisdictions: Sequence[str] = ()
+) -> List[dict]:
+    """Upsert parameters for every obligation with all thresholds inside it.
+
+    A threshold belongs to an obligation when its span lies within the
+    obligation's span. Thresholds are sorted by start offset once, so each
+    obligation bisects to its first candidate and scans only the thresholds
+    that start inside it. Obligations over the same span share a pid (a
+    sentence with two modal verbs yields two); only the first is kept.
+    """
+
+    thresholds_view = table.view("THRESHOLD")
+    starts, ends = thresholds_view.starts, thresholds_view.ends
+    by_start = sorted(thresholds_view.rows, key=starts.__getitem__)
+    sorted_starts = [starts[row] for row in by_start]
+
+    obligations: Dict[str, dict] = {}
+    for row in table.view("OBLIGATION").rows:
+        start, end = table.starts[row], table.ends[row]
+        pid = f"{doc_id}:{start}:{end}"
+        if pid in obligations:
+            continue
+        thresholds = []
+        for pos in range(bisect_left(sorted_starts, start), len(by_start)):
+            if sorted_starts[pos] > end:
+                break
+            t_row = by_start[pos]
+            if ends[t_row] <= end:
+                thresholds.append(_threshold_params(doc_id, table, t_row))
+        attrs = table.attrs(row) or {}
+        obligation = {
+            "pid": pid,
+            "text": table.text(row),
+            "start": start,
+            "end": end,
+            "concept": attrs.get("concept"),
+            "page": attrs.get("page"),
+            "thresholds": thresholds,
+        }
+        obligation["hash"] = provision_hash(obligation, jurisdictions)
+        obligations[pid] = obligation
+    return list(obligations.values())
+
+
+def plan_changes(
+    obligations: Iterable[dict], existing: Dict[str, str]
+) -> Tuple[List[dict], List[str], int]:
+    """Split a document's provisions against the open ones already stored.
+
+    ``existing`` maps pid to hash for the document's provisions that are
+    still valid. Returns the obligations that are new or changed, the pids
+    that are no longer extracted, and how many distinct provisions are
+    unchanged.
+    """
+
+    changed = []
+    seen = set()
+    unchanged = set()
+    for obligation in obligations:
+        pid = obligation["pid"]
+        seen.add(pid)
+        if existing.get(pid) == obligation["hash"]:
+            unchanged.add(pid)
+        else:
+            changed.append(obligation)
+    removed = sorted(pid for pid in existing if pid not in seen)
+    return changed, removed, len(unchanged)
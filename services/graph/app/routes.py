@@ -1,6 +1,12 @@
+import sys
+from pathlib import Path
+
 from fastapi import APIRouter
 from fastapi.responses import PlainTextResponse
-from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from worker_supervisor import render_metrics
 
 router = APIRouter()
 
@@ -12,4 +18,5 @@ def health():
 
 @router.get("/metrics")
 def metrics():
-    return PlainTextResponse(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    payload, content_type = render_metrics()
+    return PlainTextResponse(payload, media_type=content_type)
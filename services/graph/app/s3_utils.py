@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+import boto3
+import structlog
+from botocore.exceptions import BotoCoreError, ClientError
+
+from .config import get_settings
+
+logger = structlog.get_logger("s3_utils")
+
+
+def s3_client():
+    settings = get_settings()
+    return boto3.client("s3", endpoint_url=settings.aws_endpoint_url)
+
+
+def split_s3_uri(uri: str) -> tuple[str, str]:
+    _, _, bucket_key = uri.partition("s3://")
+    bucket, _, key = bucket_key.partition("/")
+    return bucket, key
+
+
+def get_bytes(bucket: str, key: str) -> bytes:
+    try:
+        obj = s3_client().get_object(Bucket=bucket, Key=key)
+        return obj["Body"].read()
+    except (ClientError, BotoCoreError) as exc:
+        logger.error("s3_get_failed", bucket=bucket, key=key, error=str(exc))
+        raise
+
+
+def iter_keys(bucket: str, prefix: str) -> Iterator[str]:
+    """Yield every object key under ``prefix``."""
+
+    paginator = s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", ()):
+            yield obj["Key"]
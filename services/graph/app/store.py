@@ -0,0 +1,76 @@
+"""Graph store selected by ``GRAPH_BACKEND`` (``neo4j`` or ``sqlite``)."""
+
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+from prometheus_client import Counter
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from graph_store import BACKENDS, GraphWriter, SQLiteGraphStore
+
+from .config import settings
+from .neo4j_utils import close_driver, driver, write_documents
+
+PROVISION_CHANGES = Counter(
+    "graph_provision_changes_total",
+    "Provisions compared against the stored graph on upsert",
+    ["change"],
+)
+
+# Failures of the store rather than of a document: the whole batch is retried
+# later instead of being split into per-document writes.
+UNAVAILABLE_ERRORS = (ServiceUnavailable, SessionExpired, TransientError)
+
+_store: GraphWriter | None = None
+_store_lock = threading.Lock()
+
+
+class Neo4jGraphWriter(GraphWriter):
+    def write_documents(self, docs: List[dict]) -> Dict[str, int]:
+        with driver().session() as session:
+            return write_documents(session, docs)
+
+    def close(self) -> None:
+        close_driver()
+
+
+def uses_neo4j() -> bool:
+    return settings.graph_backend == "neo4j"
+
+
+def get_store() -> GraphWriter:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.graph_backend not in BACKENDS:
+                    raise ValueError(
+                        f"GRAPH_BACKEND must be one of {BACKENDS}, "
+                        f"not {settings.graph_backend!r}"
+                    )
+                if uses_neo4j():
+                    _store = Neo4jGraphWriter()
+                else:
+                    _store = SQLiteGraphStore(settings.sqlite_path)
+    return _store
+
+
+def close_store() -> None:
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
+
+
+def write_batch(docs: List[dict]) -> None:
+    """Write one batch of ``$docs`` entries and count provision changes."""
+
+    counts = get_store().write_documents(docs)
+    for change, count in counts.items():
+        PROVISION_CHANGES.labels(change=change).inc(count)
@@ -1,22 +1,25 @@
 from __future__ import annotations
 
 import logging
+import sys
 import threading
+from pathlib import Path
 
 import structlog
+from app.compaction import CompactionJob, job_from_settings
 from app.config import settings
 from app.consumer import run_consumer, stop_consumer
-from app.neo4j_utils import close_driver, driver
+from app.migrations import migrate_on_startup
+from app.neo4j_utils import close_driver
 from app.routes import router
+from app.store import close_store, uses_neo4j
 from fastapi import FastAPI
 
-CONSTRAINTS = [
-    "CREATE CONSTRAINT doc_id IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE",
-    "CREATE CONSTRAINT prov_pid IF NOT EXISTS FOR (p:Provision) REQUIRE p.pid IS UNIQUE",
-    "CREATE CONSTRAINT thr_pid IF NOT EXISTS FOR (t:Threshold) REQUIRE t.pid IS UNIQUE",
-    "CREATE CONSTRAINT jur_name IF NOT EXISTS FOR (j:Jurisdiction) REQUIRE j.name IS UNIQUE",
-    "CREATE INDEX concept_name IF NOT EXISTS FOR (c:Concept) ON (c.name)",
-]
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "shared"))
+from json_codec import FastJSONResponse
+from lanes import lane_workers
+from worker_supervisor import WorkerSpec, WorkerSupervisor
 
 
 def _configure_logging(level: str) -> None:
@@ -37,24 +40,54 @@ def _configure_logging(level: str) -> None:
 
 _configure_logging(settings.log_level)
 
-app = FastAPI(title="Graph Interface", version="0.2.0")
+app = FastAPI(
+    title="Graph Interface",
+    version="0.2.0",
+    default_response_class=FastJSONResponse,
+)
 app.include_router(router)
 
 
-def _ensure_constraints() -> None:
-    with driver().session() as session:
-        for statement in CONSTRAINTS:
-            session.run(statement)
+_supervisor: WorkerSupervisor | None = None
+_compaction: CompactionJob | None = None
 
 
 @app.on_event("startup")
 def _startup() -> None:
-    _ensure_constraints()
-    thread = threading.Thread(target=run_consumer, daemon=True)
-    thread.start()
+    global _supervisor, _compaction
+    # Schema migrations and compaction only apply to the Neo4j backend.
+    if uses_neo4j():
+        migrate_on_startup()
+        _compaction = job_from_settings()
+    if _compaction is not None:
+        _compaction.start()
+    workers = lane_workers(
+        "graph", settings.consumer_workers, settings.bulk_consumer_workers
+    )
+    if settings.consumer_mode == "process":
+        _supervisor = WorkerSupervisor(
+            [
+                WorkerSpec(
+                    name=name, target=run_consumer, stop=stop_consumer, args=(lane,)
+                )
+                for name, lane in workers
+            ]
+        )
+        _supervisor.start()
+        return
+    for name, lane in workers:
+        thread = threading.Thread(
+            target=run_consumer, args=(lane,), name=name, daemon=True
+        )
+        thread.start()
 
 
 @app.on_event("shutdown")
 def _shutdown() -> None:
+    if _compaction is not None:
+        _compaction.stop()
+    if _supervisor is not None:
+        _supervisor.stop()
     stop_consumer()
+    close_store()
     close_driver()
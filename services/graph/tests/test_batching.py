@@ -0,0 +1,212 @@
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("kafka")
+
+from app import consumer
+from app.batching import UpsertBatch
+from app.neo4j_utils import document_params, upsert_documents
+from kafka import TopicPartition
+from neo4j.exceptions import ServiceUnavailable, TransientError
+
+Record = namedtuple("Record", "topic partition offset key value headers")
+TP = TopicPartition("nlp.extracted", 0)
+
+
+class FakeConsumer:
+    def __init__(self):
+        self.committed = []
+        self.seeks = []
+
+    def commit(self, offsets):
+        self.committed.append({tp: meta.offset for tp, meta in offsets.items()})
+
+    def seek(self, tp, offset):
+        self.seeks.append((tp, offset))
+
+
+def _batch(*doc_ids):
+    batch = UpsertBatch(max_docs=10, window_s=60)
+    for offset, doc_id in enumerate(doc_ids):
+        record = Record("nlp.extracted", 0, offset, None, b"", [])
+        batch.add(record, None if doc_id is None else {"doc_id": doc_id})
+    return batch
+
+
+def test_batch_is_due_by_size_or_window():
+    batch = _batch("a", None, "b")
+    assert not batch.due()
+    batch.max_docs = 2
+    assert batch.due()
+    batch.max_docs, batch.window_s = 10, 0
+    assert batch.due()
+    batch.clear()
+    assert not batch.due() and batch.remaining_s() == 0.0
+
+
+def test_flush_writes_one_transaction_then_commits(monkeypatch):
+    writes = []
+    monkeypatch.setattr(consumer, "write_batch", writes.append)
+    kafka = FakeConsumer()
+    batch = _batch("a", None, "b")
+
+    consumer._flush(kafka, None, None, batch)
+
+    assert writes == [[{"doc_id": "a"}, {"doc_id": "b"}]]
+    assert kafka.committed == [{TP: 3}]
+    assert len(batch) == 0
+
+
+def test_failed_batch_falls_back_to_single_documents(monkeypatch):
+    def write(docs):
+        if any(doc["doc_id"] == "bad" for doc in docs):
+            raise RuntimeError("constraint violated")
+
+    routed = []
+
+    def route(producer, ladder, record, error, permanent):
+        routed.append(record.offset)
+        return record.offset != 3
+
+    monkeypatch.setattr(consumer, "write_batch", write)
+    monkeypatch.setattr(consumer, "_route_failure", route)
+    kafka = FakeConsumer()
+
+    consumer._flush(kafka, None, None, _batch("a", "bad", "b", "bad", "c"))
+
+    # offset 1 is routed to a retry topic; routing offset 3 fails, so the
+    # partition is committed up to it and rewound there.
+    assert routed == [1, 3]
+    assert kafka.committed == [{TP: 3}]
+    assert kafka.seeks == [(TP, 3)]
+
+
+def test_unavailable_store_rewinds_the_batch_and_backs_off(monkeypatch):
+    writes, waits = [], []
+
+    def write(docs):
+        writes.append([doc["doc_id"] for doc in docs])
+        raise ServiceUnavailable("connection refused")
+
+    monkeypatch.setattr(consumer, "write_batch", write)
+    monkeypatch.setattr(consumer._shutdown_event, "wait", waits.append)
+    monkeypatch.setattr(consumer.settings, "unavailable_backoff_ms", 250)
+    kafka = FakeConsumer()
+
+    consumer._flush(kafka, None, None, _batch(None, "a", "b"))
+
+    # No per-document split and nothing routed: the batch is read again.
+    assert writes == [["a", "b"]]
+    assert kafka.committed == [{TP: 1}]
+    assert kafka.seeks == [(TP, 1)]
+    assert waits == [0.25]
+
+
+def test_store_failing_mid_split_rewinds_the_rest(monkeypatch):
+    def write(docs):
+        if len(docs) > 1 or docs[0]["doc_id"] == "bad":
+            raise RuntimeError("constraint violated")
+        if docs[0]["doc_id"] == "b":
+            raise TransientError("deadlock")
+
+    routed, waits = [], []
+    monkeypatch.setattr(consumer, "write_batch", write)
+    monkeypatch.setattr(
+        consumer, "_route_failure", lambda *args: routed.append(args[2].offset) or True
+    )
+    monkeypatch.setattr(consumer._shutdown_event, "wait", waits.append)
+    kafka = FakeConsumer()
+
+    consumer._flush(kafka, None, None, _batch("a", "bad", "b", "c"))
+
+    assert routed == [1]
+    assert kafka.committed == [{TP: 2}]
+    assert kafka.seeks == [(TP, 2)]
+    assert len(waits) == 1
+
+
+class FakeTx:
+    def __init__(self, stored):
+        self.stored = stored
+        self.runs = []
+        self.version = 6
+
+    def run(self, query, **params):
+        if "RETURN doc_id" in query:
+            return [row for row in self.stored if row["doc_id"] in params["doc_ids"]]
+        if "RETURN m.version" in query:
+            self.version += 1
+            return self
+        self.runs.append((query, params))
+        return self
+
+    def single(self):
+        return {"version": self.version}
+
+    def consume(self):
+        return None
+
+
+def test_unchanged_document_is_not_rewritten():
+    entities = [
+        {"type": "OBLIGATION", "text": "Banks shall report.", "start": 0, "end": 19},
+        {"type": "OBLIGATION", "text": "Firms must file.", "start": 20, "end": 36},
+    ]
+    doc = document_params("doc-1", "https://example.com/a", entities)
+    stored = {
+        "doc_id": "doc-1",
+        "source_url": "https://example.com/a",
+        "provisions": [[ob["pid"], ob["hash"]] for ob in doc["obligations"]],
+    }
+
+    tx = FakeTx([stored])
+    counts = upsert_documents(tx, [doc])
+    assert tx.runs == []
+    assert tx.version == 6
+    assert counts == {"new_or_changed": 0, "unchanged": 2, "removed": 0}
+
+    amended = document_params("doc-1", None, entities[:1])
+    amended["obligations"][0]["hash"] = "edited"
+    tx = FakeTx([stored])
+    counts = upsert_documents(tx, [amended])
+    (upsert, params), (close, close_params) = tx.runs
+    assert [ob["pid"] for ob in params["docs"][0]["obligations"]] == ["doc-1:0:19"]
+    assert params["version"] == 7
+    assert close_params == {"pids": ["doc-1:20:36"], "version": 7}
+    assert counts == {"new_or_changed": 1, "unchanged": 0, "removed": 1}
+
+
+def test_new_document_is_written_in_full():
+    doc = document_params(
+        "doc-2", None, [{"type": "OBLIGATION", "text": "x", "start": 0, "end": 1}]
+    )
+    tx = FakeTx([])
+    upsert_documents(tx, [doc])
+    ((_, params),) = tx.runs
+    assert params["docs"] == [doc]
+
+
+def test_capacity_bounds_the_next_poll():
+    batch = _batch("a", None, "b")
+    assert batch.capacity() == 8
+    batch.max_docs = 2
+    assert batch.capacity() == 1
+
+
+def test_commit_failure_keeps_the_consumer_running(monkeypatch):
+    monkeypatch.setattr(consumer, "write_batch", lambda docs: None)
+
+    class RebalancingConsumer(FakeConsumer):
+        def commit(self, offsets):
+            raise RuntimeError("CommitFailedError: group rebalanced")
+
+    batch = _batch("a")
+    consumer._flush(RebalancingConsumer(), None, None, batch)
+    assert len(batch) == 0
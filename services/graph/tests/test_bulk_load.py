@@ -0,0 +1,74 @@
+import csv
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("kafka")
+
+from app.bulk_load import GraphSnapshot, latest_documents, write_csv
+from app.neo4j_utils import document_params
+
+ENTITIES = [
+    {"type": "OBLIGATION", "text": "Banks shall hold 5%.", "start": 0, "end": 20},
+    {
+        "type": "THRESHOLD",
+        "text": "5%",
+        "start": 17,
+        "end": 19,
+        "attrs": {"value": 5.0, "unit": "%", "unit_normalized": "percent"},
+    },
+    {
+        "type": "JURISDICTION",
+        "text": "EU",
+        "start": 30,
+        "end": 32,
+        "attrs": {"name": "EU"},
+    },
+]
+
+
+def test_latest_documents_keeps_newest_event():
+    events = [
+        {"document_id": "a", "timestamp": "2024-01-02T00:00:00+00:00", "v": 2},
+        {"document_id": "a", "timestamp": "2024-01-01T00:00:00+00:00", "v": 1},
+        {"document_id": "b", "timestamp": "2024-01-01T00:00:00+00:00", "v": 1},
+        {"timestamp": "2024-01-03T00:00:00+00:00"},
+    ]
+    latest = latest_documents(events)
+    assert {doc_id: evt["v"] for doc_id, evt in latest.items()} == {"a": 2, "b": 1}
+
+
+def test_snapshot_dedups_shared_nodes_and_writes_import_csvs(tmp_path):
+    snapshot = GraphSnapshot(loaded_at=1)
+    snapshot.add_document(document_params("d1", "https://a.example", ENTITIES))
+    snapshot.add_document(document_params("d2", None, ENTITIES))
+
+    counts = snapshot.counts()
+    assert counts["Document"] == 2
+    assert counts["Jurisdiction"] == 1
+    assert counts["Concept"] == 1
+    assert counts["Provision"] == 2
+    assert counts["APPLIES_TO"] == 2
+
+    args = write_csv(snapshot, tmp_path)
+    assert "--nodes=Provision=nodes_Provision.csv" in args
+    with (tmp_path / "nodes_Threshold.csv").open() as fh:
+        rows = list(csv.reader(fh))
+    assert rows[0] == [
+        ":ID(Threshold)",
+        "pid:string",
+        "value:double",
+        "unit:string",
+        "unit_normalized:string",
+    ]
+    assert sorted(row[1] for row in rows[1:]) == ["d1:17:19", "d2:17:19"]
+    with (tmp_path / "rels_IN_DOCUMENT.csv").open() as fh:
+        header, *rels = list(csv.reader(fh))
+    assert header == [":START_ID(Provision)", ":END_ID(Document)"]
+    assert sorted(rels) == [["d1:0:20", "d1"], ["d2:0:20", "d2"]]
+    assert "neo4j-admin database import full" in (tmp_path / "import.sh").read_text()
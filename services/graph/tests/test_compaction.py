@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("neo4j")
+
+from app.compaction import (
+    COMPACTED_NODES,
+    CYPHER_ARCHIVE_STALE,
+    CYPHER_DELETE_ORPHAN_THRESHOLDS,
+    CYPHER_DELETE_STALE,
+    compact,
+    cutoff_ms,
+)
+from app.neo4j_utils import CYPHER_BUMP_RESET_VERSION
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def single(self):
+        return self.row
+
+    def consume(self):
+        return None
+
+
+class FakeSession:
+    """Serves a queue of batch results per statement."""
+
+    def __init__(self, stale=(), orphans=()):
+        self.results = {
+            CYPHER_DELETE_STALE: [{"provisions": n, "thresholds": t} for n, t in stale],
+            CYPHER_ARCHIVE_STALE: [
+                {"provisions": n, "thresholds": t} for n, t in stale
+            ],
+            CYPHER_DELETE_ORPHAN_THRESHOLDS: [{"n": n} for n in orphans],
+        }
+        self.calls = []
+        self.resets = 0
+
+    def execute_write(self, work):
+        return work(self)
+
+    def run(self, statement, **params):
+        if statement == CYPHER_BUMP_RESET_VERSION:
+            self.resets += 1
+            return FakeResult(None)
+        self.calls.append((statement, params))
+        return FakeResult(self.results[statement].pop(0))
+
+
+def _deleted(kind, action="deleted"):
+    return COMPACTED_NODES.labels(kind=kind, action=action)._value.get()
+
+
+def test_cutoff_is_in_neo4j_milliseconds():
+    assert cutoff_ms(60, now=1_000) == 940_000
+
+
+def test_compact_runs_bounded_batches_until_a_short_one():
+    session = FakeSession(stale=[(2, 1), (2, 0), (1, 3)], orphans=[2, 0])
+    provisions, thresholds = _deleted("provision"), _deleted("threshold")
+
+    result = compact(session, cutoff=5, batch_size=2)
+
+    assert (result.provisions, result.thresholds, result.batches) == (5, 6, 5)
+    assert [call[0] for call in session.calls] == [CYPHER_DELETE_STALE] * 3 + [
+        CYPHER_DELETE_ORPHAN_THRESHOLDS
+    ] * 2
+    assert session.calls[0][1] == {"cutoff": 5, "batch_size": 2}
+    # Readers saw these provisions closed already; no full reload is forced.
+    assert session.resets == 0
+    assert _deleted("provision") - provisions == 5
+    assert _deleted("threshold") - thresholds == 6
+
+
+def test_compact_archives_and_stops_at_max_batches():
+    session = FakeSession(stale=[(2, 0), (2, 0), (2, 0)], orphans=[0])
+    archived = _deleted("provision", "archived")
+
+    result = compact(session, cutoff=5, batch_size=2, archive=True, max_batches=2)
+
+    assert (result.provisions, result.batches) == (4, 2)
+    assert {call[0] for call in session.calls} == {CYPHER_ARCHIVE_STALE}
+    assert _deleted("provision", "archived") - archived == 4
@@ -0,0 +1,105 @@
+import csv
+import gzip
+import json
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("neo4j")
+pytest.importorskip("kafka")
+
+from app.export import edge_query, export_graph, iter_edges, iter_nodes, node_query
+
+
+class FakeSession:
+    """Answers keyset-paginated reads from in-memory nodes and edges."""
+
+    def __init__(self, nodes, edges):
+        self.nodes = nodes
+        self.edges = edges
+        self.reads = []
+
+    def execute_read(self, work):
+        return work(self)
+
+    def run(self, query, after, limit):
+        self.reads.append((query, after))
+        for label, rows in self.nodes.items():
+            if query == node_query(label):
+                key = "id" if label == "Document" else "pid"
+                page = sorted((r for r in rows if r[key] > after), key=lambda r: r[key])
+                return [{"row": r} for r in page[:limit]]
+        for rel, pairs in self.edges.items():
+            if query == edge_query(rel):
+                starts = sorted({s for s, _ in pairs if s > after})[:limit]
+                return [
+                    {"start": s, "ends": [e for x, e in pairs if x == s]}
+                    for s in starts
+                ]
+        return []
+
+
+def test_nodes_and_edges_are_read_in_keyset_pages():
+    docs = [{"id": f"d{i}"} for i in range(5)]
+    session = FakeSession(
+        {"Document": docs},
+        {"HAS_THRESHOLD": [("p1", "t1"), ("p1", "t2"), ("p2", "t3")]},
+    )
+
+    assert [r["id"] for r in iter_nodes(session, "Document", 2)] == [
+        "d0",
+        "d1",
+        "d2",
+        "d3",
+        "d4",
+    ]
+    assert [after for _, after in session.reads] == ["", "d1", "d3"]
+    assert list(iter_edges(session, "HAS_THRESHOLD", 1)) == [
+        ("p1", "t1"),
+        ("p1", "t2"),
+        ("p2", "t3"),
+    ]
+
+
+def test_export_writes_partitioned_gzip_csv_and_manifest(tmp_path):
+    provisions = [
+        {"pid": f"d0:{i}:{i + 1}", "text": "shall", "valid_to": None} for i in range(3)
+    ]
+    session = FakeSession(
+        {"Provision": provisions},
+        {"IN_DOCUMENT": [(p["pid"], "d0") for p in provisions]},
+    )
+
+    manifest = export_graph(session, tmp_path, "csv", page_size=2, rows_per_file=2)
+
+    assert manifest["nodes"]["Provision"] == {
+        "rows": 3,
+        "files": ["part-00000.csv.gz", "part-00001.csv.gz"],
+    }
+    assert manifest["nodes"]["Concept"] == {"rows": 0, "files": ["part-00000.csv.gz"]}
+    assert manifest["edges"]["IN_DOCUMENT"]["rows"] == 3
+    assert json.loads((tmp_path / "manifest.json").read_text()) == manifest
+
+    with gzip.open(tmp_path / "nodes/Provision/part-00001.csv.gz", "rt") as fh:
+        rows = list(csv.DictReader(fh))
+    assert [(r["pid"], r["text"], r["valid_to"]) for r in rows] == [
+        ("d0:2:3", "shall", "")
+    ]
+    with gzip.open(tmp_path / "edges/IN_DOCUMENT/part-00000.csv.gz", "rt") as fh:
+        assert next(csv.reader(fh)) == ["provision_pid", "document_id"]
+
+
+def test_parquet_export_round_trips(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    session = FakeSession({"Threshold": [{"pid": "t1", "value": 5.0}]}, {})
+
+    export_graph(session, tmp_path, "parquet")
+
+    table = pq.read_table(tmp_path / "nodes/Threshold/part-00000.parquet")
+    assert table.column("pid").to_pylist() == ["t1"]
+    assert table.schema.field("value").type.bit_width == 64
@@ -0,0 +1,188 @@
+import sys
+from pathlib import Path
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+
+import pytest
+
+pytest.importorskip("structlog")
+
+from graph_migrations import (
+    Migration,
+    Statement,
+    Step,
+    apply_on_startup,
+    explain_statements,
+    migrate,
+    scan_findings,
+)
+
+
+class FakeResult(list):
+    plan = None
+
+    def consume(self):
+        return self
+
+    def single(self):
+        return self[0] if self else None
+
+
+class FakeSession:
+    def __init__(self, applied=(), batches=(), documents=0):
+        self.applied = list(applied)
+        self.batches = list(batches)
+        self.documents = documents
+        self.statements = []
+
+    def run(self, statement, parameters=None, **params):
+        if statement.startswith("MATCH (m:SchemaMigration)"):
+            return FakeResult({"version": v} for v in self.applied)
+        if statement.startswith("MATCH (d:Document)"):
+            return FakeResult([{"d": {}}] * self.documents)
+        if statement.startswith("MERGE (m:SchemaMigration"):
+            self.applied.append(params["version"])
+        else:
+            self.statements.append(statement)
+        return FakeResult()
+
+    def execute_write(self, work):
+        return work(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+MIGRATIONS = (
+    Migration(1, "old", (Step("OLD"),)),
+    Migration(2, "data", (Step("DATA", batched=True),)),
+    Migration(3, "new", (Step("NEW"),)),
+)
+
+
+def test_migrate_applies_pending_versions_once():
+    session = FakeSession(applied=[1])
+    migrations = (MIGRATIONS[0], MIGRATIONS[2])
+    assert migrate(session, "graph", migrations) == [3]
+    assert session.statements == ["NEW"]
+    assert migrate(session, "graph", migrations) == []
+
+
+def test_batched_steps_repeat_until_nothing_changes():
+    counts = iter([3, 3, 1, 0])
+
+    class Session(FakeSession):
+        def run(self, statement, parameters=None, **params):
+            if statement == "BATCH":
+                assert params == {"batch_size": 3}
+                return FakeResult([{"n": next(counts)}])
+            return super().run(statement, **params)
+
+    session = Session()
+    batched = (Migration(1, "batched", (Step("BATCH", batched=True),)),)
+    migrate(session, "graph", batched, batch_size=3)
+    assert next(counts, None) is None
+    assert session.applied == [1]
+
+
+def test_startup_applies_schema_steps_past_a_pending_data_migration():
+    session = FakeSession(documents=1)
+    session.run = _count_batches(session.run)
+    migrations = (
+        MIGRATIONS[0],
+        Migration(
+            2,
+            "data",
+            (
+                Step("CREATE INDEX data IF NOT EXISTS FOR (n:N) ON (n.x)"),
+                Step("DATA", batched=True),
+                Step("MERGE (g:Group)"),
+            ),
+        ),
+        MIGRATIONS[2],
+    )
+    original = session.run
+    checked = []
+
+    def run(statement, parameters=None, **params):
+        if statement == "DATA" and not checked:
+            # The data migration waits for the rest of startup.
+            checked.append(list(session.applied))
+        return original(statement, parameters, **params)
+
+    session.run = run
+    thread = apply_on_startup(lambda: session, "graph", migrations)
+    assert thread is not None
+    thread.join(timeout=5)
+    assert checked == [[1, 3]]
+    assert session.statements == [
+        "OLD",
+        "CREATE INDEX data IF NOT EXISTS FOR (n:N) ON (n.x)",
+        "NEW",
+        "CREATE INDEX data IF NOT EXISTS FOR (n:N) ON (n.x)",
+        "MERGE (g:Group)",
+    ]
+    assert session.applied == [1, 3, 2]
+
+
+def test_startup_applies_data_migrations_on_an_empty_graph():
+    session = FakeSession()
+    session.run = _count_batches(session.run)
+    assert apply_on_startup(lambda: session, "graph", MIGRATIONS) is None
+    assert session.applied == [1, 2, 3]
+
+
+def _count_batches(run):
+    def wrapped(statement, parameters=None, **params):
+        if statement == "DATA":
+            return FakeResult([{"n": 0}])
+        return run(statement, parameters, **params)
+
+    return wrapped
+
+
+def _plan(operator, details="", *children):
+    return {
+        "operatorType": operator,
+        "args": {"Details": details},
+        "children": list(children),
+    }
+
+
+def test_scan_findings_flag_label_scans_outside_the_allow_list():
+    plan = _plan(
+        "ProduceResults@neo4j",
+        "",
+        _plan(
+            "CartesianProduct@neo4j",
+            "",
+            _plan("NodeByLabelScan@neo4j", "c:Concept"),
+            _plan("NodeByLabelScan@neo4j", "t2:Threshold"),
+            _plan("NodeIndexSeek@neo4j", "RANGE INDEX d:Document(created_at)"),
+        ),
+    )
+    findings = scan_findings("arbitrage", plan, allow_scans=("Concept",))
+    assert [(f.operator, f.details) for f in findings] == [
+        ("NodeByLabelScan", "t2:Threshold")
+    ]
+    assert scan_findings("empty", None) == []
+
+
+def test_explain_statements_prefixes_explain():
+    class Session:
+        queries = []
+
+        def run(self, query, params):
+            self.queries.append((query, params))
+            result = FakeResult()
+            result.plan = _plan("AllNodesScan@neo4j", "n")
+            return result
+
+    session = Session()
+    findings = explain_statements(session, {"q": Statement("MATCH (n) RETURN n")})
+    assert session.queries == [("EXPLAIN MATCH (n) RETURN n", {})]
+    assert [f.operator for f in findings] == ["AllNodesScan"]
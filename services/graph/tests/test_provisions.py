@@ -0,0 +1,123 @@
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+from app.provisions import (
+    as_table,
+    build_obligations,
+    collect_jurisdictions,
+    plan_changes,
+)
+
+ENTITIES = [
+    {
+        "type": "OBLIGATION",
+        "text": "Banks shall hold 5% of capital.",
+        "start": 0,
+        "end": 31,
+    },
+    {
+        "type": "THRESHOLD",
+        "text": "5%",
+        "start": 17,
+        "end": 19,
+        "attrs": {"value": 5.0, "unit": "%", "unit_normalized": "percent"},
+    },
+    {"type": "OBLIGATION", "text": "Firms must file.", "start": 32, "end": 48},
+    {
+        "type": "JURISDICTION",
+        "text": "EU",
+        "start": 50,
+        "end": 52,
+        "attrs": {"name": "EU"},
+    },
+    {
+        "type": "THRESHOLD",
+        "text": "30 days",
+        "start": 60,
+        "end": 67,
+        "attrs": {"value": None, "unit": "days", "unit_normalized": "days"},
+        "change": "new",
+    },
+]
+
+
+def test_entity_table_round_trips_dicts():
+    assert as_table(ENTITIES).to_dicts() == ENTITIES
+
+
+def test_build_obligations_attaches_contained_threshold():
+    table = as_table(ENTITIES)
+    assert collect_jurisdictions(table) == ["EU"]
+
+    first, second = build_obligations("doc-1", table)
+    assert first["pid"] == "doc-1:0:31"
+    assert first["thresholds"] == [
+        {
+            "pid": "doc-1:17:19",
+            "value": 5.0,
+            "unit": "%",
+            "unit_normalized": "percent",
+        }
+    ]
+    assert second["thresholds"] == []
+
+
+def test_build_obligations_keeps_every_contained_threshold():
+    entities = [
+        {"type": "THRESHOLD", "text": "10 days", "start": 40, "end": 47},
+        {"type": "OBLIGATION", "text": "x" * 60, "start": 0, "end": 60},
+        {"type": "THRESHOLD", "text": "5%", "start": 5, "end": 7},
+        {"type": "THRESHOLD", "text": "crosses end", "start": 55, "end": 70},
+        {"type": "OBLIGATION", "text": "y" * 10, "start": 38, "end": 48},
+    ]
+    outer, inner = build_obligations("d", as_table(entities))
+    assert [t["pid"] for t in outer["thresholds"]] == ["d:5:7", "d:40:47"]
+    assert [t["pid"] for t in inner["thresholds"]] == ["d:40:47"]
+
+
+def test_missing_jurisdictions_default_to_unknown():
+    assert collect_jurisdictions(as_table(ENTITIES[:2])) == ["Unknown"]
+
+
+def test_hash_covers_thresholds_and_jurisdictions():
+    table = as_table(ENTITIES)
+    base = build_obligations("doc-1", table, ["EU"])
+    assert build_obligations("doc-1", table, ["EU"]) == base
+    assert build_obligations("doc-1", table, ["US"])[0]["hash"] != base[0]["hash"]
+
+    moved = [dict(e) for e in ENTITIES]
+    moved[1]["attrs"] = {**moved[1]["attrs"], "value": 6.0}
+    changed = build_obligations("doc-1", as_table(moved), ["EU"])
+    assert changed[0]["hash"] != base[0]["hash"]
+    assert changed[1]["hash"] == base[1]["hash"]
+
+
+def test_plan_changes_splits_new_changed_and_removed():
+    first, second = build_obligations("doc-1", as_table(ENTITIES))
+    existing = {
+        first["pid"]: first["hash"],
+        second["pid"]: "stale",
+        "doc-1:90:99": "gone",
+    }
+    changed, removed, unchanged = plan_changes([first, second], existing)
+    assert changed == [second]
+    assert removed == ["doc-1:90:99"]
+    assert unchanged == 1
+
+
+def test_two_modal_sentence_counts_one_provision():
+    sentence = "Banks shall hold capital and must report it."
+    entities = [
+        {"type": "OBLIGATION", "text": sentence, "start": 0, "end": 44},
+        {"type": "OBLIGATION", "text": sentence, "start": 0, "end": 44},
+    ]
+    obligations = build_obligations("doc-1", as_table(entities))
+    assert [ob["pid"] for ob in obligations] == ["doc-1:0:44"]
+
+    stored = {"doc-1:0:44": obligations[0]["hash"]}
+    changed, removed, unchanged = plan_changes(obligations * 2, stored)
+    assert (changed, removed, unchanged) == ([], [], 1)
@@ -0,0 +1,154 @@
+import sys
+from pathlib import Path
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+
+from graph_store import SQLiteGraphStore
+
+
+def _obligation(doc_id, start, value, concept="capital", unit="percent", text=None):
+    end = start + 10
+    return {
+        "pid": f"{doc_id}:{start}:{end}",
+        "text": text or f"{doc_id} shall hold {value}",
+        "start": start,
+        "end": end,
+        "concept": concept,
+        "page": 1,
+        "hash": f"{doc_id}-{start}-{value}-{text}",
+        "thresholds": [
+            {
+                "pid": f"{doc_id}:{start + 1}:{start + 2}",
+                "value": value,
+                "unit": unit,
+                "unit_normalized": unit,
+            }
+        ],
+    }
+
+
+def _doc(doc_id, jurisdictions, *obligations):
+    return {
+        "doc_id": doc_id,
+        "source_url": f"s3://docs/{doc_id}",
+        "jurisdictions": list(jurisdictions),
+        "obligations": list(obligations),
+    }
+
+
+def test_write_documents_counts_changes_and_closes_removed_provisions():
+    store = SQLiteGraphStore(":memory:")
+    first = _doc("d1", ["US"], _obligation("d1", 0, 5.0), _obligation("d1", 50, 7.0))
+    assert store.write_documents([first]) == {
+        "new_or_changed": 2,
+        "unchanged": 0,
+        "removed": 0,
+    }
+
+    second = _doc("d1", ["US"], _obligation("d1", 0, 5.0), _obligation("d1", 90, 8.0))
+    assert store.write_documents([second]) == {
+        "new_or_changed": 1,
+        "unchanged": 1,
+        "removed": 1,
+    }
+    open_pids = [
+        row[0]
+        for row in store._conn.execute(
+            "SELECT pid FROM provisions WHERE valid_to IS NULL ORDER BY pid"
+        )
+    ]
+    assert open_pids == ["d1:0:10", "d1:90:100"]
+
+    # A provision that reappears is reopened.
+    store.write_documents([first])
+    closed = store._conn.execute(
+        "SELECT count(*) FROM provisions WHERE valid_to IS NOT NULL"
+    ).fetchone()[0]
+    assert closed == 1
+
+
+def test_arbitrage_and_gaps_match_the_neo4j_columns():
+    store = SQLiteGraphStore(":memory:")
+    store.write_documents(
+        [
+            _doc("us", ["US"], _obligation("us", 0, 5.0)),
+            _doc(
+                "eu",
+                ["EU"],
+                _obligation("eu", 0, 8.0),
+                _obligation("eu", 50, 1.0, concept="reporting", unit="days"),
+            ),
+        ]
+    )
+
+    rows = store.arbitrage(rel_delta=0.2, limit=10, j1="US", j2="EU")
+    assert [(r["doc_id_1"], r["v1"], r["doc_id_2"], r["v2"]) for r in rows] == [
+        ("us", 5.0, "eu", 8.0)
+    ]
+    assert rows[0]["unit"] == "percent"
+    assert rows[0]["end_1"] == 10
+    assert rows[0]["source_url_2"] == "s3://docs/eu"
+    assert store.arbitrage(rel_delta=0.2, limit=10, concept="Reporting") == []
+    assert store.arbitrage(rel_delta=0.2, limit=10, since=2**62) == []
+
+    gaps = store.gaps("EU", "US", limit=10)
+    assert [(g["concept"], g["doc_id"], g["end"]) for g in gaps] == [
+        ("reporting", "eu", 60)
+    ]
+    assert store.gaps("US", "EU", limit=10) == []
+
+
+def test_duplicate_pids_count_once_as_unchanged():
+    store = SQLiteGraphStore(":memory:")
+    obligation = _obligation("d1", 0, 5.0)
+    store.write_documents([_doc("d1", ["US"], obligation)])
+    # A sentence with two modal verbs yields two obligations with one pid.
+    assert store.write_documents([_doc("d1", ["US"], obligation, obligation)]) == {
+        "new_or_changed": 0,
+        "unchanged": 1,
+        "removed": 0,
+    }
+
+
+def test_reads_skip_closed_provisions():
+    store = SQLiteGraphStore(":memory:")
+    store.write_documents(
+        [
+            _doc("us", ["US"], _obligation("us", 0, 5.0)),
+            _doc("eu", ["EU"], _obligation("eu", 0, 8.0)),
+        ]
+    )
+    version = store.version()
+    assert store.write_documents([_doc("eu", ["EU"])])["removed"] == 1
+
+    assert store.arbitrage(rel_delta=0.2, limit=10) == []
+    assert store.coverage() == [{"jurisdiction": "US", "concept": "capital"}]
+    assert store.gaps("US", "EU", limit=10)[0]["doc_id"] == "us"
+    assert [p["pid"] for p in store.changes(None).provisions] == ["us:0:10"]
+
+    [closed] = store.changes(version).provisions
+    assert closed["pid"] == "eu:0:10"
+    assert closed["valid_to"] is not None
+
+
+def test_file_store_creates_its_directory(tmp_path):
+    path = tmp_path / "data" / "graph.sqlite3"
+    store = SQLiteGraphStore(str(path))
+    store.write_documents([_doc("d1", ["US"], _obligation("d1", 0, 5.0))])
+    store.close()
+    assert SQLiteGraphStore(str(path)).version() == 1
+
+
+def test_amendment_replaces_concept_and_jurisdictions():
+    store = SQLiteGraphStore(":memory:")
+    store.write_documents([_doc("d1", ["US"], _obligation("d1", 0, 5.0))])
+
+    amended = _obligation("d1", 0, 5.0, concept="leverage", text="amended")
+    store.write_documents([_doc("d1", ["EU"], amended)])
+
+    assert store.coverage() == [{"jurisdiction": "EU", "concept": "leverage"}]
+    assert store.gaps("US", "EU", limit=10) == []
+    [provision] = store.changes(None).provisions
+    assert provision["jurisdictions"] == ["EU"]
+    assert provision["entries"][0]["concept"] == "leverage"
@@ -27,8 +27,21 @@ class Settings(BaseSettings):
     kafka_topic_normalized: str = Field(
         default="ingest.normalized", alias="KAFKA_TOPIC_NORMALIZED"
     )
+    bulk_lane_min_bytes: int = Field(
+        default=2 * 1024 * 1024, ge=0, alias="BULK_LANE_MIN_BYTES"
+    )
+    bulk_lane_min_pages: int = Field(default=100, ge=0, alias="BULK_LANE_MIN_PAGES")
+    bulk_lane_engines: str = Field(default="tesseract", alias="BULK_LANE_ENGINES")
+    event_wire_format: str = Field(default="json", alias="EVENT_WIRE_FORMAT")
+    kafka_compression_type: str = Field(default="none", alias="KAFKA_COMPRESSION_TYPE")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     api_key: str | None = Field(default=None, alias="API_KEY")
+    schema_validation_sample_rate: int = Field(
+        default=100, ge=0, alias="SCHEMA_VALIDATION_SAMPLE_RATE"
+    )
+    schema_validation_warmup: int = Field(
+        default=1_000, ge=0, alias="SCHEMA_VALIDATION_WARMUP"
+    )
 
 
 @lru_cache(maxsize=1)
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
-import json
+import sys
 from functools import lru_cache
+from pathlib import Path
 from typing import Optional
 
 import structlog
@@ -11,6 +12,10 @@ from fastapi import HTTPException
 from kafka import KafkaProducer
 from kafka.errors import KafkaTimeoutError
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from wire_format import compression_type, encode_event, resolve_format
+
 from .config import get_settings
 
 logger = structlog.get_logger("kafka_utils")
@@ -24,7 +29,7 @@ def get_producer() -> KafkaProducer:
     return KafkaProducer(
         bootstrap_servers=settings.kafka_bootstrap_servers,
         key_serializer=_serialize_key,
-        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        compression_type=compression_type(settings.kafka_compression_type),
         linger_ms=50,
         retries=5,
         acks="all",
@@ -43,7 +48,10 @@ def send(topic: str, payload: dict, key: Optional[str] = None) -> None:
     """Send a message to Kafka."""
 
     producer = get_producer()
-    future = producer.send(topic, key=key, value=payload)
+    value, headers = encode_event(
+        payload, resolve_format(get_settings().event_wire_format)
+    )
+    future = producer.send(topic, key=key, value=value, headers=headers)
     try:
         remaining = producer.flush(timeout=1.0)
         if remaining > 0:
@@ -60,3 +60,4 @@ class NormalizedEvent(BaseModel):
     normalized_s3_path: str
     timestamp: datetime
     content_sha256: str
+    lane: str = "standard"
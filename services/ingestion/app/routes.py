@@ -2,13 +2,14 @@
 
 from __future__ import annotations
 
-import json
+import codecs
 import logging
 import socket
 import sys
 import time
 import uuid
 from datetime import datetime, timezone
+from functools import lru_cache
 from ipaddress import ip_address, ip_network
 from pathlib import Path
 from typing import Iterable
@@ -24,6 +25,13 @@ from requests import Response
 # Add shared module to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
 from auth import APIKey, require_api_key
+from json_codec import loads
+from lanes import classify, lane_topic, parse_engines
+from schema_validation import (
+    SampledValidator,
+    SchemaValidationError,
+    sampled_validator,
+)
 
 from .config import get_settings
 from .kafka_utils import send
@@ -100,8 +108,8 @@ def ingest_url(
         raw_json = None
         if "json" in content_type.lower():
             try:
-                raw_json = response.json()
-            except json.JSONDecodeError as exc:  # pragma: no cover - network dependent
+                raw_json = _parse_json(response, raw_bytes)
+            except ValueError as exc:  # pragma: no cover - network dependent
                 logger.error("failed_to_parse_json", url=payload.url, error=str(exc))
                 raise HTTPException(
                     status_code=422, detail="Response is not valid JSON"
@@ -144,19 +152,28 @@ def ingest_url(
             normalized_s3_path=normalized_uri,
             timestamp=timestamp,
             content_sha256=content_hash,
+            lane=_lane_for(normalized),
         )
 
-        send(
-            settings.kafka_topic_normalized,
-            event.model_dump(mode="json"),
-            key=f"{document_id}:{content_hash}",
-        )
+        event_payload = event.model_dump(mode="json")
+        try:
+            _event_validator()(event_payload)
+        except SchemaValidationError as exc:
+            logger.error(
+                "normalized_event_invalid", document_id=document_id, error=str(exc)
+            )
+            raise HTTPException(
+                status_code=500, detail="Normalized event failed schema validation"
+            ) from exc
+        topic = lane_topic(settings.kafka_topic_normalized, event.lane)
+        send(topic, event_payload, key=f"{document_id}:{content_hash}")
         logger.info(
             "normalized_event_emitted",
             document_id=document_id,
             content_sha256=content_hash,
+            lane=event.lane,
         )
-        KAFKA_COUNTER.labels(topic=settings.kafka_topic_normalized).inc()
+        KAFKA_COUNTER.labels(topic=topic).inc()
         REQUEST_COUNTER.labels(endpoint=endpoint, status="200").inc()
         REQUEST_LATENCY.labels(endpoint=endpoint).observe(
             time.perf_counter() - start_time
@@ -177,6 +194,32 @@ def ingest_url(
         raise HTTPException(status_code=500, detail="Ingestion failed") from exc
 
 
+def _lane_for(normalized: dict) -> str:
+    """Route large, many-page or OCR documents to the bulk lane."""
+
+    settings = get_settings()
+    pages = max((entry.page for entry in normalized["position_map"] or ()), default=1)
+    extraction = normalized["text_extraction"]
+    return classify(
+        len(normalized["text"].encode("utf-8")),
+        pages,
+        extraction.engine if extraction else None,
+        min_bytes=settings.bulk_lane_min_bytes,
+        min_pages=settings.bulk_lane_min_pages,
+        bulk_engines=parse_engines(settings.bulk_lane_engines),
+    )
+
+
+@lru_cache(maxsize=1)
+def _event_validator() -> SampledValidator:
+    settings = get_settings()
+    return sampled_validator(
+        "ingest.normalized",
+        sample_rate=settings.schema_validation_sample_rate,
+        warmup=settings.schema_validation_warmup,
+    )
+
+
 def _fetch(url: str) -> Response:
     parsed = urlparse(url)
     host = parsed.hostname
@@ -268,6 +311,22 @@ def _resolve_and_validate(host: str) -> set[str]:
     return addresses
 
 
+def _parse_json(response: Response, raw_bytes: bytes):
+    """Parse a JSON body, decoding it first if it declares a non-UTF-8 charset.
+
+    Raises ``ValueError`` for invalid JSON and for bytes that do not match the
+    charset.
+    """
+
+    try:
+        encoding = codecs.lookup(response.encoding or "utf-8").name
+    except LookupError:
+        encoding = "utf-8"
+    if encoding != "utf-8":
+        return loads(raw_bytes.decode(encoding))
+    return loads(raw_bytes)
+
+
 def _enforce_size_limit(raw_bytes: bytes) -> None:
     if len(raw_bytes) > MAX_PAYLOAD_BYTES:
         raise HTTPException(status_code=413, detail="Payload exceeds size limits")
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
-import json
+import sys
 from datetime import datetime
+from pathlib import Path
 from typing import Any
 
 import boto3
@@ -12,6 +13,10 @@ from botocore.client import BaseClient
 from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import HTTPException
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from json_codec import dumps
+
 from .config import get_settings
 
 logger = structlog.get_logger("s3_utils")
@@ -36,7 +41,7 @@ def put_json(bucket: str, key: str, payload: Any) -> str:
     """
 
     try:
-        body = json.dumps(payload, default=_json_serializer).encode("utf-8")
+        body = dumps(payload, default=_json_serializer)
         _client().put_object(Bucket=bucket, Key=key, Body=body)
         return f"s3://{bucket}/{key}"
     except (ClientError, BotoCoreError) as exc:
@@ -3,12 +3,18 @@
 from __future__ import annotations
 
 import logging
+import sys
+from pathlib import Path
 
 import structlog
 from app.config import get_settings
 from app.routes import router
 from fastapi import FastAPI
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "shared"))
+from json_codec import FastJSONResponse
+
 
 def _configure_logging(level: str) -> None:
     structlog.configure(
@@ -29,5 +35,9 @@ def _configure_logging(level: str) -> None:
 settings = get_settings()
 _configure_logging(settings.log_level)
 
-app = FastAPI(title="Ingestion Service", version="0.2.0")
+app = FastAPI(
+    title="Ingestion Service",
+    version="0.2.0",
+    default_response_class=FastJSONResponse,
+)
 app.include_router(router)
@@ -0,0 +1,44 @@
+"""JSON bodies fetched by the ingestion service."""
+
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.routes import _parse_json
+from requests import Response
+
+
+def _response(body: bytes, encoding):
+    response = Response()
+    response._content = body
+    response.encoding = encoding
+    return response
+
+
+@pytest.mark.parametrize("encoding", ["latin-1", "utf-16", "cp1252"])
+def test_declared_charset_is_honoured(encoding):
+    body = '{"title": "Règlement général"}'.encode(encoding)
+    response = _response(body, encoding)
+    assert _parse_json(response, body) == {"title": "Règlement général"}
+
+
+@pytest.mark.parametrize("encoding", [None, "UTF-8", "utf8", "no-such-charset"])
+def test_utf8_bodies_are_parsed_from_bytes(encoding):
+    body = '{"title": "Règlement général"}'.encode("utf-8")
+    response = _response(body, encoding)
+    assert _parse_json(response, body) == {"title": "Règlement général"}
+
+
+def test_body_not_matching_its_charset_is_rejected():
+    body = b'{"title": "\xff\xfe\xfa"}'
+    with pytest.raises(ValueError):
+        _parse_json(_response(body, "utf-16"), body)
+    with pytest.raises(ValueError):
+        _parse_json(_response(body, "utf-8"), body)
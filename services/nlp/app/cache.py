@@ -0,0 +1,106 @@
+"""Persistent extraction result cache.
+
+Results are keyed by ``(content_sha256, EXTRACTOR_VERSION)``. Replays,
+consumer-group resets and identical re-publishes then skip both the S3 read
+and the extraction. Bumping ``EXTRACTOR_VERSION`` moves lookups to a fresh
+namespace, so stale entries are never served.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional, Protocol
+
+import structlog
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from json_codec import dumps, loads
+
+from .config import get_settings
+from .extractor import EXTRACTOR_VERSION
+from .s3_utils import get_bytes_if_exists, put_bytes
+
+logger = structlog.get_logger("nlp-cache")
+
+
+class ExtractionCache(Protocol):
+    def get(self, content_sha256: str) -> Optional[dict]: ...
+
+    def put(self, content_sha256: str, result: dict) -> None: ...
+
+
+class NullCache:
+    def get(self, content_sha256: str) -> Optional[dict]:
+        return None
+
+    def put(self, content_sha256: str, result: dict) -> None:
+        return None
+
+
+class DiskCache:
+    """Cache entries stored as JSON files under a versioned directory."""
+
+    def __init__(self, root: str, version: str = EXTRACTOR_VERSION) -> None:
+        self._root = Path(root) / f"v{version}"
+
+    def _path(self, content_sha256: str) -> Path:
+        return self._root / content_sha256[:2] / f"{content_sha256}.json"
+
+    def get(self, content_sha256: str) -> Optional[dict]:
+        try:
+            return loads(self._path(content_sha256).read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("cache_read_failed", sha=content_sha256, error=str(exc))
+            return None
+
+    def put(self, content_sha256: str, result: dict) -> None:
+        path = self._path(content_sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(dumps(result))
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("cache_write_failed", sha=content_sha256, error=str(exc))
+            Path(tmp).unlink(missing_ok=True)
+
+
+class S3Cache:
+    """Cache entries stored in the processed bucket under a versioned prefix."""
+
+    def __init__(
+        self, bucket: str, prefix: str, version: str = EXTRACTOR_VERSION
+    ) -> None:
+        self._bucket = bucket
+        self._prefix = f"{prefix.rstrip('/')}/v{version}"
+
+    def _key(self, content_sha256: str) -> str:
+        return f"{self._prefix}/{content_sha256}.json"
+
+    def get(self, content_sha256: str) -> Optional[dict]:
+        body = get_bytes_if_exists(self._bucket, self._key(content_sha256))
+        return loads(body) if body is not None else None
+
+    def put(self, content_sha256: str, result: dict) -> None:
+        put_bytes(
+            self._bucket,
+            self._key(content_sha256),
+            dumps(result),
+        )
+
+
+def build_cache() -> ExtractionCache:
+    settings = get_settings()
+    backend = settings.extraction_cache_backend.lower()
+    if backend == "disk":
+        return DiskCache(settings.extraction_cache_dir)
+    if backend == "s3":
+        return S3Cache(settings.processed_bucket, settings.extraction_cache_prefix)
+    return NullCache()
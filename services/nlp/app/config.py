@@ -19,7 +19,49 @@ class Settings(BaseSettings):
     )
     topic_in: str = Field(default="ingest.normalized", alias="KAFKA_TOPIC_NORMALIZED")
     topic_out: str = Field(default="nlp.extracted", alias="KAFKA_TOPIC_NLP")
+    event_wire_format: str = Field(default="json", alias="EVENT_WIRE_FORMAT")
+    kafka_compression_type: str = Field(default="none", alias="KAFKA_COMPRESSION_TYPE")
+    retry_delays_ms: str = Field(default="5000,60000,600000", alias="RETRY_DELAYS_MS")
+    exactly_once: bool = Field(default=False, alias="NLP_EXACTLY_ONCE")
+    # Ids are <prefix>-<host name>-<worker>; every replica needs a distinct,
+    # stable host name (e.g. StatefulSet pods) or replicas fence each other.
+    transactional_id_prefix: str = Field(
+        default="nlp-service", alias="NLP_TRANSACTIONAL_ID_PREFIX"
+    )
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    consumer_mode: str = Field(default="thread", alias="CONSUMER_MODE")
+    consumer_workers: int = Field(default=1, ge=1, alias="CONSUMER_WORKERS")
+    bulk_consumer_workers: int = Field(default=1, ge=0, alias="BULK_CONSUMER_WORKERS")
+    extraction_cache_backend: str = Field(
+        default="disk", alias="EXTRACTION_CACHE_BACKEND"
+    )
+    extraction_cache_dir: str = Field(
+        default="/tmp/nlp-extraction-cache", alias="EXTRACTION_CACHE_DIR"
+    )
+    extraction_cache_prefix: str = Field(
+        default="extraction-cache", alias="EXTRACTION_CACHE_PREFIX"
+    )
+    incremental_extraction: bool = Field(default=True, alias="INCREMENTAL_EXTRACTION")
+    nlp_state_prefix: str = Field(default="nlp/state", alias="NLP_STATE_PREFIX")
+    incremental_max_bytes: int = Field(
+        default=16 * 1024 * 1024, alias="INCREMENTAL_MAX_BYTES"
+    )
+    extraction_window_chars: int = Field(
+        default=1_000_000, alias="EXTRACTION_WINDOW_CHARS"
+    )
+    extraction_window_overlap: int = Field(
+        default=8_192, alias="EXTRACTION_WINDOW_OVERLAP"
+    )
+    claim_check_threshold_bytes: int = Field(
+        default=512 * 1024, ge=0, alias="CLAIM_CHECK_THRESHOLD_BYTES"
+    )
+    claim_check_prefix: str = Field(default="nlp/claims", alias="CLAIM_CHECK_PREFIX")
+    schema_validation_sample_rate: int = Field(
+        default=100, ge=0, alias="SCHEMA_VALIDATION_SAMPLE_RATE"
+    )
+    schema_validation_warmup: int = Field(
+        default=1_000, ge=0, alias="SCHEMA_VALIDATION_WARMUP"
+    )
 
 
 @lru_cache(maxsize=1)
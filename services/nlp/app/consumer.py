@@ -1,25 +1,64 @@
 from __future__ import annotations
 
-import json
+import os
+import socket
+import sys
 import threading
 import uuid
 from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
+from typing import Any, Callable
 
 import structlog
-from jsonschema import Draft7Validator, ValidationError
 from kafka import KafkaConsumer, KafkaProducer
 from kafka.admin import KafkaAdminClient, NewTopic
 from kafka.errors import KafkaTimeoutError, TopicAlreadyExistsError
 from prometheus_client import Counter
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from claim_check import claim_key, make_pointer
+from json_codec import loads
+from lanes import STANDARD, lane_group, lane_topic
+from retry_ladder import DelayGate, RecordCommitter, RetryLadder, parse_delays
+from schema_validation import SampledValidator, SchemaValidationError, sampled_validator
+from wire_format import (
+    compression_type,
+    decode_event,
+    encode_event,
+    resolve_format,
+)
+from worker_supervisor import WORKER_ID_ENV
+
+from .cache import ExtractionCache, build_cache
 from .config import settings
-from .extractor import extract_entities
-from .s3_utils import get_bytes
+from .extractor import EntityTable, extract_table_windowed
+from .incremental import (
+    DocumentStateStore,
+    build_state_store,
+    reextract,
+    strip_change_markers,
+)
+from .s3_utils import get_bytes, open_stream, put_bytes
+from .streaming import NormalizedDocumentReader
 
 logger = structlog.get_logger("nlp-consumer")
 
 MESSAGES_COUNTER = Counter("nlp_messages_total", "NLP messages processed", ["status"])
+CACHE_COUNTER = Counter(
+    "nlp_extraction_cache_total", "Extraction cache lookups", ["result"]
+)
+INCREMENTAL_CHARS = Counter(
+    "nlp_incremental_reextracted_chars_total",
+    "Characters re-extracted for amended document versions",
+)
+CLAIM_CHECK_COUNTER = Counter(
+    "nlp_claim_checked_events_total",
+    "Output events whose entities were offloaded to the processed bucket",
+)
+
+GROUP_ID = "nlp-service"
 
 _shutdown_event = threading.Event()
 
@@ -28,11 +67,123 @@ def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _load_schema() -> Draft7Validator:
-    repo_root = Path(__file__).resolve().parents[3]
-    schema_path = repo_root / "data-schemas" / "events" / "nlp.extracted.schema.json"
-    schema = json.loads(schema_path.read_text())
-    return Draft7Validator(schema)
+def _load_schema() -> SampledValidator:
+    return sampled_validator(
+        "nlp.extracted",
+        sample_rate=settings.schema_validation_sample_rate,
+        warmup=settings.schema_validation_warmup,
+    )
+
+
+def _content_sha(evt: dict, key: bytes | None) -> str | None:
+    if evt.get("content_sha256"):
+        return evt["content_sha256"]
+    # Event keys are "<document_id>:<content_sha256>"
+    if key:
+        _, _, sha = key.decode("utf-8", errors="ignore").rpartition(":")
+        return sha or None
+    return None
+
+
+def _split_s3_path(path: str) -> tuple[str, str]:
+    _, _, bucket_key = path.partition("s3://")
+    bucket, _, key = bucket_key.partition("/")
+    return bucket, key
+
+
+def _load_text(path: str) -> tuple[str, str | None]:
+    payload = loads(get_bytes(*_split_s3_path(path)))
+    return payload.get("text", ""), payload.get("source_url")
+
+
+def _stream_extract(body) -> tuple[EntityTable, str | None]:
+    reader = NormalizedDocumentReader(body)
+    table = extract_table_windowed(
+        reader.iter_text(),
+        window_chars=settings.extraction_window_chars,
+        overlap_chars=settings.extraction_window_overlap,
+    )
+    return table, reader.fields.get("source_url")
+
+
+def _extract_for_event(
+    evt: dict,
+    content_sha: str | None,
+    cache: ExtractionCache,
+    state_store: DocumentStateStore | None,
+) -> tuple[dict, bool]:
+    """Return the extraction fields of the output event.
+
+    The flag reports whether the document state should be refreshed, which is
+    only needed when extraction actually ran.
+    """
+
+    cached = cache.get(content_sha) if content_sha else None
+    if cached is not None:
+        CACHE_COUNTER.labels(result="hit").inc()
+        return {
+            "source_url": evt.get("source_url") or cached.get("source_url"),
+            "entities": cached["entities"],
+        }, False
+
+    CACHE_COUNTER.labels(result="miss").inc()
+    body, size = open_stream(*_split_s3_path(evt["normalized_s3_path"]))
+    state = state_store.get(evt["document_id"]) if state_store else None
+    old_text = None
+    if (
+        state
+        and state.get("content_sha256") != content_sha
+        and size <= settings.incremental_max_bytes
+    ):
+        try:
+            old_text, _ = _load_text(state["normalized_s3_path"])
+        except Exception as exc:  # pragma: no cover - requires infra
+            logger.warning(
+                "nlp_previous_version_unavailable",
+                document_id=evt["document_id"],
+                error=str(exc),
+            )
+
+    fields: dict = {}
+    if old_text is not None:
+        payload = loads(body.read())
+        fields["source_url"] = payload.get("source_url")
+        result = reextract(old_text, payload.get("text", ""), state["entities"])
+        INCREMENTAL_CHARS.inc(result.reextracted_chars)
+        fields["entities"] = result.entities
+        fields["removed_entities"] = result.removed
+        fields["base_content_sha256"] = state.get("content_sha256")
+        plain = strip_change_markers(result.entities)
+    else:
+        # Large or first-seen documents are streamed straight off S3; the
+        # compact table is only expanded to dicts for the outgoing event.
+        table, fields["source_url"] = _stream_extract(body)
+        fields["entities"] = plain = table.to_dicts()
+    if content_sha:
+        cache.put(content_sha, {"source_url": fields["source_url"], "entities": plain})
+    return fields, True
+
+
+def _claim_check(
+    out: dict, value: bytes, headers: list, wire_format: str
+) -> tuple[bytes, list]:
+    """Offload the entity lists of an oversized event to the processed bucket."""
+
+    threshold = settings.claim_check_threshold_bytes
+    if not threshold or len(value) <= threshold:
+        return value, headers
+    bucket = settings.processed_bucket
+    key = claim_key(settings.claim_check_prefix, out["document_id"], out["event_id"])
+    pointer, payload = make_pointer(out, f"s3://{bucket}/{key}")
+    put_bytes(bucket, key, payload)
+    CLAIM_CHECK_COUNTER.inc()
+    logger.info(
+        "nlp_claim_checked",
+        document_id=out["document_id"],
+        event_bytes=len(value),
+        payload_bytes=len(payload),
+    )
+    return encode_event(pointer, wire_format)
 
 
 def _ensure_topic(topic: str) -> None:
@@ -56,84 +207,213 @@ def stop_consumer() -> None:
     _shutdown_event.set()
 
 
-def run_consumer() -> None:
-    _ensure_topic(settings.topic_out)
+def _save_state(
+    state_store: DocumentStateStore,
+    doc_id: str,
+    content_sha: str | None,
+    norm_path: str,
+    source_url: str | None,
+    entities: list,
+) -> None:
+    try:
+        state_store.put(doc_id, content_sha, norm_path, source_url, entities)
+    except Exception as exc:  # pragma: no cover - infra
+        logger.warning("nlp_state_write_failed", document_id=doc_id, error=str(exc))
+
+
+def _process_event(
+    evt: dict,
+    record,
+    *,
+    producer: KafkaProducer,
+    validator: SampledValidator,
+    wire_format: str,
+    cache: ExtractionCache,
+    state_store: DocumentStateStore | None,
+    lane: str = STANDARD,
+) -> Callable[[], None] | None:
+    """Extract one document and send its output event.
+
+    Returns the write of the document state, to run once the record is
+    committed: state saved for an aborted attempt would make the retry diff
+    against a version whose output was never published.
+    """
+
+    doc_id = evt["document_id"]
+    norm_path = evt["normalized_s3_path"]
+    content_sha = _content_sha(evt, record.key)
+    fields, refresh_state = _extract_for_event(evt, content_sha, cache, state_store)
+    entities = fields["entities"]
+    out = {
+        "event_id": str(uuid.uuid4()),
+        "document_id": doc_id,
+        "timestamp": _now_iso(),
+        "lane": lane,
+        **fields,
+    }
+    validator(out)
+    value, headers = _claim_check(out, *encode_event(out, wire_format), wire_format)
+    producer.send(
+        lane_topic(settings.topic_out, lane), key=doc_id, value=value, headers=headers
+    )
+    remaining = producer.flush(timeout=1.0)
+    if remaining > 0:
+        raise KafkaTimeoutError(f"{remaining} messages not flushed")
+    logger.info("nlp_extracted", document_id=doc_id, entity_count=len(entities))
+    if not refresh_state or state_store is None:
+        return None
+    return partial(
+        _save_state,
+        state_store,
+        doc_id,
+        content_sha,
+        norm_path,
+        out["source_url"],
+        strip_change_markers(entities),
+    )
+
+
+def _commit(committer: RecordCommitter, record) -> bool:
+    try:
+        committer.commit(record)
+    except Exception as exc:  # pragma: no cover - requires infra
+        logger.exception("nlp_commit_failed", offset=record.offset, error=str(exc))
+        committer.abort()
+        return False
+    return True
+
+
+def _route_failure(
+    committer: RecordCommitter,
+    ladder: RetryLadder,
+    record,
+    error: Exception,
+    permanent: bool,
+) -> bool:
+    """Move a failed record down the retry ladder; return whether it was committed."""
+
+    MESSAGES_COUNTER.labels(status="invalid" if permanent else "error").inc()
+    try:
+        # Drop any output of the failed attempt before copying the record on.
+        committer.restart()
+        ladder.route(committer.producer, record, error, permanent=permanent)
+    except Exception as exc:  # pragma: no cover - requires infra
+        logger.exception("nlp_retry_route_failed", offset=record.offset, error=str(exc))
+        committer.abort()
+        return False
+    return _commit(committer, record)
+
+
+def _consume_record(
+    record,
+    committer: RecordCommitter,
+    ladder: RetryLadder,
+    process: Callable[[dict, Any], Callable[[], None] | None],
+) -> bool:
+    """Handle one record inside an open transaction; return whether it was committed.
+
+    Whatever ``process`` returns runs after the commit.
+    """
+
+    try:
+        evt = decode_event(record.value, record.headers)
+    except ValueError as exc:
+        logger.error("nlp_undecodable_event", offset=record.offset, error=str(exc))
+        return _route_failure(committer, ladder, record, exc, permanent=True)
+    doc_id = evt.get("document_id")
+    if not (doc_id and evt.get("normalized_s3_path")):
+        logger.warning("skipping_event_missing_keys", event=evt)
+        MESSAGES_COUNTER.labels(status="skipped").inc()
+        return _commit(committer, record)
+
+    try:
+        after_commit = process(evt, record)
+    except SchemaValidationError as exc:
+        logger.error("nlp_validation_error", document_id=doc_id, error=str(exc))
+        return _route_failure(committer, ladder, record, exc, permanent=True)
+    except Exception as exc:
+        logger.exception("nlp_processing_error", document_id=doc_id, error=str(exc))
+        return _route_failure(committer, ladder, record, exc, permanent=False)
+    if not _commit(committer, record):
+        return False
+    MESSAGES_COUNTER.labels(status="success").inc()
+    if after_commit is not None:
+        after_commit()
+    return True
+
+
+def _transactional_id() -> str:
+    """Transactional id unique to this replica's worker.
+
+    Worker names repeat in every replica, so the id includes the host name
+    (the pod or container name); replicas sharing an id would fence each
+    other's producers.
+    """
+
+    worker = os.environ.get(WORKER_ID_ENV) or threading.current_thread().name
+    return f"{settings.transactional_id_prefix}-{socket.gethostname()}-{worker}"
+
+
+def run_consumer(lane: str = STANDARD) -> None:
+    """Consume one priority lane until :func:`stop_consumer` is called."""
+
+    group_id = lane_group(GROUP_ID, lane)
+    ladder = RetryLadder(
+        lane_topic(settings.topic_in, lane), parse_delays(settings.retry_delays_ms)
+    )
+    for topic in [ladder.topic, lane_topic(settings.topic_out, lane), *ladder.topics]:
+        _ensure_topic(topic)
     consumer = KafkaConsumer(
-        settings.topic_in,
+        *ladder.source_topics,
         bootstrap_servers=settings.kafka_bootstrap,
-        value_deserializer=lambda v: json.loads(v.decode("utf-8")),
         enable_auto_commit=False,
         auto_offset_reset="earliest",
-        group_id="nlp-service",
+        group_id=group_id,
+        isolation_level="read_committed",
     )
+    producer_options = {}
+    if settings.exactly_once:
+        producer_options = {
+            "transactional_id": _transactional_id(),
+            "enable_idempotence": True,
+        }
     producer = KafkaProducer(
         bootstrap_servers=settings.kafka_bootstrap,
-        key_serializer=lambda v: v.encode("utf-8"),
-        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        key_serializer=lambda v: v if isinstance(v, bytes) else v.encode("utf-8"),
+        compression_type=compression_type(settings.kafka_compression_type),
         linger_ms=50,
         retries=5,
         acks="all",
+        **producer_options,
     )
-
-    validator = _load_schema()
+    committer = RecordCommitter(
+        consumer, producer, group_id, transactional=settings.exactly_once
+    )
+    process = partial(
+        _process_event,
+        producer=producer,
+        validator=_load_schema(),
+        wire_format=resolve_format(settings.event_wire_format),
+        cache=build_cache(),
+        state_store=build_state_store(),
+        lane=lane,
+    )
+    gate = DelayGate()
 
     while not _shutdown_event.is_set():
+        gate.release_due(consumer)
         message = consumer.poll(timeout_ms=500)
         if not message:
             continue
-        for records in message.values():
+        for tp, records in message.items():
             for record in records:
-                evt = record.value
-                doc_id = evt.get("document_id")
-                norm_path = evt.get("normalized_s3_path")
-                if not (doc_id and norm_path):
-                    logger.warning("skipping_event_missing_keys", event=evt)
-                    MESSAGES_COUNTER.labels(status="skipped").inc()
-                    consumer.commit()
-                    continue
-
-                _, _, bucket_key = norm_path.partition("s3://")
-                bucket, _, key = bucket_key.partition("/")
-
-                try:
-                    payload = json.loads(get_bytes(bucket, key))
-                    text = payload.get("text", "")[:2_000_000]
-                    source_url = payload.get("source_url")
-                    entities = extract_entities(text)
-                    out = {
-                        "event_id": str(uuid.uuid4()),
-                        "document_id": doc_id,
-                        "source_url": source_url,
-                        "timestamp": _now_iso(),
-                        "entities": entities,
-                    }
-                    validator.validate(out)
-                    producer.send(settings.topic_out, key=doc_id, value=out)
-                    remaining = producer.flush(timeout=1.0)
-                    if remaining > 0:
-                        logger.error(
-                            "kafka_flush_incomplete",
-                            remaining=remaining,
-                            document_id=doc_id,
-                        )
-                        MESSAGES_COUNTER.labels(status="error").inc()
-                        continue
-                    logger.info(
-                        "nlp_extracted", document_id=doc_id, entity_count=len(entities)
-                    )
-                    MESSAGES_COUNTER.labels(status="success").inc()
-                    consumer.commit()
-                except (ValidationError, KafkaTimeoutError) as exc:
-                    logger.error(
-                        "nlp_validation_or_kafka_error",
-                        document_id=doc_id,
-                        error=str(exc),
-                    )
-                    MESSAGES_COUNTER.labels(status="error").inc()
-                except Exception as exc:  # pragma: no cover - requires infra
-                    logger.exception(
-                        "nlp_processing_error", document_id=doc_id, error=str(exc)
-                    )
-                    MESSAGES_COUNTER.labels(status="error").inc()
+                if gate.hold(consumer, record, ladder.not_before(record)):
+                    break
+                committer.begin()
+                if not _consume_record(record, committer, ladder, process):
+                    # Retry the record on the next poll rather than committing
+                    # past it.
+                    consumer.seek(tp, record.offset)
+                    break
     consumer.close()
     producer.close()
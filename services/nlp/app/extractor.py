@@ -1,9 +1,19 @@
 from __future__ import annotations
 
-from typing import Dict, List
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List
 
 import regex as re
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from entity_table import EntityTable
+
+# Bump whenever a change to the patterns or entity layout alters extraction
+# output; cached results from other versions are then ignored.
+EXTRACTOR_VERSION = "1"
+
 OBLIGATION_PATTERN = re.compile(r"\b(shall|must|required to|has to)\b", re.I)
 THRESHOLD_PATTERN = re.compile(
     r"(?P<value>\d+(?:\.\d+)?)\s?(?P<unit>%|percent|basis points|bps|USD|US\$|\$|€|eur|units?)",
@@ -28,51 +38,114 @@ UNIT_NORMALIZATION = {
 }
 
 
-def extract_entities(text: str) -> List[Dict]:
-    ents: List[Dict] = []
+def _scan_into(
+    table: EntityTable,
+    text: str,
+    base: int = 0,
+    commit_from: int = 0,
+    commit_to: int | None = None,
+) -> None:
+    """Append entities whose match offset lies in ``[commit_from, commit_to)``.
+
+    ``text`` starts at absolute offset ``base``; recorded offsets are absolute.
+    """
+
+    def _keep(offset: int) -> bool:
+        offset += base
+        return offset >= commit_from and (commit_to is None or offset < commit_to)
+
     for match in OBLIGATION_PATTERN.finditer(text):
+        if not _keep(match.start()):
+            continue
         start_sentence = max(text.rfind(".", 0, match.start()) + 1, 0)
         end_sentence = text.find(".", match.end())
         if end_sentence == -1:
             end_sentence = min(len(text), match.end() + 200)
         span_text = text[start_sentence:end_sentence].strip()
-        ents.append(
-            {
-                "type": "OBLIGATION",
-                "text": span_text,
-                "start": start_sentence,
-                "end": end_sentence,
-                "attrs": {},
-            }
-        )
+        table.add_obligation(span_text, base + start_sentence, base + end_sentence)
 
     for match in THRESHOLD_PATTERN.finditer(text):
+        if not _keep(match.start()):
+            continue
         raw_unit = match.group("unit")
         normalized_unit = UNIT_NORMALIZATION.get(raw_unit.lower(), raw_unit.lower())
-        val = float(match.group("value"))
-        ents.append(
-            {
-                "type": "THRESHOLD",
-                "text": match.group(0),
-                "start": match.start(),
-                "end": match.end(),
-                "attrs": {
-                    "value": val,
-                    "unit": raw_unit,
-                    "unit_normalized": normalized_unit,
-                },
-            }
+        table.add_threshold(
+            match.group(0),
+            base + match.start(),
+            base + match.end(),
+            float(match.group("value")),
+            raw_unit,
+            normalized_unit,
         )
 
     for match in JURISDICTION_HINTS.finditer(text):
-        ents.append(
-            {
-                "type": "JURISDICTION",
-                "text": match.group(0),
-                "start": match.start(),
-                "end": match.end(),
-                "attrs": {"name": match.group(0)},
-            }
+        if not _keep(match.start()):
+            continue
+        table.add_jurisdiction(
+            match.group(0), base + match.start(), base + match.end(), match.group(0)
         )
 
-    return ents
+
+def extract_table(text: str) -> EntityTable:
+    table = EntityTable()
+    _scan_into(table, text)
+    return table
+
+
+def extract_entities(text: str) -> List[Dict]:
+    return extract_table(text).to_dicts()
+
+
+def extract_table_windowed(
+    chunks: Iterable[str],
+    window_chars: int = 1_000_000,
+    overlap_chars: int = 8_192,
+) -> EntityTable:
+    """Extract entities from text delivered as a stream of chunks.
+
+    Text is scanned in windows of ``window_chars`` with ``overlap_chars`` of
+    context on both sides, so sentences that straddle a window edge are still
+    seen whole. An entity belongs to the window that contains its match
+    offset, which keeps every match exactly once. Results are identical to
+    :func:`extract_entities` for sentences shorter than the overlap, and
+    memory stays bounded by the window size regardless of document length.
+    """
+
+    if window_chars <= overlap_chars:
+        raise ValueError("window_chars must be larger than overlap_chars")
+
+    table = EntityTable()
+    pieces: List[str] = []
+    pending = 0
+    buf = ""
+    base = 0
+    commit_from = 0
+    for chunk in chunks:
+        pieces.append(chunk)
+        pending += len(chunk)
+        if len(buf) + pending < window_chars + overlap_chars:
+            continue
+        buf += "".join(pieces)
+        pieces.clear()
+        pending = 0
+        while len(buf) >= window_chars + overlap_chars:
+            commit_to = base + window_chars
+            _scan_into(table, buf, base, commit_from, commit_to)
+            keep_from = commit_to - overlap_chars
+            buf = buf[keep_from - base :]
+            base = keep_from
+            commit_from = commit_to
+    buf += "".join(pieces)
+    _scan_into(table, buf, base, commit_from)
+
+    # Windows interleave entity types; restore the per-type grouping that
+    # single-pass extraction produces.
+    return table.sorted_by_type()
+
+
+def extract_entities_windowed(
+    chunks: Iterable[str],
+    window_chars: int = 1_000_000,
+    overlap_chars: int = 8_192,
+) -> List[Dict]:
+    return extract_table_windowed(chunks, window_chars, overlap_chars).to_dicts()
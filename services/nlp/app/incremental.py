@@ -0,0 +1,304 @@
+"""Incremental re-extraction for amended document versions.
+
+Amendments usually touch a handful of sentences in an otherwise unchanged
+document. Instead of re-running every pattern over the full text, the new
+version is diffed against the previously processed one at sentence
+granularity; extraction is re-run only over the changed regions and the
+offsets of untouched entities are shifted into place.
+
+Every returned entity carries a ``change`` marker (``new``, ``changed`` or
+``unchanged``), and entities that disappeared are reported separately so
+downstream consumers can skip work for unchanged content.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import regex as re
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from json_codec import dumps, loads
+
+from .config import get_settings
+from .extractor import EXTRACTOR_VERSION, extract_entities
+from .s3_utils import get_bytes_if_exists, put_bytes
+
+# Units end after a period or newline, matching the sentence boundaries the
+# obligation extractor itself uses.
+_UNIT_PATTERN = re.compile(r"[^.\n]*(?:[.\n]|$)")
+
+_TYPE_ORDER = {"OBLIGATION": 0, "THRESHOLD": 1, "JURISDICTION": 2}
+
+
+@dataclass(frozen=True)
+class _Block:
+    tag: str
+    old_start: int
+    old_end: int
+    new_start: int
+    new_end: int
+
+
+@dataclass
+class IncrementalResult:
+    entities: List[Dict]
+    removed: List[Dict]
+    reextracted_chars: int
+
+
+def _units(text: str) -> Tuple[List[str], List[int]]:
+    units: List[str] = []
+    offsets: List[int] = []
+    for match in _UNIT_PATTERN.finditer(text):
+        if match.start() == match.end():
+            continue
+        units.append(match.group(0))
+        offsets.append(match.start())
+    offsets.append(len(text))
+    return units, offsets
+
+
+def _diff_blocks(old_text: str, new_text: str) -> List[_Block]:
+    old_units, old_offsets = _units(old_text)
+    new_units, new_offsets = _units(new_text)
+
+    # Strip the common head and tail first; SequenceMatcher only sees the
+    # region that actually moved.
+    head = 0
+    limit = min(len(old_units), len(new_units))
+    while head < limit and old_units[head] == new_units[head]:
+        head += 1
+    tail = 0
+    while (
+        tail < limit - head
+        and old_units[len(old_units) - 1 - tail] == new_units[len(new_units) - 1 - tail]
+    ):
+        tail += 1
+
+    opcodes = [("equal", 0, head, 0, head)] if head else []
+    matcher = SequenceMatcher(
+        None,
+        old_units[head : len(old_units) - tail],
+        new_units[head : len(new_units) - tail],
+        autojunk=False,
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        opcodes.append((tag, i1 + head, i2 + head, j1 + head, j2 + head))
+    if tail:
+        opcodes.append(
+            (
+                "equal",
+                len(old_units) - tail,
+                len(old_units),
+                len(new_units) - tail,
+                len(new_units),
+            )
+        )
+
+    return [
+        _Block(tag, old_offsets[i1], old_offsets[i2], new_offsets[j1], new_offsets[j2])
+        for tag, i1, i2, j1, j2 in opcodes
+    ]
+
+
+def _safe_left(text: str, pos: int) -> int:
+    """Move ``pos`` left to just after a period that cannot be a decimal point."""
+
+    while pos > 0:
+        dot = text.rfind(".", 0, pos)
+        if dot == -1:
+            return 0
+        if dot + 1 >= len(text) or not text[dot + 1].isdigit():
+            return dot + 1
+        pos = dot
+    return 0
+
+
+def _safe_right(text: str, pos: int) -> int:
+    """Move ``pos`` right to just after a period that cannot be a decimal point."""
+
+    while pos < len(text):
+        dot = text.find(".", pos)
+        if dot == -1:
+            return len(text)
+        if dot + 1 >= len(text) or not text[dot + 1].isdigit():
+            return dot + 1
+        pos = dot + 1
+    return len(text)
+
+
+def _dirty_regions(new_text: str, blocks: List[_Block]) -> List[Tuple[int, int]]:
+    regions: List[Tuple[int, int]] = []
+    for block in blocks:
+        if block.tag == "equal":
+            continue
+        start = _safe_left(new_text, block.new_start)
+        end = _safe_right(new_text, block.new_end)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def _entity_key(entity: Dict) -> Tuple[str, str, str]:
+    return (
+        entity["type"],
+        entity["text"],
+        json.dumps(entity.get("attrs") or {}, sort_keys=True),
+    )
+
+
+def _overlaps(start: int, end: int, regions: List[Tuple[int, int]]) -> bool:
+    idx = bisect.bisect_left(regions, (end,)) - 1
+    return idx >= 0 and regions[idx][1] > start
+
+
+def _region_of(pos: int, regions: List[Tuple[int, int]]) -> Optional[int]:
+    idx = bisect.bisect_right(regions, (pos, float("inf"))) - 1
+    if idx >= 0 and regions[idx][0] <= pos <= regions[idx][1]:
+        return idx
+    return None
+
+
+def _map_offset(pos: int, blocks: List[_Block]) -> int:
+    for block in blocks:
+        if block.old_start <= pos < block.old_end:
+            if block.tag == "equal":
+                return block.new_start + (pos - block.old_start)
+            return block.new_start
+    return blocks[-1].new_end if blocks else pos
+
+
+def reextract(
+    old_text: str, new_text: str, old_entities: List[Dict]
+) -> IncrementalResult:
+    """Extract entities from ``new_text`` reusing results for ``old_text``."""
+
+    blocks = _diff_blocks(old_text, new_text)
+    regions = _dirty_regions(new_text, blocks)
+    equal_blocks = [b for b in blocks if b.tag == "equal"]
+    equal_starts = [b.old_start for b in equal_blocks]
+
+    carried: List[Dict] = []
+    dropped: List[Dict] = []
+    for entity in old_entities:
+        start, end = entity["start"], entity["end"]
+        idx = bisect.bisect_right(equal_starts, start) - 1
+        block = equal_blocks[idx] if idx >= 0 else None
+        if block is not None and block.old_start <= start and end <= block.old_end:
+            shift = block.new_start - block.old_start
+            if not _overlaps(start + shift, end + shift, regions):
+                carried.append(
+                    {
+                        **entity,
+                        "start": start + shift,
+                        "end": end + shift,
+                        "change": "unchanged",
+                    }
+                )
+                continue
+        dropped.append(entity)
+
+    fresh: List[Dict] = []
+    for region_start, region_end in regions:
+        for entity in extract_entities(new_text[region_start:region_end]):
+            entity["start"] += region_start
+            entity["end"] += region_start
+            fresh.append(entity)
+
+    # Pair fresh entities with dropped ones: identical content is unchanged,
+    # same type within the same region is a change, the rest are new/removed.
+    unmatched_by_key: Dict[Tuple[str, str, str], List[Dict]] = defaultdict(list)
+    for entity in dropped:
+        unmatched_by_key[_entity_key(entity)].append(entity)
+    pending: List[Dict] = []
+    for entity in fresh:
+        bucket = unmatched_by_key.get(_entity_key(entity))
+        if bucket:
+            bucket.pop(0)
+            entity["change"] = "unchanged"
+        else:
+            pending.append(entity)
+
+    leftovers: Dict[Tuple[str, Optional[int]], List[Dict]] = defaultdict(list)
+    for bucket in unmatched_by_key.values():
+        for entity in bucket:
+            region = _region_of(_map_offset(entity["start"], blocks), regions)
+            leftovers[(entity["type"], region)].append(entity)
+    for entity in pending:
+        candidates = leftovers.get(
+            (entity["type"], _region_of(entity["start"], regions))
+        )
+        if candidates:
+            candidates.pop(0)
+            entity["change"] = "changed"
+        else:
+            entity["change"] = "new"
+    removed = [entity for bucket in leftovers.values() for entity in bucket]
+
+    entities = carried + fresh
+    entities.sort(key=lambda e: (_TYPE_ORDER.get(e["type"], 99), e["start"]))
+    return IncrementalResult(
+        entities=entities,
+        removed=removed,
+        reextracted_chars=sum(end - start for start, end in regions),
+    )
+
+
+def strip_change_markers(entities: List[Dict]) -> List[Dict]:
+    return [{k: v for k, v in e.items() if k != "change"} for e in entities]
+
+
+class DocumentStateStore:
+    """Last processed version of each document, kept in the processed bucket."""
+
+    def __init__(self, bucket: str, prefix: str) -> None:
+        self._bucket = bucket
+        self._prefix = prefix.rstrip("/")
+
+    def _key(self, document_id: str) -> str:
+        return f"{self._prefix}/by-document-id/{document_id}.json"
+
+    def get(self, document_id: str) -> Optional[dict]:
+        body = get_bytes_if_exists(self._bucket, self._key(document_id))
+        if body is None:
+            return None
+        state = loads(body)
+        if state.get("extractor_version") != EXTRACTOR_VERSION:
+            return None
+        return state
+
+    def put(
+        self,
+        document_id: str,
+        content_sha256: Optional[str],
+        normalized_s3_path: str,
+        source_url: Optional[str],
+        entities: List[Dict],
+    ) -> None:
+        state = {
+            "document_id": document_id,
+            "content_sha256": content_sha256,
+            "normalized_s3_path": normalized_s3_path,
+            "extractor_version": EXTRACTOR_VERSION,
+            "source_url": source_url,
+            "entities": entities,
+        }
+        put_bytes(self._bucket, self._key(document_id), dumps(state))
+
+
+def build_state_store() -> Optional[DocumentStateStore]:
+    settings = get_settings()
+    if not settings.incremental_extraction:
+        return None
+    return DocumentStateStore(settings.processed_bucket, settings.nlp_state_prefix)
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import boto3
 import structlog
 from botocore.exceptions import BotoCoreError, ClientError
@@ -20,3 +22,37 @@ def get_bytes(bucket: str, key: str) -> bytes:
     except (ClientError, BotoCoreError) as exc:
         logger.error("s3_get_failed", bucket=bucket, key=key, error=str(exc))
         raise
+
+
+def open_stream(bucket: str, key: str):
+    """Return the streaming body of an object together with its size in bytes."""
+
+    try:
+        obj = s3_client().get_object(Bucket=bucket, Key=key)
+        return obj["Body"], obj.get("ContentLength", 0)
+    except (ClientError, BotoCoreError) as exc:
+        logger.error("s3_get_failed", bucket=bucket, key=key, error=str(exc))
+        raise
+
+
+def get_bytes_if_exists(bucket: str, key: str) -> bytes | None:
+    try:
+        obj = s3_client().get_object(Bucket=bucket, Key=key)
+        return obj["Body"].read()
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in {"NoSuchKey", "404"}:
+            return None
+        logger.error("s3_get_failed", bucket=bucket, key=key, error=str(exc))
+        raise
+    except BotoCoreError as exc:
+        logger.error("s3_get_failed", bucket=bucket, key=key, error=str(exc))
+        raise
+
+
+def put_bytes(bucket: str, key: str, content: bytes) -> str:
+    try:
+        s3_client().put_object(Bucket=bucket, Key=key, Body=content)
+        return f"s3://{bucket}/{key}"
+    except (ClientError, BotoCoreError) as exc:
+        logger.error("s3_put_failed", bucket=bucket, key=key, error=str(exc))
+        raise
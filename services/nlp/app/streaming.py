@@ -0,0 +1,203 @@
+"""Streaming reader for normalized document payloads.
+
+Normalized documents are a single JSON object whose ``text`` member can be
+arbitrarily large. :class:`NormalizedDocumentReader` walks the top-level
+object directly off the S3 body, yields the text value as decoded chunks and
+collects every other member into :attr:`NormalizedDocumentReader.fields`, so
+the full document never has to be materialized in memory.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import BinaryIO, Dict, Iterator, List
+
+_WHITESPACE = " \t\r\n"
+_STRING_SPECIAL = re.compile(r'["\\]')
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class NormalizedDocumentReader:
+    """Incrementally parse a top-level JSON object from a binary stream."""
+
+    def __init__(
+        self, body: BinaryIO, text_field: str = "text", chunk_size: int = 1 << 16
+    ) -> None:
+        self._body = body
+        self._text_field = text_field
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.fields: Dict[str, object] = {}
+
+    # -- low level buffer handling -------------------------------------
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        raw = self._body.read(self._chunk_size)
+        if not raw:
+            self._eof = True
+            tail = self._decoder.decode(b"", final=True)
+            if tail:
+                self._buf = self._buf[self._pos :] + tail
+                self._pos = 0
+                return True
+            return False
+        self._buf = self._buf[self._pos :] + self._decoder.decode(raw)
+        self._pos = 0
+        return True
+
+    def _ensure(self, count: int = 1) -> bool:
+        while len(self._buf) - self._pos < count:
+            if not self._fill():
+                return False
+        return True
+
+    def _peek(self) -> str:
+        if not self._ensure():
+            raise ValueError("Unexpected end of JSON document")
+        return self._buf[self._pos]
+
+    def _next(self) -> str:
+        char = self._peek()
+        self._pos += 1
+        return char
+
+    def _skip_ws(self) -> None:
+        while self._ensure() and self._buf[self._pos] in _WHITESPACE:
+            self._pos += 1
+
+    def _expect(self, char: str) -> None:
+        self._skip_ws()
+        found = self._next()
+        if found != char:
+            raise ValueError(f"Expected {char!r}, found {found!r}")
+
+    # -- strings -------------------------------------------------------
+
+    def _iter_string(self) -> Iterator[str]:
+        """Yield decoded pieces of a JSON string; the opening quote is consumed."""
+
+        while True:
+            if not self._ensure():
+                raise ValueError("Unterminated JSON string")
+            match = _STRING_SPECIAL.search(self._buf, self._pos)
+            stop = match.start() if match else len(self._buf)
+            if stop > self._pos:
+                yield self._buf[self._pos : stop]
+                self._pos = stop
+            if match is None:
+                continue
+            self._pos += 1
+            if match.group(0) == '"':
+                return
+            yield self._read_escape()
+
+    def _read_escape(self) -> str:
+        code = self._next()
+        if code in _ESCAPES:
+            return _ESCAPES[code]
+        if code != "u":
+            raise ValueError(f"Invalid escape sequence \\{code}")
+        value = self._read_hex4()
+        if 0xD800 <= value <= 0xDBFF and self._ensure(6):
+            if self._buf.startswith("\\u", self._pos):
+                self._pos += 2
+                low = self._read_hex4()
+                if 0xDC00 <= low <= 0xDFFF:
+                    return chr(0x10000 + ((value - 0xD800) << 10) + (low - 0xDC00))
+                return chr(value) + chr(low)
+        return chr(value)
+
+    def _read_hex4(self) -> int:
+        if not self._ensure(4):
+            raise ValueError("Truncated unicode escape")
+        digits = self._buf[self._pos : self._pos + 4]
+        self._pos += 4
+        return int(digits, 16)
+
+    def _read_string(self) -> str:
+        return "".join(self._iter_string())
+
+    # -- generic values ------------------------------------------------
+
+    def _read_raw_value(self) -> object:
+        """Read any JSON value by capturing its source text."""
+
+        parts: List[str] = []
+        depth = 0
+        while True:
+            char = self._peek()
+            if char == '"':
+                self._pos += 1
+                parts.append(json.dumps(self._read_string()))
+                if depth == 0:
+                    break
+                continue
+            if depth == 0 and char in ",}]":
+                break
+            if char in "{[":
+                depth += 1
+            elif char in "}]":
+                depth -= 1
+            parts.append(char)
+            self._pos += 1
+            if depth == 0 and char in "}]":
+                break
+        return json.loads("".join(parts))
+
+    def _coalesce(self, pieces: Iterator[str]) -> Iterator[str]:
+        # Escapes decode to single characters; batch them with their
+        # neighbours so callers see chunks of roughly ``chunk_size``.
+        batch: List[str] = []
+        size = 0
+        for piece in pieces:
+            batch.append(piece)
+            size += len(piece)
+            if size >= self._chunk_size:
+                yield "".join(batch)
+                batch.clear()
+                size = 0
+        if batch:
+            yield "".join(batch)
+
+    # -- public API ----------------------------------------------------
+
+    def iter_text(self) -> Iterator[str]:
+        """Yield the text member in chunks, then finish parsing the object."""
+
+        self._expect("{")
+        self._skip_ws()
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            self._expect('"')
+            key = self._read_string()
+            self._expect(":")
+            self._skip_ws()
+            if key == self._text_field and self._peek() == '"':
+                self._pos += 1
+                yield from self._coalesce(self._iter_string())
+            else:
+                self.fields[key] = self._read_raw_value()
+            self._skip_ws()
+            separator = self._next()
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}', found {separator!r}")
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import logging
+import sys
 import threading
+from pathlib import Path
 
 import structlog
 from app.config import settings
@@ -9,6 +11,12 @@ from app.consumer import run_consumer, stop_consumer
 from app.routes import router
 from fastapi import FastAPI
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "shared"))
+from json_codec import FastJSONResponse
+from lanes import lane_workers
+from worker_supervisor import WorkerSpec, WorkerSupervisor
+
 
 def _configure_logging(level: str) -> None:
     structlog.configure(
@@ -28,16 +36,42 @@ def _configure_logging(level: str) -> None:
 
 _configure_logging(settings.log_level)
 
-app = FastAPI(title="NLP Service", version="0.2.0")
+app = FastAPI(
+    title="NLP Service",
+    version="0.2.0",
+    default_response_class=FastJSONResponse,
+)
 app.include_router(router)
 
+_supervisor: WorkerSupervisor | None = None
+
 
 @app.on_event("startup")
 def _start_bg() -> None:  # pragma: no cover - requires infra
-    thread = threading.Thread(target=run_consumer, daemon=True)
-    thread.start()
+    global _supervisor
+    workers = lane_workers(
+        "nlp", settings.consumer_workers, settings.bulk_consumer_workers
+    )
+    if settings.consumer_mode == "process":
+        _supervisor = WorkerSupervisor(
+            [
+                WorkerSpec(
+                    name=name, target=run_consumer, stop=stop_consumer, args=(lane,)
+                )
+                for name, lane in workers
+            ]
+        )
+        _supervisor.start()
+        return
+    for name, lane in workers:
+        thread = threading.Thread(
+            target=run_consumer, args=(lane,), name=name, daemon=True
+        )
+        thread.start()
 
 
 @app.on_event("shutdown")
 def _shutdown() -> None:
+    if _supervisor is not None:
+        _supervisor.stop()
     stop_consumer()
@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from app.cache import DiskCache
+
+
+def test_disk_cache_roundtrip(tmp_path):
+    cache = DiskCache(str(tmp_path), version="1")
+    assert cache.get("abc123") is None
+    cache.put("abc123", {"source_url": None, "entities": [{"type": "OBLIGATION"}]})
+    assert cache.get("abc123")["entities"] == [{"type": "OBLIGATION"}]
+
+
+def test_disk_cache_version_bump_invalidates(tmp_path):
+    DiskCache(str(tmp_path), version="1").put("abc123", {"entities": []})
+    assert DiskCache(str(tmp_path), version="2").get("abc123") is None
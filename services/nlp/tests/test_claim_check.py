@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+sys.path.insert(0, str(service_dir.parent.parent / "shared"))
+
+import pytest
+
+pytest.importorskip("kafka")
+
+from app import consumer
+from claim_check import ClaimCheckError, is_pointer, resolve_event
+from schema_validation import get_registry
+from wire_format import JSON, encode_event
+
+EVENT = {
+    "event_id": "evt-1",
+    "document_id": "doc-1",
+    "timestamp": "2024-01-01T00:00:00+00:00",
+    "source_url": "https://example.com/rule",
+    "entities": [
+        {"type": "OBLIGATION", "text": "Banks shall file.", "start": 0, "end": 17}
+    ]
+    * 50,
+    "removed_entities": [],
+}
+
+
+def test_oversized_events_are_claim_checked(monkeypatch):
+    stored = {}
+    monkeypatch.setattr(
+        consumer, "put_bytes", lambda bucket, key, body: stored.setdefault(key, body)
+    )
+    monkeypatch.setattr(consumer.settings, "claim_check_threshold_bytes", 1024)
+
+    value, headers = consumer._claim_check(EVENT, *encode_event(EVENT, JSON), JSON)
+    pointer = consumer.decode_event(value, headers)
+
+    assert len(value) < 1024
+    assert is_pointer(pointer)
+    assert pointer["entities_ref"]["entity_count"] == 50
+    get_registry().validate("nlp.extracted", pointer)
+    (key,) = stored
+    assert pointer["entities_ref"]["uri"].endswith(key)
+    assert resolve_event(pointer, stored[key]) == EVENT
+
+
+def test_small_events_are_sent_inline(monkeypatch):
+    monkeypatch.setattr(consumer.settings, "claim_check_threshold_bytes", 1 << 20)
+    encoded = encode_event(EVENT, JSON)
+    assert consumer._claim_check(EVENT, *encoded, JSON) == encoded
+
+
+def test_tampered_payload_is_rejected(monkeypatch):
+    monkeypatch.setattr(consumer, "put_bytes", lambda *args: None)
+    monkeypatch.setattr(consumer.settings, "claim_check_threshold_bytes", 1)
+    value, headers = consumer._claim_check(EVENT, *encode_event(EVENT, JSON), JSON)
+    pointer = consumer.decode_event(value, headers)
+    with pytest.raises(ClaimCheckError):
+        resolve_event(pointer, b'{"entities": []}')
@@ -0,0 +1,202 @@
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+sys.path.insert(0, str(service_dir.parent.parent / "shared"))
+
+import pytest
+
+pytest.importorskip("regex")
+
+from app.extractor import (
+    JURISDICTION_HINTS,
+    OBLIGATION_PATTERN,
+    THRESHOLD_PATTERN,
+    UNIT_NORMALIZATION,
+    extract_table,
+    extract_table_windowed,
+)
+from entity_table import EntityTable, StringTable
+
+TEXT = (
+    "Banks in the EU shall hold 5% of capital within 30 days. "
+    "Nothing changes here. Dealers in New York must report 1.5 USD and 20 bps. "
+    "Firms in California are required to file 20 units with the US regulator. "
+    "A provider has to keep 300 EUR in reserve"
+)
+
+
+def _legacy_scan(text: str) -> Iterator[Tuple[int, Dict]]:
+    """The dict-per-entity extractor the table replaced, kept as a reference."""
+
+    for match in OBLIGATION_PATTERN.finditer(text):
+        start_sentence = max(text.rfind(".", 0, match.start()) + 1, 0)
+        end_sentence = text.find(".", match.end())
+        if end_sentence == -1:
+            end_sentence = min(len(text), match.end() + 200)
+        yield match.start(), {
+            "type": "OBLIGATION",
+            "text": text[start_sentence:end_sentence].strip(),
+            "start": start_sentence,
+            "end": end_sentence,
+            "attrs": {},
+        }
+    for match in THRESHOLD_PATTERN.finditer(text):
+        raw_unit = match.group("unit")
+        yield match.start(), {
+            "type": "THRESHOLD",
+            "text": match.group(0),
+            "start": match.start(),
+            "end": match.end(),
+            "attrs": {
+                "value": float(match.group("value")),
+                "unit": raw_unit,
+                "unit_normalized": UNIT_NORMALIZATION.get(
+                    raw_unit.lower(), raw_unit.lower()
+                ),
+            },
+        }
+    for match in JURISDICTION_HINTS.finditer(text):
+        yield match.start(), {
+            "type": "JURISDICTION",
+            "text": match.group(0),
+            "start": match.start(),
+            "end": match.end(),
+            "attrs": {"name": match.group(0)},
+        }
+
+
+def _legacy_windowed(
+    chunks: Iterable[str], window_chars: int, overlap_chars: int
+) -> List[Dict]:
+    by_type: Dict[str, List[Dict]] = {
+        "OBLIGATION": [],
+        "THRESHOLD": [],
+        "JURISDICTION": [],
+    }
+
+    def _commit(buf: str, base: int, commit_from: int, commit_to: int | None) -> None:
+        for anchor, entity in _legacy_scan(buf):
+            anchor += base
+            if anchor < commit_from or (commit_to is not None and anchor >= commit_to):
+                continue
+            entity["start"] += base
+            entity["end"] += base
+            by_type[entity["type"]].append(entity)
+
+    pieces: List[str] = []
+    pending = 0
+    buf = ""
+    base = 0
+    commit_from = 0
+    for chunk in chunks:
+        pieces.append(chunk)
+        pending += len(chunk)
+        if len(buf) + pending < window_chars + overlap_chars:
+            continue
+        buf += "".join(pieces)
+        pieces.clear()
+        pending = 0
+        while len(buf) >= window_chars + overlap_chars:
+            commit_to = base + window_chars
+            _commit(buf, base, commit_from, commit_to)
+            keep_from = commit_to - overlap_chars
+            buf = buf[keep_from - base :]
+            base = keep_from
+            commit_from = commit_to
+    buf += "".join(pieces)
+    _commit(buf, base, commit_from, None)
+
+    return by_type["OBLIGATION"] + by_type["THRESHOLD"] + by_type["JURISDICTION"]
+
+
+def test_string_table_interns_each_value_once():
+    strings = StringTable()
+    first = strings.intern("percent")
+    assert strings.intern("usd") != first
+    assert strings.intern("percent") == first
+    assert len(strings) == 2
+    assert strings[first] == "percent"
+
+
+def test_repeated_strings_share_an_id():
+    table = extract_table("Hold 5% now. Hold 7% later. Hold 5% again.")
+    thresholds = table.view("THRESHOLD").rows
+    units = {table.units[row] for row in thresholds}
+    assert len(thresholds) == 3 and len(units) == 1
+    assert table.texts[thresholds[0]] == table.texts[thresholds[2]]
+    assert table.sorted_by_type().strings is table.strings
+
+
+def test_views_select_rows_of_one_type():
+    table = extract_table(TEXT)
+    view = table.view("THRESHOLD")
+    assert len(view) == 5
+    assert all(table.type_name(row) == "THRESHOLD" for row in view.rows)
+    # Columns are indexed by row number in the parent table.
+    assert [(view.starts[r], view.ends[r]) for r in view.rows] == [
+        (table.starts[r], table.ends[r]) for r in view.rows
+    ]
+    assert [view.values[r] for r in view.rows] == [5.0, 1.5, 20.0, 20.0, 300.0]
+    assert len(table.view("CITATION")) == 0
+
+
+def test_none_and_missing_attrs_round_trip():
+    entities = [
+        {"type": "CITATION", "text": "12 CFR 217", "start": 0, "end": 10},
+        {"type": "OBLIGATION", "text": "x", "start": 1, "end": 2, "attrs": {}},
+        {
+            "type": "THRESHOLD",
+            "text": "n/a",
+            "start": 3,
+            "end": 6,
+            "attrs": {"value": None, "unit": None, "unit_normalized": None},
+        },
+        {
+            "type": "JURISDICTION",
+            "text": "EU",
+            "start": 7,
+            "end": 9,
+            "attrs": {"name": "EU", "iso": "EU", "confidence": None},
+            "change": "changed",
+        },
+    ]
+    table = EntityTable.from_dicts(entities)
+    assert table.attrs(0) is None
+    assert table.attrs(1) == {}
+    assert table.to_dicts() == entities
+    # Extra attrs follow their row when the table is reordered.
+    reordered = table.take([3, 0])
+    assert reordered.to_dicts() == [entities[3], entities[0]]
+
+
+def test_table_output_matches_the_dict_extractor():
+    assert extract_table(TEXT).to_dicts() == [e for _, e in _legacy_scan(TEXT)]
+
+
+@pytest.mark.parametrize("window_chars,overlap_chars", [(64, 32), (100, 40), (97, 96)])
+def test_windowed_table_matches_the_dict_extractor(window_chars, overlap_chars):
+    text = TEXT * 4
+    chunks = [text[i : i + 13] for i in range(0, len(text), 13)]
+    entities = extract_table_windowed(chunks, window_chars, overlap_chars).to_dicts()
+    assert entities == _legacy_windowed(chunks, window_chars, overlap_chars)
+
+
+def test_windowed_extraction_keeps_overlap_matches_once():
+    text = TEXT * 4
+    full = extract_table(text).to_dicts()
+    # Every match is committed by exactly one window, even when the overlap
+    # is shorter than a sentence and obligation spans get cut.
+    narrow = extract_table_windowed([text], window_chars=64, overlap_chars=32)
+    assert Counter(narrow.type_name(r) for r in range(len(narrow))) == Counter(
+        e["type"] for e in full
+    )
+    assert [e for e in narrow.to_dicts() if e["type"] != "OBLIGATION"] == [
+        e for e in full if e["type"] != "OBLIGATION"
+    ]
+    wide = extract_table_windowed([text], window_chars=150, overlap_chars=120)
+    assert wide.to_dicts() == full
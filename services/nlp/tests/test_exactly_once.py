@@ -0,0 +1,138 @@
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+sys.path.insert(0, str(service_dir.parent.parent / "shared"))
+
+import pytest
+
+pytest.importorskip("kafka")
+
+from app import consumer
+from retry_ladder import RecordCommitter, RetryLadder
+from wire_format import JSON, encode_event
+
+Record = namedtuple("Record", "topic partition offset key value headers")
+
+
+class FakeFuture:
+    def get(self, timeout=None):
+        return None
+
+
+class TransactionalProducer:
+    def __init__(self):
+        self.calls = []
+
+    def init_transactions(self):
+        self.calls.append("init")
+
+    def begin_transaction(self):
+        self.calls.append("begin")
+
+    def send(self, topic, key=None, value=None, headers=None):
+        self.calls.append(("send", topic))
+        return FakeFuture()
+
+    def send_offsets_to_transaction(self, offsets, group_id):
+        ((tp, meta),) = offsets.items()
+        self.calls.append(("offsets", tp.topic, meta.offset, group_id))
+
+    def commit_transaction(self):
+        self.calls.append("commit")
+
+    def abort_transaction(self):
+        self.calls.append("abort")
+
+
+def _record(event):
+    value, headers = encode_event(event, JSON)
+    return Record("ingest.normalized", 0, 9, b"doc-1:sha", value, headers)
+
+
+EVENT = {"document_id": "doc-1", "normalized_s3_path": "s3://bucket/key"}
+
+
+def _run(process):
+    producer = TransactionalProducer()
+    committer = RecordCommitter(None, producer, "nlp-service", transactional=True)
+    ladder = RetryLadder("ingest.normalized", (1000,))
+    committer.begin()
+    committed = consumer._consume_record(_record(EVENT), committer, ladder, process)
+    return committed, producer.calls
+
+
+def test_output_and_offset_commit_in_one_transaction():
+    def process(evt, record, producer=None):
+        pass
+
+    committed, calls = _run(process)
+    assert committed
+    assert calls == [
+        "init",
+        "begin",
+        ("offsets", "ingest.normalized", 10, "nlp-service"),
+        "commit",
+    ]
+
+
+def test_failed_attempt_is_aborted_before_routing():
+    def process(evt, record):
+        raise RuntimeError("s3 unavailable")
+
+    committed, calls = _run(process)
+    assert committed
+    assert calls == [
+        "init",
+        "begin",
+        "abort",
+        "begin",
+        ("send", "ingest.normalized.retry.1"),
+        ("offsets", "ingest.normalized", 10, "nlp-service"),
+        "commit",
+    ]
+
+
+def test_document_state_is_saved_after_the_commit():
+    def process(evt, record):
+        return lambda: calls.append("save_state")
+
+    calls = []
+    producer = TransactionalProducer()
+    producer.calls = calls
+    committer = RecordCommitter(None, producer, "nlp-service", transactional=True)
+    committer.begin()
+    ladder = RetryLadder("ingest.normalized", (1000,))
+    assert consumer._consume_record(_record(EVENT), committer, ladder, process)
+    assert calls[-2:] == ["commit", "save_state"]
+
+
+def test_document_state_is_not_saved_when_the_commit_fails():
+    class FailingProducer(TransactionalProducer):
+        def commit_transaction(self):
+            raise RuntimeError("fenced")
+
+    saved = []
+    producer = FailingProducer()
+    committer = RecordCommitter(None, producer, "nlp-service", transactional=True)
+    committer.begin()
+    ladder = RetryLadder("ingest.normalized", (1000,))
+
+    def process(evt, record):
+        return lambda: saved.append(evt["document_id"])
+
+    assert not consumer._consume_record(_record(EVENT), committer, ladder, process)
+    assert saved == []
+    assert producer.calls[-1] == "abort"
+
+
+def test_transactional_id_differs_between_replicas(monkeypatch):
+    monkeypatch.setenv(consumer.WORKER_ID_ENV, "nlp-0")
+    ids = set()
+    for host in ("nlp-a", "nlp-b"):
+        monkeypatch.setattr(consumer.socket, "gethostname", lambda: host)
+        ids.add(consumer._transactional_id())
+    assert ids == {"nlp-service-nlp-a-nlp-0", "nlp-service-nlp-b-nlp-0"}
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("regex")
+pytest.importorskip("boto3")
+
+from app.extractor import extract_entities
+from app.incremental import reextract, strip_change_markers
+
+OLD = (
+    "Banks shall hold 5% of capital. Nothing changes here. "
+    "Dealers must report 1.5 USD in the EU. Firms in California "
+    "are required to file 20 units."
+)
+NEW = (
+    "Banks shall hold 5% of capital. A new sentence mentions New York. "
+    "Nothing changes here. Dealers must report 2.5 USD in the EU. "
+    "Firms in California are required to file 20 units."
+)
+
+
+def _key(entity):
+    return (entity["type"], entity["start"], entity["end"], entity["text"])
+
+
+def test_reextract_matches_full_extraction():
+    result = reextract(OLD, NEW, extract_entities(OLD))
+    assert sorted(map(_key, strip_change_markers(result.entities))) == sorted(
+        map(_key, extract_entities(NEW))
+    )
+    assert result.reextracted_chars < len(NEW)
+
+
+def test_reextract_marks_changes():
+    result = reextract(OLD, NEW, extract_entities(OLD))
+    by_text = {(e["type"], e["text"]): e["change"] for e in result.entities}
+    assert by_text[("THRESHOLD", "5%")] == "unchanged"
+    assert by_text[("THRESHOLD", "2.5 USD")] == "changed"
+    assert by_text[("JURISDICTION", "New York")] == "new"
+    assert by_text[("JURISDICTION", "California")] == "unchanged"
+    assert [e["text"] for e in result.removed] == []
@@ -0,0 +1,39 @@
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+
+import json_codec
+
+EVENT = {
+    "document_id": "doc-1",
+    "source_url": "https://example.com/règle",
+    "entities": [{"type": "THRESHOLD", "start": 1, "end": 3, "attrs": {"value": 5.0}}],
+}
+
+
+def test_round_trip_matches_stdlib():
+    encoded = json_codec.dumps(EVENT)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == EVENT
+    assert json_codec.loads(encoded) == EVENT
+    assert json_codec.loads(encoded.decode("utf-8")) == EVENT
+
+
+def test_stdlib_fallback_is_compatible():
+    encoded = json_codec._stdlib_dumps(EVENT)
+    assert json_codec.loads(encoded) == json_codec._stdlib_loads(memoryview(encoded))
+
+
+def test_default_hook_and_non_string_keys():
+    stamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    encoded = json_codec.dumps({1: stamp}, default=lambda v: v.isoformat())
+    assert json_codec.loads(encoded) == {"1": "2024-01-01T00:00:00+00:00"}
+
+
+def test_response_class_renders_bytes():
+    response = json_codec.FastJSONResponse({"status": "ok"})
+    assert json_codec.loads(response.body) == {"status": "ok"}
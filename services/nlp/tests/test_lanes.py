@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+
+import pytest
+from lanes import BULK, STANDARD, classify, lane_group, lane_topic, lane_workers
+
+LIMITS = dict(min_bytes=1_000, min_pages=10, bulk_engines=frozenset({"tesseract"}))
+
+
+@pytest.mark.parametrize(
+    "text_bytes,pages,engine,lane",
+    [
+        (500, 1, "payload", STANDARD),
+        (999, 9, "payload", STANDARD),
+        (1_000, 1, "payload", BULK),
+        (500, 10, "pdfminer", BULK),
+        (500, 1, "Tesseract", BULK),
+        (500, 1, None, STANDARD),
+    ],
+)
+def test_classify(text_bytes, pages, engine, lane):
+    assert classify(text_bytes, pages, engine, **LIMITS) == lane
+
+
+def test_zero_limits_disable_criteria():
+    assert classify(10**9, 10**4, None, min_bytes=0, min_pages=0) == STANDARD
+
+
+def test_standard_lane_keeps_existing_names():
+    assert lane_topic("ingest.normalized", STANDARD) == "ingest.normalized"
+    assert lane_topic("ingest.normalized", BULK) == "ingest.normalized.bulk"
+    assert lane_group("nlp-service", STANDARD) == "nlp-service"
+    assert lane_group("nlp-service", BULK) == "nlp-service-bulk"
+    with pytest.raises(ValueError):
+        lane_topic("nlp.extracted", "express")
+
+
+def test_lane_workers():
+    assert lane_workers("nlp", 2, 1) == [
+        ("nlp-0", STANDARD),
+        ("nlp-1", STANDARD),
+        ("nlp-bulk-0", BULK),
+    ]
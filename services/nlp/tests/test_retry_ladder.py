@@ -0,0 +1,115 @@
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+
+import pytest
+
+pytest.importorskip("kafka")
+
+from retry_ladder import (
+    HEADER_ATTEMPT,
+    HEADER_ERROR_TYPE,
+    HEADER_ORIGINAL_OFFSET,
+    HEADER_ORIGINAL_TOPIC,
+    DelayGate,
+    RetryLadder,
+    header_value,
+    parse_delays,
+)
+
+Record = namedtuple("Record", "topic partition offset key value headers")
+
+
+class FakeFuture:
+    def get(self, timeout=None):
+        return None
+
+
+class FakeProducer:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, topic, key=None, value=None, headers=None):
+        self.sent.append(Record(topic, 0, len(self.sent), key, value, headers))
+        return FakeFuture()
+
+
+class FakeConsumer:
+    def __init__(self):
+        self.paused, self.resumed, self.seeks = set(), set(), {}
+
+    def seek(self, tp, offset):
+        self.seeks[tp] = offset
+
+    def pause(self, *tps):
+        self.paused.update(tps)
+
+    def resume(self, *tps):
+        self.resumed.update(tps)
+
+    def assignment(self):
+        return self.paused
+
+
+def test_failures_climb_the_ladder_then_dead_letter():
+    ladder = RetryLadder("nlp.extracted", parse_delays("1000, 60000"))
+    assert ladder.source_topics == [
+        "nlp.extracted",
+        "nlp.extracted.retry.1",
+        "nlp.extracted.retry.2",
+    ]
+    producer = FakeProducer()
+    record = Record(
+        "nlp.extracted", 3, 42, b"doc-1", b"{}", [("regengine-wire-format", b"json")]
+    )
+
+    destinations = []
+    for _ in range(3):
+        destinations.append(ladder.route(producer, record, RuntimeError("boom")))
+        record = producer.sent[-1]
+    assert destinations == [
+        "nlp.extracted.retry.1",
+        "nlp.extracted.retry.2",
+        "nlp.extracted.dlq",
+    ]
+
+    dead = producer.sent[-1]
+    assert (dead.key, dead.value) == (b"doc-1", b"{}")
+    assert header_value(dead.headers, HEADER_ATTEMPT) == "3"
+    assert header_value(dead.headers, HEADER_ERROR_TYPE) == "RuntimeError"
+    assert header_value(dead.headers, HEADER_ORIGINAL_TOPIC) == "nlp.extracted"
+    assert header_value(dead.headers, HEADER_ORIGINAL_OFFSET) == "42"
+    assert header_value(dead.headers, "regengine-wire-format") == "json"
+    assert [k for k, _ in dead.headers].count(HEADER_ATTEMPT) == 1
+    assert ladder.not_before(dead) is None
+
+
+def test_permanent_failures_skip_the_ladder():
+    ladder = RetryLadder("ingest.normalized", (1000,))
+    producer = FakeProducer()
+    record = Record("ingest.normalized", 0, 7, None, b"not json", [])
+    assert ladder.route(producer, record, ValueError("bad"), permanent=True) == (
+        "ingest.normalized.dlq"
+    )
+
+
+def test_delay_gate_pauses_until_records_are_due():
+    gate = DelayGate()
+    consumer = FakeConsumer()
+    record = Record("t.retry.1", 0, 5, None, b"", [])
+
+    assert not gate.hold(consumer, record, None)
+    assert not gate.hold(consumer, record, int(time.time() * 1000) - 1)
+    assert gate.hold(consumer, record, int(time.time() * 1000) + 50)
+    (tp,) = consumer.paused
+    assert consumer.seeks[tp] == 5
+
+    gate.release_due(consumer)
+    assert not consumer.resumed
+    time.sleep(0.06)
+    gate.release_due(consumer)
+    assert consumer.resumed == {tp}
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+
+import pytest
+from schema_validation import (
+    SampledValidator,
+    SchemaRegistry,
+    SchemaValidationError,
+    get_registry,
+)
+
+EVENT = {
+    "event_id": "evt-1",
+    "document_id": "doc-1",
+    "timestamp": "2024-01-01T00:00:00+00:00",
+    "source_url": "https://example.com/rule",
+    "entities": [
+        {
+            "type": "THRESHOLD",
+            "text": "5%",
+            "start": 10,
+            "end": 12,
+            "attrs": {"value": 5.0, "unit": "%", "unit_normalized": "percent"},
+        }
+    ],
+}
+
+
+def test_registry_loads_every_schema():
+    registry = get_registry()
+    assert {"ingest.normalized", "nlp.extracted"} <= set(registry.schemas)
+    registry.validate("nlp.extracted", EVENT)
+
+
+def test_invalid_payload_raises_schema_error():
+    bad = {**EVENT, "entities": [{**EVENT["entities"][0], "type": "PERSON"}]}
+    with pytest.raises(SchemaValidationError) as info:
+        get_registry().validate("nlp.extracted", bad)
+    assert info.value.schema == "nlp.extracted"
+
+
+def test_formats_are_annotations_only():
+    # Matches Draft7Validator without a format checker.
+    get_registry().validate("nlp.extracted", {**EVENT, "timestamp": "yesterday"})
+
+
+def test_sampled_validator_validates_warmup_then_one_in_n():
+    validator = SampledValidator(
+        get_registry(), "nlp.extracted", sample_rate=3, warmup=2
+    )
+    checked = [validator(EVENT) for _ in range(8)]
+    assert checked == [True, True, True, False, False, True, False, False]
+
+
+def test_unknown_schema_is_rejected(tmp_path):
+    with pytest.raises(KeyError):
+        SampledValidator(SchemaRegistry(tmp_path), "nlp.extracted")
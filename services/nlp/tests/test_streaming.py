@@ -0,0 +1,46 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("regex")
+
+from app.extractor import extract_entities, extract_entities_windowed
+from app.streaming import NormalizedDocumentReader
+
+SENTENCE = "Banks in the EU shall hold 5% of capital within 30 days.\n"
+
+
+def test_reader_streams_text_and_collects_fields():
+    doc = {
+        "document_id": "doc-1",
+        "source_url": 'https://example.com/"rule"',
+        "text": 'Line one\nLine "two" \\ café \U0001f600',
+        "position_map": [{"page": 1, "char_start": 0, "char_end": 10}],
+    }
+    raw = json.dumps(doc).encode("utf-8")
+    reader = NormalizedDocumentReader(io.BytesIO(raw), chunk_size=3)
+    assert "".join(reader.iter_text()) == doc["text"]
+    assert reader.fields == {k: v for k, v in doc.items() if k != "text"}
+
+
+def test_windowed_extraction_matches_full_text():
+    text = SENTENCE * 500
+    chunks = [text[i : i + 777] for i in range(0, len(text), 777)]
+    windowed = extract_entities_windowed(chunks, window_chars=4096, overlap_chars=512)
+    assert windowed == extract_entities(text)
+
+
+def test_windowed_extraction_does_not_truncate():
+    count = 40_000
+    text = SENTENCE * count
+    entities = extract_entities_windowed([text], window_chars=500_000)
+    # One obligation, one threshold and one jurisdiction per sentence
+    assert len(entities) == 3 * count
+    assert max(e["end"] for e in entities) > 2_000_000
@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+
+import pytest
+
+pytest.importorskip("msgpack")
+
+from json_codec import dumps
+from wire_format import (
+    JSON,
+    MSGPACK_V1,
+    WIRE_FORMAT_HEADER,
+    WireFormatError,
+    compression_type,
+    decode_event,
+    encode_event,
+)
+
+EVENT = {
+    "event_id": "evt-1",
+    "document_id": "doc-1",
+    "timestamp": "2024-01-01T00:00:00+00:00",
+    "source_url": None,
+    "base_content_sha256": "abc",
+    "entities": [
+        {"type": "OBLIGATION", "text": "Banks shall file.", "start": 0, "end": 17},
+        {
+            "type": "THRESHOLD",
+            "text": "5%",
+            "start": 20,
+            "end": 22,
+            "attrs": {"value": 5.0, "unit": "%", "unit_normalized": None},
+            "change": "changed",
+        },
+        {
+            "type": "JURISDICTION",
+            "text": "EU",
+            "start": 30,
+            "end": 32,
+            "attrs": {"name": "EU", "source": "gazetteer"},
+        },
+        {"type": "OBLIGATION", "text": "", "start": 40, "end": 40, "attrs": {}},
+    ],
+    "removed_entities": [
+        {"type": "CITATION", "text": "12 CFR 3", "start": 5, "end": 13, "attrs": {}}
+    ],
+}
+
+
+@pytest.mark.parametrize("fmt", [JSON, MSGPACK_V1])
+def test_round_trip(fmt):
+    value, headers = encode_event(EVENT, fmt)
+    assert headers == [(WIRE_FORMAT_HEADER, fmt.encode())]
+    assert decode_event(value, headers) == EVENT
+
+
+def test_records_without_header_are_json():
+    assert decode_event(dumps(EVENT), None) == EVENT
+    assert decode_event(dumps(EVENT), [("other", b"x")]) == EVENT
+
+
+def test_msgpack_is_smaller_for_entity_heavy_events():
+    event = {**EVENT, "entities": EVENT["entities"] * 500}
+    json_value, _ = encode_event(event, JSON)
+    packed_value, _ = encode_event(event, MSGPACK_V1)
+    assert len(packed_value) < len(json_value) * 0.7
+
+
+def test_malformed_and_unknown_formats_raise():
+    with pytest.raises(WireFormatError):
+        decode_event(b"\x93\x01", [(WIRE_FORMAT_HEADER, MSGPACK_V1.encode())])
+    with pytest.raises(WireFormatError):
+        decode_event(b"{}", [(WIRE_FORMAT_HEADER, b"avro")])
+
+
+def test_compression_type_setting():
+    assert compression_type("none") is None
+    assert compression_type("") is None
+    assert compression_type("ZSTD") == "zstd"
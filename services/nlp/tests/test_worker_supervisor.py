@@ -0,0 +1,245 @@
+import multiprocessing
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+import worker_supervisor
+from structlog.testing import capture_logs
+from worker_supervisor import (
+    MULTIPROC_ENV,
+    WORKER_RESTARTS,
+    WorkerSpec,
+    WorkerSupervisor,
+    render_metrics,
+)
+
+_STOP = threading.Event()
+
+
+def _serve(ready=None):
+    if ready is not None:
+        Path(ready).touch()
+    _STOP.wait()
+
+
+def _stop_serving():
+    _STOP.set()
+
+
+def _count_event():
+    from prometheus_client import Counter
+
+    Counter("supervised_worker_events", "Events counted in a worker").inc()
+
+
+class FakeProcess:
+    pids = iter(range(1000, 2000))
+
+    def __init__(self, crash):
+        self.crash = crash
+        self.pid = None
+        self.exitcode = None
+        self._alive = False
+
+    def start(self):
+        self.pid = next(self.pids)
+        self._alive = not self.crash
+        self.exitcode = 1 if self.crash else None
+
+    def is_alive(self):
+        return self._alive
+
+    def exit(self, code=1):
+        self._alive, self.exitcode = False, code
+
+    def terminate(self):
+        self.exit(-15)
+
+    def join(self, timeout=None):
+        return None
+
+
+class FakeContext:
+    def __init__(self):
+        self.crash = True
+        self.procs = []
+
+    def Process(self, target, args, name, daemon):
+        proc = FakeProcess(self.crash)
+        self.procs.append(proc)
+        return proc
+
+
+class Ticks:
+    """Stands in for the shutdown event; each wait runs the next scripted tick."""
+
+    def __init__(self, ticks):
+        self.ticks = list(ticks)
+
+    def wait(self, timeout=None):
+        if not self.ticks:
+            return True
+        self.ticks.pop(0)()
+        return False
+
+    def is_set(self):
+        return False
+
+    def set(self):
+        self.ticks = []
+
+
+@pytest.fixture
+def supervised(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(
+        worker_supervisor, "time", SimpleNamespace(monotonic=lambda: clock.now)
+    )
+    supervisor = WorkerSupervisor(
+        [WorkerSpec("w", _serve, _stop_serving)],
+        backoff_initial=1.0,
+        backoff_max=4.0,
+        healthy_after=30.0,
+    )
+    supervisor._ctx = FakeContext()
+
+    def tick(action=None, seconds=10.0):
+        def run():
+            clock.now += seconds
+            if action is not None:
+                action()
+
+        return run
+
+    return supervisor, tick
+
+
+def _watch(supervisor, ticks):
+    supervisor._shutdown = Ticks(ticks)
+    with capture_logs() as logs:
+        supervisor._watch()
+    return [log["restart_in"] for log in logs if log["event"] == "worker_exited"]
+
+
+def test_backoff_doubles_up_to_the_maximum(supervised):
+    supervisor, tick = supervised
+    restarts = WORKER_RESTARTS.labels(worker="w")._value.get()
+    supervisor._spawn("w")
+
+    delays = _watch(supervisor, [tick() for _ in range(7)])
+
+    assert delays == [1.0, 2.0, 4.0, 4.0]
+    assert len(supervisor._ctx.procs) == 4
+    assert WORKER_RESTARTS.labels(worker="w")._value.get() - restarts == 3
+
+
+def test_backoff_resets_once_a_worker_stays_up(supervised):
+    supervisor, tick = supervised
+    ctx = supervisor._ctx
+    supervisor._spawn("w")
+
+    def recover():
+        ctx.crash = False
+
+    def crash():
+        ctx.procs[-1].exit()
+
+    delays = _watch(
+        supervisor,
+        [
+            tick(),
+            tick(),
+            tick(),
+            tick(recover),
+            tick(),
+            tick(seconds=40.0),
+            tick(crash),
+        ],
+    )
+
+    # The first two crashes grew the backoff; 40s up resets it.
+    assert delays == [1.0, 2.0, 1.0]
+    assert supervisor._backoff["w"] == 2.0
+
+
+def test_dead_workers_are_marked_in_multiprocess_mode(
+    supervised, monkeypatch, tmp_path
+):
+    from prometheus_client import multiprocess
+
+    supervisor, tick = supervised
+    marked = []
+    monkeypatch.setenv(MULTIPROC_ENV, str(tmp_path))
+    monkeypatch.setattr(multiprocess, "mark_process_dead", marked.append)
+    supervisor._spawn("w")
+
+    _watch(supervisor, [tick(), tick(), tick()])
+    assert marked == [proc.pid for proc in supervisor._ctx.procs]
+
+    supervisor._ctx.crash = False
+    supervisor._spawn("w")
+    supervisor.stop()
+    assert marked[-1] == supervisor._ctx.procs[-1].pid
+    assert supervisor.alive() == {"w": False}
+
+
+def test_dead_workers_are_not_marked_without_multiprocess_mode(monkeypatch):
+    from prometheus_client import multiprocess
+
+    marked = []
+    monkeypatch.delenv(MULTIPROC_ENV, raising=False)
+    monkeypatch.setattr(multiprocess, "mark_process_dead", marked.append)
+    worker_supervisor._mark_dead(1234)
+    monkeypatch.setenv(MULTIPROC_ENV, "/unused")
+    worker_supervisor._mark_dead(None)
+    assert marked == []
+
+
+def test_stop_terminates_and_joins_workers(tmp_path):
+    ready = tmp_path / "ready"
+    supervisor = WorkerSupervisor(
+        [WorkerSpec("serve", _serve, _stop_serving, (str(ready),))], stop_timeout=30.0
+    )
+    supervisor.start()
+    try:
+        deadline = time.monotonic() + 30
+        while not ready.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert supervisor.alive() == {"serve": True}
+    finally:
+        supervisor.stop()
+
+    proc = supervisor._procs["serve"]
+    assert supervisor.alive() == {"serve": False}
+    # SIGTERM runs the spec's stop hook, so the worker exits cleanly.
+    assert proc.exitcode == 0
+    assert not supervisor._monitor.is_alive()
+
+
+def test_render_metrics_aggregates_worker_processes(monkeypatch, tmp_path):
+    monkeypatch.setenv(MULTIPROC_ENV, str(tmp_path))
+    for _ in range(2):
+        proc = multiprocessing.get_context("spawn").Process(target=_count_event)
+        proc.start()
+        proc.join(30)
+        assert proc.exitcode == 0
+
+    body, content_type = render_metrics()
+
+    assert content_type.startswith("text/plain")
+    assert b"supervised_worker_events_total 2.0" in body
+
+
+def test_render_metrics_uses_the_process_registry_by_default(monkeypatch):
+    monkeypatch.delenv(MULTIPROC_ENV, raising=False)
+    body, _ = render_metrics()
+    assert b"consumer_worker_restarts_total" in body
@@ -0,0 +1,295 @@
+"""In-memory arbitrage over NumPy snapshots of the threshold entries.
+
+The engine is a :class:`~.snapshot.SnapshotView` that keeps one
+:class:`GroupArrays` per ``(concept, unit)`` group: the group's entries
+sorted by value with their provision codes, document ``created_at`` and a
+jurisdiction bitset per entry. Each refresh rebuilds only the groups the
+changed provisions touch and swaps the new group map in; provisions closed
+since the last refresh leave their groups.
+
+A request masks each group's entries by ``j1``/``j2`` and ``since`` and
+scores pairs of the lowest and highest entries of both sides as one NumPy
+matrix, keeping the best ``limit`` with ``argpartition``. The window bound
+is the one :mod:`.comparison_index` uses: pairs outside the windows differ by
+at most the bound, so once ``limit`` candidates reach it the group is exact.
+Groups whose widest possible gap cannot beat the current ``limit``-th best
+are skipped.
+
+Rows have the columns of ``GraphReader.arbitrage`` and reflect the graph as
+of the last refresh.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from graph_store import GraphChanges, GraphReader
+
+from .comparison_index import GROWTH, Group, pair_row
+from .config import settings
+from .snapshot import SnapshotView, ready_view, start_view
+from .store import get_store
+
+NO_TIMESTAMP = np.iinfo(np.int64).min
+# Fields of an entry that ``pair_row`` copies into a result row.
+ENTRY_FIELDS = ("value", "text", "doc_id", "start", "end", "source_url")
+
+SETTING = "ARBITRAGE_ENGINE"
+
+
+@dataclass(frozen=True)
+class GroupArrays:
+    """Entries of one ``(concept, unit)`` group, sorted by value."""
+
+    values: np.ndarray
+    provisions: np.ndarray
+    created_at: np.ndarray
+    jurisdictions: np.ndarray
+    entries: List[dict]
+
+    def select(self, jurisdiction: Optional[int], since: Optional[int]) -> np.ndarray:
+        """Positions of the entries in ``jurisdiction`` created at or after ``since``.
+
+        ``jurisdiction`` is a bit code, or None for no jurisdiction filter.
+        """
+
+        mask = np.ones(len(self.values), dtype=bool)
+        if jurisdiction is not None:
+            word, bit = divmod(jurisdiction, 64)
+            if word >= self.jurisdictions.shape[1]:
+                return np.empty(0, dtype=np.intp)
+            mask &= (self.jurisdictions[:, word] & np.uint64(1 << bit)) != 0
+        if since is not None:
+            mask &= self.created_at >= since
+        return np.flatnonzero(mask)
+
+
+def build_group(items: List[dict], codes: Dict[str, int]) -> GroupArrays:
+    """Arrays for one group's entries; new jurisdictions are added to ``codes``."""
+
+    items = sorted(items, key=lambda item: item["value"])
+    for item in items:
+        for name in item["jurisdictions"]:
+            codes.setdefault(name, len(codes))
+    provision_codes: Dict[str, int] = {}
+    bits = np.zeros((len(items), max(1, -(-len(codes) // 64))), dtype=np.uint64)
+    for row, item in enumerate(items):
+        for name in item["jurisdictions"]:
+            word, bit = divmod(codes[name], 64)
+            bits[row, word] |= np.uint64(1 << bit)
+    return GroupArrays(
+        values=np.array([item["value"] for item in items], dtype=np.float64),
+        provisions=np.array(
+            [
+                provision_codes.setdefault(item["provision"], len(provision_codes))
+                for item in items
+            ],
+            dtype=np.int64,
+        ),
+        created_at=np.array(
+            [
+                NO_TIMESTAMP if item["created_at"] is None else item["created_at"]
+                for item in items
+            ],
+            dtype=np.int64,
+        ),
+        jurisdictions=bits,
+        entries=[{key: item[key] for key in ENTRY_FIELDS} for item in items],
+    )
+
+
+def _ends(n: int, size: int) -> np.ndarray:
+    """Positions of the lowest and highest ``size`` of ``n`` sorted entries."""
+
+    if n <= 2 * size:
+        return np.arange(n)
+    return np.r_[0:size, n - size : n]
+
+
+def group_top_k(
+    group: GroupArrays,
+    a: np.ndarray,
+    b: np.ndarray,
+    limit: int,
+    rel_delta: float,
+    window: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The best ``limit`` pairs of positions ``a`` x ``b``: gaps, firsts, seconds."""
+
+    va, vb = group.values[a], group.values[b]
+    size = max(window, limit)
+    while True:
+        terms = []
+        if len(a) > 2 * size:
+            terms += [va[-size - 1] - vb[0], vb[-1] - va[size]]
+        if len(b) > 2 * size:
+            terms += [va[-1] - vb[size], vb[-size - 1] - va[0]]
+        bound = max(terms) if terms else None
+
+        first, second = a[_ends(len(a), size)], b[_ends(len(b), size)]
+        x = group.values[first][:, None]
+        y = group.values[second][None, :]
+        gaps = np.abs(x - y)
+        ok = group.provisions[first][:, None] != group.provisions[second][None, :]
+        ok &= gaps / np.where(x == 0, 1.0, x) >= rel_delta
+        flat = np.flatnonzero(ok)
+        gaps = gaps.ravel()[flat]
+        if len(flat) > limit:
+            best = np.argpartition(-gaps, limit - 1)[:limit]
+            flat, gaps = flat[best], gaps[best]
+        if bound is None or (len(flat) == limit and gaps.min() >= bound):
+            rows, cols = np.divmod(flat, len(second))
+            return gaps, first[rows], second[cols]
+        size *= GROWTH
+
+
+class ArbitrageEngine(SnapshotView):
+    """Arbitrage from an in-memory snapshot refreshed every ``refresh_s`` seconds."""
+
+    name = "arbitrage"
+
+    def __init__(self, reader: GraphReader, refresh_s: float) -> None:
+        super().__init__(reader, refresh_s)
+        self._provisions: Dict[str, dict] = {}
+        self._members: Dict[Group, Set[str]] = {}
+        self._codes: Dict[str, int] = {}
+        self._groups: Dict[Group, GroupArrays] = {}
+
+    @staticmethod
+    def _provision_groups(provision: dict) -> Iterable[Group]:
+        for entry in provision["entries"]:
+            if entry["unit"] is not None and entry["value"] is not None:
+                yield entry["concept"], entry["unit"]
+
+    def apply(self, changes: GraphChanges) -> int:
+        dirty: Set[Group] = set()
+        if changes.reset:
+            dirty.update(self._members)
+            self._provisions, self._members = {}, {}
+        for provision in changes.provisions:
+            old = self._provisions.pop(provision["pid"], None)
+            for group in self._provision_groups(old) if old else ():
+                self._members[group].discard(provision["pid"])
+                dirty.add(group)
+            if provision.get("valid_to") is not None:
+                # Closed since the last refresh: dropped like a deletion.
+                continue
+            for group in self._provision_groups(provision):
+                self._members.setdefault(group, set()).add(provision["pid"])
+                dirty.add(group)
+            self._provisions[provision["pid"]] = provision
+
+        groups = {} if changes.reset else dict(self._groups)
+        for group in dirty:
+            pids = self._members.get(group)
+            if not pids:
+                self._members.pop(group, None)
+                groups.pop(group, None)
+                continue
+            groups[group] = build_group(self._items(group, pids), self._codes)
+        self._groups = groups
+        return len(dirty)
+
+    def _items(self, group: Group, pids: Set[str]) -> List[dict]:
+        items = []
+        for pid in pids:
+            provision = self._provisions[pid]
+            for entry in provision["entries"]:
+                if (entry["concept"], entry["unit"]) != group:
+                    continue
+                if entry["value"] is None:
+                    continue
+                items.append(
+                    {
+                        "value": entry["value"],
+                        "provision": pid,
+                        "jurisdictions": entry["jurisdictions"] or [],
+                        "text": provision["text"],
+                        "doc_id": provision["doc_id"],
+                        "start": provision["start"],
+                        "end": provision["end"],
+                        "source_url": provision["source_url"],
+                        "created_at": provision["created_at"],
+                    }
+                )
+        return items
+
+    def arbitrage(
+        self,
+        *,
+        rel_delta: float,
+        limit: int,
+        j1: Optional[str] = None,
+        j2: Optional[str] = None,
+        concept: Optional[str] = None,
+        since: Optional[int] = None,
+    ) -> List[dict]:
+        """Same rows as ``GraphReader.arbitrage``, from the snapshot."""
+
+        groups = self._groups
+        by_jurisdiction = bool(j1 and j2)
+        sides: Tuple[Optional[int], Optional[int]] = (None, None)
+        if by_jurisdiction:
+            sides = (self._codes.get(j1, -1), self._codes.get(j2, -1))
+            if -1 in sides:
+                return []
+
+        scored = []
+        for key, group in groups.items():
+            if concept and key[0].lower() != concept.lower():
+                continue
+            a = group.select(sides[0], since)
+            b = group.select(sides[1], since) if by_jurisdiction else a
+            if not len(a) or not len(b):
+                continue
+            widest = max(
+                group.values[a[-1]] - group.values[b[0]],
+                group.values[b[-1]] - group.values[a[0]],
+            )
+            scored.append((widest, key, group, a, b))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        found: List[Tuple[np.ndarray, Group, GroupArrays, np.ndarray, np.ndarray]] = []
+        best: List[float] = []
+        for widest, key, group, a, b in scored:
+            if len(best) >= limit and widest < best[limit - 1]:
+                break
+            gaps, firsts, seconds = group_top_k(
+                group, a, b, limit, rel_delta, settings.arbitrage_window
+            )
+            found.append((gaps, key, group, firsts, seconds))
+            best = sorted([*best, *gaps.tolist()], reverse=True)[:limit]
+
+        rows = [
+            (gap, key, group, first, second)
+            for gaps, key, group, firsts, seconds in found
+            for gap, first, second in zip(gaps.tolist(), firsts, seconds)
+        ]
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return [
+            pair_row(key, group.entries[first], group.entries[second])
+            for _, key, group, first, second in rows[:limit]
+        ]
+
+
+def start_engine() -> None:
+    """Start the background refresh when ``ARBITRAGE_ENGINE=memory``."""
+
+    start_view(
+        SETTING,
+        settings.arbitrage_engine,
+        lambda refresh_s: ArbitrageEngine(get_store(), refresh_s),
+    )
+
+
+def ready_engine() -> Optional[ArbitrageEngine]:
+    """The engine once its first snapshot is loaded; None until then."""
+
+    return ready_view(SETTING)
@@ -0,0 +1,158 @@
+"""Bounded top-k arbitrage over the materialized threshold comparison index.
+
+The graph writer keeps one entry per (provision, threshold) on the
+``HAS_THRESHOLD`` edge, grouped by ``(concept, unit)`` and indexed by value,
+so the lowest or highest ``n`` entries of a group are an index-ordered read
+of ``n`` rows.
+
+Within a group the largest ``|v1 - v2|`` pairs combine the lowest values of
+one side with the highest values of the other. For a window of ``n`` entries
+from each end of both sides, every pair that is not a candidate differs by at
+most :func:`excluded_bound`; once ``limit`` candidates reach that bound the
+group's answer is exact. Otherwise the window grows and only the unresolved
+groups are read again. Side 1 holds entries of ``j1`` and side 2 those of
+``j2``; without a jurisdiction filter both sides are the same entries.
+
+Rows have the columns of ``CYPHER_ARBITRAGE_BASE`` and, like it, include
+each pair in both orders when both pass ``rel_delta``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+Group = Tuple[str, str]
+# read(groups, side, descending, n) -> entries of each group, sorted by value
+Reader = Callable[[Sequence[Group], int, bool, int], Dict[Group, List[dict]]]
+
+GROWTH = 4
+
+
+@dataclass
+class Window:
+    """Up to ``size + 1`` entries from each end of one side of a group."""
+
+    low: List[dict]
+    high: List[dict]
+    size: int
+
+    @property
+    def complete(self) -> bool:
+        return len(self.low) <= self.size
+
+
+def _ratio_ok(v1: float, v2: float, rel_delta: float) -> bool:
+    return abs(v1 - v2) / (v1 if v1 != 0 else 1) >= rel_delta
+
+
+def pair_row(group: Group, a: dict, b: dict) -> dict:
+    return {
+        "concept": group[0],
+        "unit": group[1],
+        "text1": a["text"],
+        "v1": a["value"],
+        "text2": b["text"],
+        "v2": b["value"],
+        "doc_id_1": a["doc_id"],
+        "start_1": a["start"],
+        "end_1": a["end"],
+        "doc_id_2": b["doc_id"],
+        "start_2": b["start"],
+        "end_2": b["end"],
+        "source_url_1": a["source_url"],
+        "source_url_2": b["source_url"],
+    }
+
+
+def candidates(
+    group: Group, a: Window, b: Window, rel_delta: float
+) -> List[Tuple[float, dict]]:
+    """Pairs of window entries that pass ``rel_delta``, largest gap first."""
+
+    seen = set()
+    found = []
+    for firsts, seconds in (
+        (a.low[: a.size], b.high[: b.size]),
+        (a.high[: a.size], b.low[: b.size]),
+    ):
+        for x in firsts:
+            for y in seconds:
+                if x["provision"] == y["provision"]:
+                    continue
+                key = (x["provision"], x["threshold"], y["provision"], y["threshold"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                if _ratio_ok(x["value"], y["value"], rel_delta):
+                    found.append((abs(x["value"] - y["value"]), pair_row(group, x, y)))
+    found.sort(key=lambda item: item[0], reverse=True)
+    return found
+
+
+def excluded_bound(a: Window, b: Window) -> Optional[float]:
+    """Largest gap a pair outside the windows can have; None if none is outside."""
+
+    if not a.low or not b.low:
+        return None
+    terms = []
+    if len(a.high) > a.size:
+        terms.append(a.high[a.size]["value"] - b.low[0]["value"])
+    if len(b.low) > b.size:
+        terms.append(a.high[0]["value"] - b.low[b.size]["value"])
+    if len(b.high) > b.size:
+        terms.append(b.high[b.size]["value"] - a.low[0]["value"])
+    if len(a.low) > a.size:
+        terms.append(b.high[0]["value"] - a.low[a.size]["value"])
+    return max(terms) if terms else None
+
+
+def group_top_k(
+    group: Group, a: Window, b: Window, limit: int, rel_delta: float
+) -> Optional[List[Tuple[float, dict]]]:
+    """The group's best ``limit`` pairs, or None if the windows are too small."""
+
+    found = candidates(group, a, b, rel_delta)
+    bound = excluded_bound(a, b)
+    if bound is None:
+        return found[:limit]
+    exact = [item for item in found if item[0] >= bound]
+    if len(exact) >= limit:
+        return exact[:limit]
+    return None
+
+
+def top_k_arbitrage(
+    groups: Sequence[Group],
+    read: Reader,
+    *,
+    limit: int,
+    rel_delta: float,
+    window: int,
+    same_sides: bool,
+) -> List[dict]:
+    found: List[Tuple[float, dict]] = []
+    pending = list(groups)
+    size = max(window, limit)
+    while pending:
+        windows = {}
+        for side in (1,) if same_sides else (1, 2):
+            low = read(pending, side, False, size + 1)
+            high = read(pending, side, True, size + 1)
+            windows[side] = {
+                group: Window(low.get(group, []), high.get(group, []), size)
+                for group in pending
+            }
+        unresolved = []
+        for group in pending:
+            a = windows[1][group]
+            b = a if same_sides else windows[2][group]
+            pairs = group_top_k(group, a, b, limit, rel_delta)
+            if pairs is None:
+                unresolved.append(group)
+            else:
+                found.extend(pairs)
+        pending = unresolved
+        size *= GROWTH
+    found.sort(key=lambda item: item[0], reverse=True)
+    return [row for _, row in found[:limit]]
@@ -9,11 +9,26 @@ class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
+    graph_backend: str = Field(default="neo4j", alias="GRAPH_BACKEND")
+    sqlite_path: str = Field(default="graph.sqlite3", alias="GRAPH_SQLITE_PATH")
     neo4j_uri: str = Field(default="bolt://neo4j:7687", alias="NEO4J_URI")
     neo4j_user: str = Field(default="neo4j", alias="NEO4J_USER")
     neo4j_password: str = Field(..., alias="NEO4J_PASSWORD")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     api_key: str | None = Field(default=None, alias="API_KEY")
+    arbitrage_window: int = Field(default=50, ge=1, alias="ARBITRAGE_WINDOW")
+    arbitrage_engine: str = Field(default="memory", alias="ARBITRAGE_ENGINE")
+    gap_engine: str = Field(default="memory", alias="GAP_ENGINE")
+    snapshot_refresh_ms: int = Field(default=1000, ge=1, alias="SNAPSHOT_REFRESH_MS")
+    result_cache_max_entries: int = Field(
+        default=1024, ge=0, alias="RESULT_CACHE_MAX_ENTRIES"
+    )
+    result_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024, ge=0, alias="RESULT_CACHE_MAX_BYTES"
+    )
+    result_cache_version_ttl_ms: int = Field(
+        default=1000, ge=0, alias="RESULT_CACHE_VERSION_TTL_MS"
+    )
 
 
 @lru_cache(maxsize=1)
@@ -0,0 +1,202 @@
+"""Jurisdiction x concept coverage bitmap for gap analysis.
+
+``covered[j, c]`` is True when jurisdiction ``j`` has a provision about
+concept ``c``. The concepts ``j1`` covers and ``j2`` does not are then
+``covered[j1] & ~covered[j2]``, and the gap counts of every jurisdiction
+pair are one boolean matrix product, instead of a ``NOT EXISTS`` subquery
+per provision and pair.
+
+:class:`CoverageIndex` is a :class:`~.snapshot.SnapshotView`: it keeps
+per-cell provision counts and the provisions of each cell (the example rows
+``gaps`` returns), updates them from the provisions changed since its last
+refresh and publishes a new :class:`Coverage` after each one.
+:meth:`Coverage.from_pairs` builds the bitmap alone from
+``GraphReader.coverage`` when the index is not loaded.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from graph_store import GraphChanges, GraphReader
+
+from .config import settings
+from .snapshot import SnapshotView, ready_view, start_view
+from .store import get_store
+
+SETTING = "GAP_ENGINE"
+
+Cell = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class Coverage:
+    """Which jurisdictions have provisions about which concepts."""
+
+    jurisdictions: List[str]
+    concepts: List[str]
+    covered: np.ndarray
+    # Graph change version the coverage was built at; None if unknown.
+    version: Optional[int] = None
+    # Rows in the shape of ``GraphReader.gaps`` for each covered cell.
+    examples: Dict[Cell, Tuple[dict, ...]] = field(default_factory=dict)
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[dict]) -> "Coverage":
+        jurisdictions: Dict[str, int] = {}
+        concepts: Dict[str, int] = {}
+        cells = [
+            (
+                jurisdictions.setdefault(pair["jurisdiction"], len(jurisdictions)),
+                concepts.setdefault(pair["concept"], len(concepts)),
+            )
+            for pair in pairs
+        ]
+        covered = np.zeros((len(jurisdictions), len(concepts)), dtype=bool)
+        if cells:
+            covered[tuple(np.array(cells).T)] = True
+        return cls(list(jurisdictions), list(concepts), covered)
+
+    def row(self, jurisdiction: str) -> np.ndarray:
+        """Concepts ``jurisdiction`` covers; none if it has no provisions."""
+
+        try:
+            return self.covered[self.jurisdictions.index(jurisdiction)]
+        except ValueError:
+            return np.zeros(len(self.concepts), dtype=bool)
+
+    def gap_concepts(self, j1: str, j2: str) -> List[str]:
+        """Concepts with a provision in ``j1`` and none in ``j2``."""
+
+        missing = self.row(j1) & ~self.row(j2)
+        return [self.concepts[c] for c in np.flatnonzero(missing)]
+
+    def gaps(self, j1: str, j2: str, limit: int) -> List[dict]:
+        """Same rows as ``GraphReader.gaps``, from the bitmap."""
+
+        if j1 not in self.jurisdictions:
+            return []
+        j = self.jurisdictions.index(j1)
+        rows: List[dict] = []
+        for c in np.flatnonzero(self.row(j1) & ~self.row(j2)):
+            rows.extend(self.examples.get((j, int(c)), ()))
+            if len(rows) >= limit:
+                break
+        return rows[:limit]
+
+    def matrix(
+        self, jurisdictions: Optional[Sequence[str]] = None
+    ) -> Tuple[List[str], np.ndarray]:
+        """Gap counts of every ordered pair of ``jurisdictions`` (all if None).
+
+        ``counts[i, k]`` is the number of concepts jurisdiction ``i`` covers
+        and jurisdiction ``k`` does not.
+        """
+
+        names = list(jurisdictions or sorted(self.jurisdictions))
+        rows = np.array([self.row(name) for name in names], dtype=np.int32)
+        rows = rows.reshape(len(names), len(self.concepts))
+        return names, rows @ (1 - rows).T
+
+
+class CoverageIndex(SnapshotView):
+    """Coverage bitmap refreshed every ``refresh_s`` seconds."""
+
+    name = "coverage"
+
+    def __init__(self, reader: GraphReader, refresh_s: float) -> None:
+        super().__init__(reader, refresh_s)
+        self.coverage = Coverage([], [], np.zeros((0, 0), dtype=bool))
+        self._reset()
+
+    def _reset(self) -> None:
+        self._jurisdictions: Dict[str, int] = {}
+        self._concepts: Dict[str, int] = {}
+        self._counts = np.zeros((8, 64), dtype=np.int32)
+        self._cells: Dict[Cell, Dict[str, dict]] = {}
+        self._provision_cells: Dict[str, List[Cell]] = {}
+
+    def _cell(self, jurisdiction: str, concept: str) -> Cell:
+        j = self._jurisdictions.setdefault(jurisdiction, len(self._jurisdictions))
+        c = self._concepts.setdefault(concept, len(self._concepts))
+        rows, cols = self._counts.shape
+        if j >= rows or c >= cols:
+            grown = np.zeros(
+                (max(rows, 2 * j + 1), max(cols, 2 * c + 1)), dtype=np.int32
+            )
+            grown[:rows, :cols] = self._counts
+            self._counts = grown
+        return j, c
+
+    def apply(self, changes: GraphChanges) -> int:
+        if changes.reset:
+            self._reset()
+        dirty: Set[Cell] = set()
+        for provision in changes.provisions:
+            pid = provision["pid"]
+            for cell in self._provision_cells.pop(pid, ()):
+                self._counts[cell] -= 1
+                del self._cells[cell][pid]
+                dirty.add(cell)
+            # A provision closed since the last refresh is dropped like a
+            # deletion.
+            if provision["concept"] is None or provision.get("valid_to") is not None:
+                continue
+            row = {
+                "concept": provision["concept"],
+                "example_text": provision["text"],
+                "doc_id": provision["doc_id"],
+                "start": provision["start"],
+                "end": provision["end"],
+                "source_url": provision["source_url"],
+            }
+            cells = [
+                self._cell(name, provision["concept"])
+                for name in set(provision["jurisdictions"] or ())
+            ]
+            for cell in cells:
+                self._counts[cell] += 1
+                self._cells.setdefault(cell, {})[pid] = row
+                dirty.add(cell)
+            self._provision_cells[pid] = cells
+
+        examples = {} if changes.reset else dict(self.coverage.examples)
+        for cell in dirty:
+            if self._cells.get(cell):
+                examples[cell] = tuple(self._cells[cell].values())
+            else:
+                self._cells.pop(cell, None)
+                examples.pop(cell, None)
+        covered = self._counts[: len(self._jurisdictions), : len(self._concepts)] > 0
+        self.coverage = Coverage(
+            list(self._jurisdictions),
+            list(self._concepts),
+            covered,
+            changes.version,
+            examples,
+        )
+        return len(dirty)
+
+
+def start_coverage() -> None:
+    """Start the background refresh when ``GAP_ENGINE=memory``."""
+
+    start_view(
+        SETTING,
+        settings.gap_engine,
+        lambda refresh_s: CoverageIndex(get_store(), refresh_s),
+    )
+
+
+def ready_coverage() -> Optional[Coverage]:
+    """The latest coverage once the index has loaded; None until then."""
+
+    index = ready_view(SETTING)
+    return index.coverage if index is not None else None
@@ -0,0 +1,125 @@
+"""Neo4j indexes owned by the opportunity service's read queries.
+
+Usage::
+
+    python -m app.migrations status    # list applied and pending migrations
+    python -m app.migrations apply     # apply pending migrations
+    python -m app.migrations explain   # flag label scans in arbitrage/gap queries
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from graph_migrations import Migration, Statement, Step, apply_on_startup, run_cli
+
+from .neo4j_utils import (
+    CYPHER_CHANGED_PROVISIONS,
+    CYPHER_COMPARISON_GROUPS,
+    CYPHER_COVERAGE,
+    CYPHER_GAP,
+    build_arbitrage_query,
+    build_comparison_query,
+    get_driver,
+)
+
+SCOPE = "opportunity"
+
+MIGRATIONS = (
+    Migration(
+        1,
+        "Range indexes for arbitrage unit and recency filters",
+        (
+            Step(
+                "CREATE INDEX threshold_unit_normalized IF NOT EXISTS "
+                "FOR (t:Threshold) ON (t.unit_normalized)"
+            ),
+            Step(
+                "CREATE INDEX document_created_at IF NOT EXISTS "
+                "FOR (d:Document) ON (d.created_at)"
+            ),
+        ),
+    ),
+)
+
+
+def statements() -> Dict[str, Statement]:
+    """Arbitrage variants and the gap query, with representative parameters.
+
+    The legacy arbitrage query starts from the concept dictionary and the
+    comparison index from its groups; both are small enough to scan.
+    """
+
+    params = {
+        "rel_delta": 0.1,
+        "limit": 50,
+        "j1": "US",
+        "j2": "EU",
+        "concept": "capital",
+        "since": 0,
+    }
+    found = {}
+    for j1, j2 in ((None, None), ("US", "EU")):
+        for concept in (None, "capital"):
+            for include_since in (False, True):
+                name = "arbitrage" + "".join(
+                    suffix
+                    for suffix, on in (
+                        ("+jurisdictions", j1),
+                        ("+concept", concept),
+                        ("+since", include_since),
+                    )
+                    if on
+                )
+                found[name] = Statement(
+                    build_arbitrage_query(j1, j2, concept, include_since),
+                    params,
+                    allow_scans=("Concept",),
+                )
+    found["comparison_groups"] = Statement(
+        CYPHER_COMPARISON_GROUPS, {"concept": None}, allow_scans=("ComparisonGroup",)
+    )
+    entries = {
+        "groups": [{"concept": "capital", "unit": "percent"}],
+        "window": 51,
+        "jurisdiction": "US",
+        "since": 0,
+    }
+    for descending in (False, True):
+        for jurisdiction in (False, True):
+            for include_since in (False, True):
+                name = "comparison_" + ("high" if descending else "low")
+                name += "+jurisdiction" if jurisdiction else ""
+                name += "+since" if include_since else ""
+                found[name] = Statement(
+                    build_comparison_query(descending, jurisdiction, include_since),
+                    entries,
+                )
+    found["gaps"] = Statement(CYPHER_GAP, {"j1": "US", "j2": "EU", "limit": 50})
+    found["coverage"] = Statement(CYPHER_COVERAGE, {}, allow_scans=("Jurisdiction",))
+    found["changes"] = Statement(
+        CYPHER_CHANGED_PROVISIONS, {"after": 0, "closed": True}
+    )
+    return found
+
+
+def migrate_on_startup() -> None:
+    apply_on_startup(lambda: get_driver().session(), SCOPE, MIGRATIONS)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    return run_cli(
+        argv,
+        scope=SCOPE,
+        migrations=MIGRATIONS,
+        statements=statements,
+        session_factory=lambda: get_driver().session(),
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
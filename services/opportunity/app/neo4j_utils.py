@@ -34,11 +34,10 @@ CYPHER_ARBITRAGE_BASE = """
 MATCH (c:Concept)<-[:ABOUT]-(p1:Provision)-[:HAS_THRESHOLD]->(t1:Threshold),
       (p2:Provision)-[:ABOUT]->(c),
       (p2)-[:HAS_THRESHOLD]->(t2:Threshold),
-      (p1)-[:PROVENANCE]->(prov1:Provenance),
-      (p2)-[:PROVENANCE]->(prov2:Provenance),
       (p1)-[:IN_DOCUMENT]->(d1:Document),
       (p2)-[:IN_DOCUMENT]->(d2:Document)
-WHERE t1.unit_normalized = t2.unit_normalized
+WHERE p1.valid_to IS NULL AND p2.valid_to IS NULL
+  AND t1.unit_normalized = t2.unit_normalized
   AND t1.unit_normalized IS NOT NULL
   AND abs(t1.value - t2.value) / CASE WHEN t1.value = 0 THEN 1 ELSE t1.value END >= $rel_delta
 {jurisdiction_filter}
@@ -47,12 +46,12 @@ WHERE t1.unit_normalized = t2.unit_normalized
 RETURN c.name AS concept,
        p1.text AS text1, t1.value AS v1, t1.unit_normalized AS unit,
        p2.text AS text2, t2.value AS v2,
-       prov1.doc_id AS doc_id_1,
-       prov1.start AS start_1,
-       prov1.end AS end_1,
-       prov2.doc_id AS doc_id_2,
-       prov2.start AS start_2,
-       prov2.end AS end_2,
+       d1.id AS doc_id_1,
+       p1.start AS start_1,
+       p1.end AS end_1,
+       d2.id AS doc_id_2,
+       p2.start AS start_2,
+       p2.end AS end_2,
        d1.source_url AS source_url_1,
        d2.source_url AS source_url_2
 ORDER BY abs(t1.value - t2.value) DESC
@@ -61,16 +60,17 @@ LIMIT $limit
 
 CYPHER_GAP = """
 MATCH (j1:Jurisdiction {name: $j1})<-[:APPLIES_TO]-(p1:Provision)-[:ABOUT]->(c:Concept)
-WHERE NOT EXISTS {
-  MATCH (j2:Jurisdiction {name: $j2})<-[:APPLIES_TO]-(p2:Provision)-[:ABOUT]->(c)
-}
-MATCH (p1)-[:PROVENANCE]->(prov:Provenance)
+WHERE p1.valid_to IS NULL
+  AND NOT EXISTS {
+    MATCH (j2:Jurisdiction {name: $j2})<-[:APPLIES_TO]-(p2:Provision)-[:ABOUT]->(c)
+    WHERE p2.valid_to IS NULL
+  }
 MATCH (p1)-[:IN_DOCUMENT]->(d:Document)
 RETURN c.name AS concept,
        p1.text AS example_text,
-       prov.doc_id AS doc_id,
-       prov.start AS start,
-       prov.end AS end,
+       d.id AS doc_id,
+       p1.start AS start,
+       p1.end AS end,
        d.source_url AS source_url
 LIMIT $limit
 """
@@ -96,3 +96,79 @@ def build_arbitrage_query(
         concept_filter=concept_filter,
         since_filter=since_filter,
     )
+
+
+# Materialized comparison index written by the graph service: one
+# ComparisonGroup per (concept, unit) and the entry properties on each
+# HAS_THRESHOLD edge, indexed on (concept, unit, value).
+CYPHER_COMPARISON_GROUPS = """
+MATCH (g:ComparisonGroup)
+WHERE $concept IS NULL OR toLower(g.concept) = toLower($concept)
+RETURN g.concept AS concept, g.unit AS unit
+"""
+
+CYPHER_COMPARISON_ENTRIES = """
+UNWIND $groups AS g
+CALL {{
+  WITH g
+  MATCH (p:Provision)-[r:HAS_THRESHOLD]->(t:Threshold)
+  WHERE r.concept = g.concept AND r.unit = g.unit AND r.value IS NOT NULL
+    AND p.valid_to IS NULL
+{filters}  WITH p, r, t ORDER BY r.value {order} LIMIT $window
+  MATCH (p)-[:IN_DOCUMENT]->(d:Document)
+  RETURN collect({{value: r.value, provision: p.pid, threshold: t.pid,
+                  text: p.text, doc_id: d.id, start: p.start, `end`: p.end,
+                  source_url: d.source_url}}) AS entries
+}}
+RETURN g.concept AS concept, g.unit AS unit, entries
+"""
+
+
+def build_comparison_query(
+    descending: bool, jurisdiction: bool, include_since: bool
+) -> str:
+    """Lowest or highest ``$window`` entries of each group in ``$groups``."""
+
+    filters = ""
+    if jurisdiction:
+        filters += "    AND $jurisdiction IN r.jurisdictions\n"
+    if include_since:
+        filters += "    AND r.created_at >= $since\n"
+    return CYPHER_COMPARISON_ENTRIES.format(
+        filters=filters, order="DESC" if descending else "ASC"
+    )
+
+
+# Which jurisdictions have provisions on which concepts; the fallback source
+# of the gap matrix when the coverage index is not loaded.
+CYPHER_COVERAGE = """
+MATCH (j:Jurisdiction)<-[:APPLIES_TO]-(p:Provision)-[:ABOUT]->(c:Concept)
+WHERE p.valid_to IS NULL
+RETURN DISTINCT j.name AS jurisdiction, c.name AS concept
+"""
+
+
+# Graph change version written by the graph service (see its neo4j_utils).
+# Provisions are stamped with the version of the write that last touched them,
+# including the write that closed them; closed provisions are returned with
+# their valid_to so readers drop them, except when $closed is false (a reset
+# reload, which only needs the open ones).
+CYPHER_GRAPH_VERSION = """
+OPTIONAL MATCH (m:GraphMeta {id: 'graph'})
+RETURN coalesce(m.version, 0) AS version,
+       coalesce(m.reset_version, 0) AS reset_version
+"""
+
+CYPHER_CHANGED_PROVISIONS = """
+MATCH (p:Provision)
+WHERE p.version > $after AND ($closed OR p.valid_to IS NULL)
+MATCH (p)-[:IN_DOCUMENT]->(d:Document)
+RETURN p.pid AS pid, p.valid_to AS valid_to,
+       p.text AS text, p.start AS start, p.end AS `end`,
+       d.id AS doc_id, d.source_url AS source_url, d.created_at AS created_at,
+       [(p)-[:ABOUT]->(c:Concept) | c.name][0] AS concept,
+       [(p)-[:APPLIES_TO]->(j:Jurisdiction) | j.name] AS jurisdictions,
+       [(p)-[r:HAS_THRESHOLD]->(t:Threshold) |
+        {threshold: t.pid, value: r.value, unit: r.unit, concept: r.concept,
+         jurisdictions: r.jurisdictions}] AS entries
+"""
@@ -0,0 +1,98 @@
+"""Response cache keyed by query parameters and the graph change version.
+
+Every entry records the graph change version its answer was computed at and
+is served only while the source that would answer the request is still at
+that version: the graph store's version for database queries, or the
+snapshot's version for in-memory views. Seeing a newer version drops every
+entry, since none of them can be served again. Entries are evicted least
+recently used first once the cache holds more than ``max_entries`` bodies or
+``max_bytes`` of them.
+
+Reading the store's version is a query of its own, so it is reused for
+``version_ttl_s``; a cached answer can then lag a graph write by that long.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Hashable, Optional, Tuple
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from graph_store import GraphReader
+
+from .config import settings
+
+
+class ResultCache:
+    def __init__(self, max_entries: int, max_bytes: int, version_ttl_s: float) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version_ttl_s = version_ttl_s
+        self._entries: "OrderedDict[Hashable, Tuple[int, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._version = -1
+        self._checked: Optional[Tuple[float, Optional[int]]] = None
+        self._lock = threading.Lock()
+
+    def graph_version(self, reader: GraphReader) -> Optional[int]:
+        """The store's change version, read at most once per ``version_ttl_s``."""
+
+        now = time.monotonic()
+        checked = self._checked
+        if checked is None or now - checked[0] >= self.version_ttl_s:
+            checked = (now, reader.version())
+            self._checked = checked
+        return checked[1]
+
+    def get(self, key: Hashable, version: Optional[int]) -> Optional[bytes]:
+        if version is None:
+            return None
+        with self._lock:
+            self._observe(version)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: Optional[int], body: bytes) -> None:
+        if version is None or len(body) > self.max_bytes or not self.max_entries:
+            return
+        with self._lock:
+            self._observe(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[key] = (version, body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _observe(self, version: int) -> None:
+        if version > self._version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = -1
+            self._checked = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+RESULT_CACHE = ResultCache(
+    settings.result_cache_max_entries,
+    settings.result_cache_max_bytes,
+    settings.result_cache_version_ttl_ms / 1000,
+)
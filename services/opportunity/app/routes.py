@@ -4,15 +4,22 @@ import sys
 import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Hashable, List, Optional
 
 import structlog
 from fastapi import APIRouter, Header, HTTPException, Query
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, Response
 from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from json_codec import dumps
+
+from .arbitrage_engine import ready_engine
 from .config import get_settings
-from .neo4j_utils import CYPHER_GAP, build_arbitrage_query, get_driver
+from .coverage import Coverage, ready_coverage
+from .result_cache import RESULT_CACHE
+from .store import get_store
 
 router = APIRouter()
 logger = structlog.get_logger("opportunity-api")
@@ -25,12 +32,16 @@ def _verify_api_key(x_api_key: str | None = Header(None)) -> None:
         if not x_api_key or x_api_key != settings.api_key:
             raise HTTPException(status_code=401, detail="Invalid or missing API key")
 
+
 REQUEST_COUNTER = Counter(
     "opportunity_requests_total", "Opportunity API requests", ["endpoint", "status"]
 )
 REQUEST_LATENCY = Histogram(
     "opportunity_request_latency_seconds", "Opportunity API latency", ["endpoint"]
 )
+CACHE_COUNTER = Counter(
+    "opportunity_result_cache_total", "Result cache lookups", ["endpoint", "result"]
+)
 
 
 @router.get("/health")
@@ -51,6 +62,57 @@ def _to_epoch_millis(value: datetime) -> int:
     return int(value.timestamp() * 1000)
 
 
+def _cached(
+    endpoint: str, key: Hashable, version: Optional[int], build: Callable[[], dict]
+) -> Response:
+    """The cached body for ``key`` at ``version``, or ``build()``'s, rendered."""
+
+    body = RESULT_CACHE.get((endpoint, key), version)
+    CACHE_COUNTER.labels(
+        endpoint=endpoint, result="miss" if body is None else "hit"
+    ).inc()
+    if body is None:
+        body = dumps(build())
+        RESULT_CACHE.put((endpoint, key), version, body)
+    return Response(body, media_type="application/json")
+
+
+def _arbitrage_item(record: dict) -> dict:
+    return {
+        "concept": record["concept"],
+        "unit": record["unit"],
+        "v1": record["v1"],
+        "v2": record["v2"],
+        "text1": record["text1"],
+        "text2": record["text2"],
+        "citation_1": {
+            "doc_id": record["doc_id_1"],
+            "start": record["start_1"],
+            "end": record["end_1"],
+            "source_url": record["source_url_1"],
+        },
+        "citation_2": {
+            "doc_id": record["doc_id_2"],
+            "start": record["start_2"],
+            "end": record["end_2"],
+            "source_url": record["source_url_2"],
+        },
+    }
+
+
+def _gap_item(record: dict) -> dict:
+    return {
+        "concept": record["concept"],
+        "example_text": record["example_text"],
+        "citation": {
+            "doc_id": record["doc_id"],
+            "start": record["start"],
+            "end": record["end"],
+            "source_url": record["source_url"],
+        },
+    }
+
+
 @router.get("/opportunities/arbitrage")
 def arbitrage(
     j1: Optional[str] = None,
@@ -66,45 +128,30 @@ def arbitrage(
     start = time.perf_counter()
     try:
         since_ms = _to_epoch_millis(since) if since else None
-        query = build_arbitrage_query(
-            j1, j2, concept, include_since=since_ms is not None
-        )
-        params = {"rel_delta": rel_delta, "limit": limit}
-        if j1 and j2:
-            params["j1"] = j1
-            params["j2"] = j2
-        if concept:
-            params["concept"] = concept
-        if since_ms is not None:
-            params["since"] = since_ms
-        with get_driver().session() as session:
-            result = session.run(query, params, timeout=5)
-            items = [
-                {
-                    "concept": record["concept"],
-                    "unit": record["unit"],
-                    "v1": record["v1"],
-                    "v2": record["v2"],
-                    "text1": record["text1"],
-                    "text2": record["text2"],
-                    "citation_1": {
-                        "doc_id": record["doc_id_1"],
-                        "start": record["start_1"],
-                        "end": record["end_1"],
-                        "source_url": record["source_url_1"],
-                    },
-                    "citation_2": {
-                        "doc_id": record["doc_id_2"],
-                        "start": record["start_2"],
-                        "end": record["end_2"],
-                        "source_url": record["source_url_2"],
-                    },
-                }
-                for record in result
-            ]
+        # The database answers until the in-memory snapshot has loaded.
+        engine = ready_engine()
+        store = get_store()
+        version = engine.version if engine else RESULT_CACHE.graph_version(store)
+        # The jurisdiction filter needs both sides and concepts match
+        # case-insensitively, so equivalent requests share an entry.
+        pair = (j1, j2) if j1 and j2 else (None, None)
+        key = (*pair, concept.lower() if concept else None, rel_delta, limit, since_ms)
+
+        def build() -> dict:
+            rows = (engine or store).arbitrage(
+                rel_delta=rel_delta,
+                limit=limit,
+                j1=pair[0],
+                j2=pair[1],
+                concept=concept,
+                since=since_ms,
+            )
+            return {"items": [_arbitrage_item(record) for record in rows]}
+
+        response = _cached(endpoint, key, version, build)
         REQUEST_COUNTER.labels(endpoint=endpoint, status="200").inc()
         REQUEST_LATENCY.labels(endpoint=endpoint).observe(time.perf_counter() - start)
-        return {"items": items}
+        return response
     except Exception as exc:  # pragma: no cover - requires infra
         logger.exception("arbitrage_query_failed", error=str(exc))
         REQUEST_COUNTER.labels(endpoint=endpoint, status="500").inc()
@@ -123,28 +170,63 @@ def gaps(
     endpoint = "/opportunities/gaps"
     start = time.perf_counter()
     try:
-        with get_driver().session() as session:
-            result = session.run(
-                CYPHER_GAP, {"j1": j1, "j2": j2, "limit": limit}, timeout=5
-            )
-            items = [
-                {
-                    "concept": record["concept"],
-                    "example_text": record["example_text"],
-                    "citation": {
-                        "doc_id": record["doc_id"],
-                        "start": record["start"],
-                        "end": record["end"],
-                        "source_url": record["source_url"],
-                    },
-                }
-                for record in result
-            ]
+        coverage = ready_coverage()
+        store = get_store()
+        version = coverage.version if coverage else RESULT_CACHE.graph_version(store)
+
+        def build() -> dict:
+            rows = (coverage or store).gaps(j1, j2, limit)
+            return {"items": [_gap_item(record) for record in rows]}
+
+        response = _cached(endpoint, (j1, j2, limit), version, build)
         REQUEST_COUNTER.labels(endpoint=endpoint, status="200").inc()
         REQUEST_LATENCY.labels(endpoint=endpoint).observe(time.perf_counter() - start)
-        return {"items": items}
+        return response
     except Exception as exc:  # pragma: no cover - requires infra
         logger.exception("gap_query_failed", error=str(exc))
         REQUEST_COUNTER.labels(endpoint=endpoint, status="500").inc()
         REQUEST_LATENCY.labels(endpoint=endpoint).observe(time.perf_counter() - start)
         raise HTTPException(status_code=500, detail="Gap query failed") from exc
+
+
+@router.get("/opportunities/gaps/matrix")
+def gap_matrix(
+    jurisdiction: Optional[List[str]] = Query(None),
+    include_concepts: bool = False,
+    x_api_key: str | None = Header(None),
+):
+    """Gap counts of every ordered jurisdiction pair.
+
+    ``counts[i][k]`` is the number of concepts ``jurisdictions[i]`` has
+    provisions about and ``jurisdictions[k]`` has none about.
+    """
+
+    _verify_api_key(x_api_key)
+    endpoint = "/opportunities/gaps/matrix"
+    start = time.perf_counter()
+    try:
+        coverage = ready_coverage()
+        store = get_store()
+        version = coverage.version if coverage else RESULT_CACHE.graph_version(store)
+        key = (tuple(jurisdiction) if jurisdiction else None, include_concepts)
+
+        def build() -> dict:
+            found = coverage or Coverage.from_pairs(store.coverage())
+            names, counts = found.matrix(jurisdiction)
+            body = {"jurisdictions": names, "counts": counts.tolist()}
+            if include_concepts:
+                body["concepts"] = {
+                    j1: {j2: found.gap_concepts(j1, j2) for j2 in names if j2 != j1}
+                    for j1 in names
+                }
+            return body
+
+        response = _cached(endpoint, key, version, build)
+        REQUEST_COUNTER.labels(endpoint=endpoint, status="200").inc()
+        REQUEST_LATENCY.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+        return response
+    except Exception as exc:  # pragma: no cover - requires infra
+        logger.exception("gap_matrix_query_failed", error=str(exc))
+        REQUEST_COUNTER.labels(endpoint=endpoint, status="500").inc()
+        REQUEST_LATENCY.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+        raise HTTPException(status_code=500, detail="Gap matrix query failed") from exc
@@ -0,0 +1,123 @@
+"""In-memory views of the graph kept current from its change version.
+
+A :class:`SnapshotView` loads the graph once from :meth:`GraphReader.changes`
+and then, every ``refresh_s`` seconds on a daemon thread, applies only the
+provisions written since the version it last saw. Views publish what requests
+read by swapping in new objects, so a request never sees a half-applied
+refresh. Until the first load completes a view is not ready and callers
+answer from the graph store instead.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import structlog
+from prometheus_client import Histogram
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from graph_store import GraphChanges, GraphReader
+
+from .config import settings
+
+logger = structlog.get_logger("opportunity-snapshot")
+
+MODES = ("memory", "database")
+
+REFRESH_SECONDS = Histogram(
+    "opportunity_snapshot_refresh_seconds",
+    "In-memory graph view refresh latency",
+    ["view", "kind"],
+)
+
+_views: Dict[str, "SnapshotView"] = {}
+_views_lock = threading.Lock()
+
+
+class SnapshotView(ABC):
+    name = "snapshot"
+
+    def __init__(self, reader: GraphReader, refresh_s: float) -> None:
+        self.reader = reader
+        self.refresh_s = refresh_s
+        self.version: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.version is not None
+
+    @abstractmethod
+    def apply(self, changes: GraphChanges) -> int:
+        """Apply one batch of changes; return how many parts were rebuilt."""
+
+    def refresh(self) -> int:
+        """Apply graph changes since the last refresh."""
+
+        began = time.perf_counter()
+        changes = self.reader.changes(self.version)
+        rebuilt = self.apply(changes)
+        self.version = changes.version
+        REFRESH_SECONDS.labels(
+            view=self.name, kind="reset" if changes.reset else "delta"
+        ).observe(time.perf_counter() - began)
+        return rebuilt
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception:  # pragma: no cover - requires infra
+                logger.exception(
+                    "snapshot_refresh_failed", view=self.name, version=self.version
+                )
+            if self._stop.wait(self.refresh_s):
+                return
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.name}-snapshot", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_s)
+
+
+def start_view(
+    setting: str, mode: str, factory: Callable[[float], SnapshotView]
+) -> None:
+    """Start ``factory``'s view when its ``setting`` is ``memory``."""
+
+    if mode not in MODES:
+        raise ValueError(f"{setting} must be one of {MODES}, not {mode!r}")
+    if mode != "memory":
+        return
+    with _views_lock:
+        if setting not in _views:
+            view = factory(settings.snapshot_refresh_ms / 1000)
+            view.start()
+            _views[setting] = view
+
+
+def ready_view(setting: str) -> Optional[SnapshotView]:
+    """The view started for ``setting`` once loaded; None until then."""
+
+    view = _views.get(setting)
+    return view if view is not None and view.ready else None
+
+
+def stop_views() -> None:
+    with _views_lock:
+        for view in _views.values():
+            view.stop()
+        _views.clear()
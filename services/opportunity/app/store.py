@@ -0,0 +1,198 @@
+"""Graph store selected by ``GRAPH_BACKEND`` (``neo4j`` or ``sqlite``)."""
+
+from __future__ import annotations
+
+import sys
+import threading
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from graph_migrations import applied_versions
+from graph_store import BACKENDS, GraphChanges, GraphReader, SQLiteGraphStore
+
+from .comparison_index import Group, top_k_arbitrage
+from .config import settings
+from .neo4j_utils import (
+    CYPHER_CHANGED_PROVISIONS,
+    CYPHER_COMPARISON_GROUPS,
+    CYPHER_COVERAGE,
+    CYPHER_GAP,
+    CYPHER_GRAPH_VERSION,
+    build_arbitrage_query,
+    build_comparison_query,
+    close_driver,
+    get_driver,
+)
+
+QUERY_TIMEOUT_S = 5
+# Graph-service migrations that create and backfill the comparison index
+# and the change version.
+COMPARISON_INDEX_VERSION = 4
+CHANGE_VERSION_VERSION = 5
+
+_store: GraphReader | None = None
+_store_lock = threading.Lock()
+
+
+class Neo4jGraphReader(GraphReader):
+    def __init__(self) -> None:
+        self._graph_versions: Set[int] = set()
+
+    def _run(self, query: str, params: Dict[str, object]) -> List[dict]:
+        with get_driver().session() as session:
+            result = session.run(query, params, timeout=QUERY_TIMEOUT_S)
+            return [dict(record) for record in result]
+
+    def _graph_migrated(self, version: int) -> bool:
+        """Whether the graph service has applied one of its migrations.
+
+        Checked until it has, so readers switch over without a restart once
+        the migration has run.
+        """
+
+        if version not in self._graph_versions:
+            with get_driver().session() as session:
+                self._graph_versions = set(applied_versions(session, "graph"))
+        return version in self._graph_versions
+
+    def comparison_ready(self) -> bool:
+        """Whether the graph service has built the comparison index."""
+
+        return self._graph_migrated(COMPARISON_INDEX_VERSION)
+
+    def arbitrage(
+        self,
+        *,
+        rel_delta: float,
+        limit: int,
+        j1: Optional[str] = None,
+        j2: Optional[str] = None,
+        concept: Optional[str] = None,
+        since: Optional[int] = None,
+    ) -> List[dict]:
+        if self.comparison_ready():
+            return self._arbitrage_top_k(rel_delta, limit, j1, j2, concept, since)
+        query = build_arbitrage_query(j1, j2, concept, include_since=since is not None)
+        params: Dict[str, object] = {"rel_delta": rel_delta, "limit": limit}
+        if j1 and j2:
+            params["j1"] = j1
+            params["j2"] = j2
+        if concept:
+            params["concept"] = concept
+        if since is not None:
+            params["since"] = since
+        return self._run(query, params)
+
+    def _arbitrage_top_k(
+        self,
+        rel_delta: float,
+        limit: int,
+        j1: Optional[str],
+        j2: Optional[str],
+        concept: Optional[str],
+        since: Optional[int],
+    ) -> List[dict]:
+        by_jurisdiction = bool(j1 and j2)
+        jurisdictions = {1: j1, 2: j2}
+        groups = [
+            (row["concept"], row["unit"])
+            for row in self._run(CYPHER_COMPARISON_GROUPS, {"concept": concept})
+        ]
+
+        def read(
+            pending: Sequence[Group], side: int, descending: bool, n: int
+        ) -> Dict[Group, List[dict]]:
+            query = build_comparison_query(
+                descending, by_jurisdiction, include_since=since is not None
+            )
+            params: Dict[str, object] = {
+                "groups": [{"concept": c, "unit": u} for c, u in pending],
+                "window": n,
+                "jurisdiction": jurisdictions[side],
+                "since": since,
+            }
+            return {
+                (row["concept"], row["unit"]): sorted(
+                    row["entries"], key=itemgetter("value"), reverse=descending
+                )
+                for row in self._run(query, params)
+            }
+
+        return top_k_arbitrage(
+            groups,
+            read,
+            limit=limit,
+            rel_delta=rel_delta,
+            window=settings.arbitrage_window,
+            same_sides=not by_jurisdiction,
+        )
+
+    def gaps(self, j1: str, j2: str, limit: int) -> List[dict]:
+        return self._run(CYPHER_GAP, {"j1": j1, "j2": j2, "limit": limit})
+
+    def coverage(self) -> List[dict]:
+        return self._run(CYPHER_COVERAGE, {})
+
+    def version(self) -> Optional[int]:
+        if not self._graph_migrated(CHANGE_VERSION_VERSION):
+            return None
+        return self._run(CYPHER_GRAPH_VERSION, {})[0]["version"]
+
+    def changes(self, after: Optional[int]) -> GraphChanges:
+        if not self._graph_migrated(CHANGE_VERSION_VERSION):
+            raise RuntimeError(
+                f"graph migration {CHANGE_VERSION_VERSION} (change version) "
+                "has not been applied"
+            )
+
+        def read(tx) -> GraphChanges:
+            meta = tx.run(CYPHER_GRAPH_VERSION).single()
+            reset = after is None or meta["reset_version"] > after
+            provisions = [
+                dict(record)
+                for record in tx.run(
+                    CYPHER_CHANGED_PROVISIONS,
+                    after=-1 if reset else after,
+                    closed=not reset,
+                )
+            ]
+            return GraphChanges(meta["version"], reset, provisions)
+
+        # One read transaction: every provision at or below the version read
+        # has committed, because versions commit in order.
+        with get_driver().session() as session:
+            return session.execute_read(read)
+
+    def close(self) -> None:
+        close_driver()
+
+
+def uses_neo4j() -> bool:
+    return settings.graph_backend == "neo4j"
+
+
+def get_store() -> GraphReader:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.graph_backend not in BACKENDS:
+                    raise ValueError(
+                        f"GRAPH_BACKEND must be one of {BACKENDS}, "
+                        f"not {settings.graph_backend!r}"
+                    )
+                if uses_neo4j():
+                    _store = Neo4jGraphReader()
+                else:
+                    _store = SQLiteGraphStore(settings.sqlite_path)
+    return _store
+
+
+def close_store() -> None:
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
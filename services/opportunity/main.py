@@ -1,13 +1,24 @@
 from __future__ import annotations
 
 import logging
+import sys
+from pathlib import Path
 
 import structlog
+from app.arbitrage_engine import start_engine
 from app.config import settings
+from app.coverage import start_coverage
+from app.migrations import migrate_on_startup
 from app.neo4j_utils import close_driver
 from app.routes import router
+from app.snapshot import stop_views
+from app.store import close_store, uses_neo4j
 from fastapi import FastAPI
 
+# Add shared module to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "shared"))
+from json_codec import FastJSONResponse
+
 
 def _configure_logging(level: str) -> None:
     structlog.configure(
@@ -27,10 +38,24 @@ def _configure_logging(level: str) -> None:
 
 _configure_logging(settings.log_level)
 
-app = FastAPI(title="Opportunity API", version="0.2.0")
+app = FastAPI(
+    title="Opportunity API",
+    version="0.2.0",
+    default_response_class=FastJSONResponse,
+)
 app.include_router(router)
 
 
+@app.on_event("startup")
+def _startup() -> None:
+    if uses_neo4j():
+        migrate_on_startup()
+    start_engine()
+    start_coverage()
+
+
 @app.on_event("shutdown")
 def _shutdown() -> None:
+    stop_views()
+    close_store()
     close_driver()
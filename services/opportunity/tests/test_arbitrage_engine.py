@@ -0,0 +1,177 @@
+import random
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("neo4j")
+
+from app.arbitrage_engine import ArbitrageEngine
+from graph_store import GraphChanges, SQLiteGraphStore
+
+
+class FakeReader:
+    def __init__(self, provisions):
+        self.provisions = provisions
+
+    def changes(self, after):
+        return GraphChanges(1, after is None, self.provisions if after is None else [])
+
+
+def _provisions(seed, count=300):
+    rng = random.Random(seed)
+    provisions = []
+    for i in range(count):
+        jurisdictions = rng.sample(["US", "EU", "UK"], rng.randint(1, 2))
+        concept = rng.choice(["capital", "Liquidity", "leverage"])
+        provisions.append(
+            {
+                "pid": f"p{i}",
+                "text": "shall",
+                "start": i,
+                "end": i + 1,
+                "doc_id": f"d{i // 3}",
+                "source_url": None,
+                "created_at": rng.randint(0, 100),
+                "entries": [
+                    {
+                        "threshold": f"t{i}-{k}",
+                        "value": float(rng.randint(-5, 400)),
+                        "unit": rng.choice(["percent", "usd", None]),
+                        "concept": concept,
+                        "jurisdictions": jurisdictions,
+                    }
+                    for k in range(rng.randint(0, 2))
+                ],
+            }
+        )
+    return provisions
+
+
+def _brute_force(provisions, j1, j2, concept, since, rel_delta, limit):
+    entries = [
+        (p, e)
+        for p in provisions
+        for e in p["entries"]
+        if e["unit"] is not None and (since is None or p["created_at"] >= since)
+    ]
+    gaps = []
+    for p1, a in entries:
+        for p2, b in entries:
+            if (a["concept"], a["unit"]) != (b["concept"], b["unit"]):
+                continue
+            if p1["pid"] == p2["pid"]:
+                continue
+            if concept and a["concept"].lower() != concept.lower():
+                continue
+            if j1 and j2:
+                if j1 not in a["jurisdictions"] or j2 not in b["jurisdictions"]:
+                    continue
+            v1, v2 = a["value"], b["value"]
+            if abs(v1 - v2) / (v1 if v1 != 0 else 1) >= rel_delta:
+                gaps.append(abs(v1 - v2))
+    return sorted(gaps, reverse=True)[:limit]
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize(
+    "j1, j2, concept, since, rel_delta, limit",
+    [
+        (None, None, None, None, 0.2, 10),
+        ("US", "EU", None, None, 0.2, 10),
+        ("UK", "US", "liquidity", 40, 0.5, 25),
+        (None, None, "capital", 80, 0.9, 200),
+        ("US", "XX", None, None, 0.0, 10),
+    ],
+)
+def test_engine_matches_the_full_cartesian_scan(
+    seed, j1, j2, concept, since, rel_delta, limit
+):
+    provisions = _provisions(seed)
+    engine = ArbitrageEngine(FakeReader(provisions), refresh_s=1)
+    engine.refresh()
+
+    rows = engine.arbitrage(
+        rel_delta=rel_delta, limit=limit, j1=j1, j2=j2, concept=concept, since=since
+    )
+    assert [abs(r["v1"] - r["v2"]) for r in rows] == _brute_force(
+        provisions, j1, j2, concept, since, rel_delta, limit
+    )
+    assert all(r["concept"] and r["unit"] for r in rows)
+
+
+def _doc(doc_id, jurisdiction, concept, value):
+    return {
+        "doc_id": doc_id,
+        "source_url": f"https://example.com/{doc_id}",
+        "jurisdictions": [jurisdiction],
+        "obligations": [
+            {
+                "pid": f"{doc_id}:0:10",
+                "text": f"hold {value}",
+                "start": 0,
+                "end": 10,
+                "concept": concept,
+                "page": None,
+                "hash": str(value),
+                "thresholds": [
+                    {
+                        "pid": f"{doc_id}:5:9",
+                        "value": value,
+                        "unit": "percent",
+                        "unit_normalized": "percent",
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def test_refresh_rebuilds_only_groups_changed_since_the_last_version():
+    graph = SQLiteGraphStore(":memory:")
+    graph.write_documents(
+        [
+            _doc("us", "US", "capital", 5.0),
+            _doc("eu", "EU", "capital", 8.0),
+            _doc("uk", "UK", "leverage", 3.0),
+            _doc("fr", "EU", "leverage", 4.0),
+        ]
+    )
+    engine = ArbitrageEngine(graph, refresh_s=1)
+    assert not engine.ready
+    assert engine.refresh() == 2
+    assert engine.ready
+    assert engine.refresh() == 0
+
+    graph.write_documents([_doc("eu", "EU", "capital", 20.0)])
+    assert engine.refresh() == 1
+
+    for j1, j2 in ((None, None), ("US", "EU"), ("UK", "EU")):
+        params = {"rel_delta": 0.1, "limit": 10, "j1": j1, "j2": j2}
+        expected = graph.arbitrage(**params)
+        rows = engine.arbitrage(**params)
+        assert sorted(rows, key=repr) == sorted(expected, key=repr)
+
+
+def test_refresh_drops_provisions_closed_since_the_last_version():
+    graph = SQLiteGraphStore(":memory:")
+    graph.write_documents(
+        [_doc("us", "US", "capital", 5.0), _doc("eu", "EU", "capital", 8.0)]
+    )
+    engine = ArbitrageEngine(graph, refresh_s=1)
+    engine.refresh()
+    assert len(engine.arbitrage(rel_delta=0.1, limit=10)) == 2
+
+    removed = _doc("eu", "EU", "capital", 8.0)
+    removed["obligations"] = []
+    assert graph.write_documents([removed])["removed"] == 1
+    assert engine.refresh() == 1
+    assert engine.arbitrage(rel_delta=0.1, limit=10) == []
+    assert engine.arbitrage(rel_delta=0.1, limit=10) == graph.arbitrage(
+        rel_delta=0.1, limit=10
+    )
@@ -0,0 +1,103 @@
+import random
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+from app.comparison_index import top_k_arbitrage
+
+
+def _entries(seed, groups=4, per_group=60):
+    rng = random.Random(seed)
+    entries = []
+    for g in range(groups):
+        group = (f"concept-{g}", rng.choice(["percent", "usd"]))
+        for i in range(rng.randint(0, per_group)):
+            entries.append(
+                {
+                    "group": group,
+                    "jurisdiction": rng.choice(["US", "EU", "UK"]),
+                    "value": float(rng.randint(-5, 400)),
+                    "provision": f"p{g}-{i // 2}",
+                    "threshold": f"t{g}-{i}",
+                    "text": "shall",
+                    "doc_id": f"d{g}",
+                    "start": i,
+                    "end": i + 1,
+                    "source_url": None,
+                }
+            )
+    return entries
+
+
+def _reader(entries, j1, j2, reads):
+    def read(pending, side, descending, n):
+        reads.append((side, descending, n, len(pending)))
+        jurisdiction = {1: j1, 2: j2}[side]
+        out = {}
+        for group in pending:
+            rows = [
+                e
+                for e in entries
+                if e["group"] == group
+                and (jurisdiction is None or e["jurisdiction"] == jurisdiction)
+            ]
+            rows.sort(key=lambda e: e["value"], reverse=descending)
+            out[group] = rows[:n]
+        return out
+
+    return read
+
+
+def _brute_force(entries, j1, j2, rel_delta, limit):
+    gaps = []
+    for a in entries:
+        for b in entries:
+            if a["group"] != b["group"] or a["provision"] == b["provision"]:
+                continue
+            if j1 and (a["jurisdiction"] != j1 or b["jurisdiction"] != j2):
+                continue
+            v1, v2 = a["value"], b["value"]
+            if abs(v1 - v2) / (v1 if v1 != 0 else 1) >= rel_delta:
+                gaps.append(abs(v1 - v2))
+    return sorted(gaps, reverse=True)[:limit]
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize(
+    "j1, j2, rel_delta, limit",
+    [(None, None, 0.2, 10), ("US", "EU", 0.2, 10), ("US", "EU", 0.9, 25)],
+)
+def test_top_k_matches_the_full_cartesian_scan(seed, j1, j2, rel_delta, limit):
+    entries = _entries(seed)
+    groups = sorted({e["group"] for e in entries})
+    reads = []
+    rows = top_k_arbitrage(
+        groups,
+        _reader(entries, j1, j2, reads),
+        limit=limit,
+        rel_delta=rel_delta,
+        window=4,
+        same_sides=j1 is None,
+    )
+    assert [abs(r["v1"] - r["v2"]) for r in rows] == _brute_force(
+        entries, j1, j2, rel_delta, limit
+    )
+    assert all(r["concept"] and r["unit"] for r in rows)
+
+
+def test_reads_stay_bounded_when_the_extremes_answer():
+    entries = _entries(0, groups=1, per_group=2_000)
+    reads = []
+    top_k_arbitrage(
+        sorted({e["group"] for e in entries}),
+        _reader(entries, None, None, reads),
+        limit=5,
+        rel_delta=0.0,
+        window=16,
+        same_sides=True,
+    )
+    assert reads == [(1, False, 17, 1), (1, True, 17, 1)]
@@ -0,0 +1,122 @@
+import random
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("neo4j")
+
+from app.coverage import Coverage, CoverageIndex
+from graph_store import SQLiteGraphStore
+
+JURISDICTIONS = ["US", "EU", "UK", "JP", "SG"]
+
+
+def _doc(doc_id, jurisdictions, concepts):
+    return {
+        "doc_id": doc_id,
+        "source_url": None,
+        "jurisdictions": jurisdictions,
+        "obligations": [
+            {
+                "pid": f"{doc_id}:{i}",
+                "text": f"{concept} rule",
+                "start": i,
+                "end": i + 1,
+                "concept": concept,
+                "page": None,
+                "hash": concept,
+                "thresholds": [],
+            }
+            for i, concept in enumerate(concepts)
+        ],
+    }
+
+
+def _docs(seed, count=40):
+    rng = random.Random(seed)
+    return [
+        _doc(
+            f"d{i}",
+            rng.sample(JURISDICTIONS, rng.randint(1, 2)),
+            [f"c{rng.randint(0, 15)}" for _ in range(rng.randint(1, 3))],
+        )
+        for i in range(count)
+    ]
+
+
+def _covered(docs):
+    return {
+        (j, ob["concept"])
+        for doc in docs
+        for j in doc["jurisdictions"]
+        for ob in doc["obligations"]
+    }
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matrix_and_gaps_match_the_graph(seed):
+    docs = _docs(seed)
+    graph = SQLiteGraphStore(":memory:")
+    graph.write_documents(docs)
+    index = CoverageIndex(graph, refresh_s=1)
+    index.refresh()
+    coverage = index.coverage
+    covered = _covered(docs)
+
+    names, counts = coverage.matrix()
+    assert names == sorted(JURISDICTIONS)
+    for i, j1 in enumerate(names):
+        for k, j2 in enumerate(names):
+            expected = {c for j, c in covered if j == j1} - {
+                c for j, c in covered if j == j2
+            }
+            assert counts[i, k] == len(expected)
+            assert set(coverage.gap_concepts(j1, j2)) == expected
+        rows = coverage.gaps(j1, "US", 500)
+        assert sorted(rows, key=repr) == sorted(graph.gaps(j1, "US", 500), key=repr)
+
+    fallback = Coverage.from_pairs(graph.coverage())
+    assert (fallback.matrix(names)[1] == counts).all()
+
+
+def test_refresh_moves_provisions_between_cells():
+    graph = SQLiteGraphStore(":memory:")
+    graph.write_documents(
+        [_doc("a", ["US"], ["capital"]), _doc("b", ["EU"], ["capital", "leverage"])]
+    )
+    index = CoverageIndex(graph, refresh_s=1)
+    index.refresh()
+    assert index.coverage.gap_concepts("EU", "US") == ["leverage"]
+    assert index.coverage.gap_concepts("US", "XX") == ["capital"]
+    assert index.coverage.gaps("XX", "US", 10) == []
+
+    # The amended provision moves from leverage to liquidity.
+    graph.write_documents([_doc("b", ["EU"], ["capital", "liquidity"])])
+    graph.write_documents([_doc("c", ["US"], ["leverage"])])
+    assert index.refresh() == 3
+    assert index.coverage.gap_concepts("EU", "US") == ["liquidity"]
+    assert [row["doc_id"] for row in index.coverage.gaps("US", "EU", 10)] == ["c"]
+
+    names, counts = index.coverage.matrix(["US", "EU", "XX"])
+    assert counts.tolist() == [[0, 1, 2], [1, 0, 2], [0, 0, 0]]
+
+
+def test_refresh_drops_closed_provisions():
+    graph = SQLiteGraphStore(":memory:")
+    graph.write_documents([_doc("a", ["US"], ["capital"]), _doc("b", ["EU"], [])])
+    index = CoverageIndex(graph, refresh_s=1)
+    index.refresh()
+    assert index.coverage.gap_concepts("US", "EU") == ["capital"]
+
+    assert graph.write_documents([_doc("a", ["US"], [])])["removed"] == 1
+    assert index.refresh() == 1
+    assert index.coverage.gap_concepts("US", "EU") == []
+    assert index.coverage.gaps("US", "EU", 10) == graph.gaps("US", "EU", 10) == []
+    names, counts = index.coverage.matrix(["US", "EU"])
+    assert counts.tolist() == [[0, 0], [0, 0]]
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("neo4j")
+
+from app.result_cache import ResultCache
+
+
+class FakeReader:
+    def __init__(self):
+        self.current = 3
+        self.reads = 0
+
+    def version(self):
+        self.reads += 1
+        return self.current
+
+
+def test_entries_are_served_only_at_their_version():
+    cache = ResultCache(max_entries=10, max_bytes=1024, version_ttl_s=60)
+    cache.put("a", 3, b"[1]")
+    assert cache.get("a", 3) == b"[1]"
+    assert cache.get("a", 2) is None
+
+    # A newer version drops every entry.
+    cache.put("b", 3, b"[2]")
+    assert cache.get("b", 4) is None
+    assert len(cache) == 0
+
+    # Without a version nothing is cached.
+    cache.put("c", None, b"[3]")
+    assert cache.get("c", None) is None and len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted_by_count_and_size():
+    cache = ResultCache(max_entries=2, max_bytes=10, version_ttl_s=60)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbb")
+    cache.get("a", 1)
+    cache.put("c", 1, b"cc")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"aaaa" and cache.get("c", 1) == b"cc"
+
+    cache.put("d", 1, b"dddddddd")
+    assert [key for key in "acd" if cache.get(key, 1)] == ["c", "d"]
+    cache.put("e", 1, b"e" * 11)
+    assert cache.get("e", 1) is None
+
+
+def test_graph_version_is_reread_after_the_ttl():
+    reader = FakeReader()
+    cache = ResultCache(max_entries=10, max_bytes=1024, version_ttl_s=60)
+    assert cache.graph_version(reader) == 3
+    reader.current = 4
+    assert cache.graph_version(reader) == 3
+    assert reader.reads == 1
+
+    cache.version_ttl_s = 0
+    assert cache.graph_version(reader) == 4
@@ -0,0 +1,127 @@
+import sys
+from pathlib import Path
+
+# Add service directory to path for imports to work
+service_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(service_dir))
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("neo4j")
+
+from app import store
+from app.result_cache import RESULT_CACHE
+from fastapi.testclient import TestClient
+from graph_store import SQLiteGraphStore
+from main import app
+from prometheus_client import REGISTRY
+
+
+@pytest.fixture
+def sqlite_store(monkeypatch):
+    graph = SQLiteGraphStore(":memory:")
+    monkeypatch.setattr(store, "_store", graph)
+    # Each test's graph starts again at version 0.
+    RESULT_CACHE.clear()
+    return graph
+
+
+def _doc(doc_id, jurisdiction, value):
+    return {
+        "doc_id": doc_id,
+        "source_url": None,
+        "jurisdictions": [jurisdiction],
+        "obligations": [
+            {
+                "pid": f"{doc_id}:0:10",
+                "text": f"hold {value} percent",
+                "start": 0,
+                "end": 10,
+                "concept": "capital",
+                "page": None,
+                "hash": str(value),
+                "thresholds": [
+                    {
+                        "pid": f"{doc_id}:5:9",
+                        "value": value,
+                        "unit": "percent",
+                        "unit_normalized": "percent",
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def test_endpoints_serve_from_the_sqlite_backend(sqlite_store):
+    sqlite_store.write_documents([_doc("us", "US", 5.0), _doc("eu", "EU", 8.0)])
+    client = TestClient(app)
+
+    response = client.get("/opportunities/arbitrage", params={"j1": "US", "j2": "EU"})
+    assert response.status_code == 200
+    [item] = response.json()["items"]
+    assert (item["v1"], item["v2"]) == (5.0, 8.0)
+    assert item["citation_1"] == {
+        "doc_id": "us",
+        "start": 0,
+        "end": 10,
+        "source_url": None,
+    }
+
+    response = client.get("/opportunities/gaps", params={"j1": "US", "j2": "UK"})
+    assert [i["concept"] for i in response.json()["items"]] == ["capital"]
+
+
+def test_gap_matrix_counts_every_jurisdiction_pair(sqlite_store):
+    sqlite_store.write_documents([_doc("us", "US", 5.0), _doc("eu", "EU", 8.0)])
+    leverage = _doc("uk", "UK", 3.0)
+    leverage["obligations"][0]["concept"] = "leverage"
+    sqlite_store.write_documents([leverage])
+    client = TestClient(app)
+
+    response = client.get(
+        "/opportunities/gaps/matrix", params={"include_concepts": "true"}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["jurisdictions"] == ["EU", "UK", "US"]
+    assert body["counts"] == [[0, 1, 0], [1, 0, 1], [0, 1, 0]]
+    assert body["concepts"]["UK"] == {"EU": ["leverage"], "US": ["leverage"]}
+
+    response = client.get(
+        "/opportunities/gaps/matrix",
+        params=[("jurisdiction", "US"), ("jurisdiction", "UK")],
+    )
+    assert response.json() == {
+        "jurisdictions": ["US", "UK"],
+        "counts": [[0, 1], [1, 0]],
+    }
+
+
+def test_repeated_queries_are_served_from_cache_until_the_graph_changes(
+    sqlite_store, monkeypatch
+):
+    monkeypatch.setattr(RESULT_CACHE, "version_ttl_s", 0)
+    sqlite_store.write_documents([_doc("us", "US", 5.0), _doc("eu", "EU", 8.0)])
+    client = TestClient(app)
+
+    def lookups(result):
+        return (
+            REGISTRY.get_sample_value(
+                "opportunity_result_cache_total",
+                {"endpoint": "/opportunities/arbitrage", "result": result},
+            )
+            or 0
+        )
+
+    hits, misses = lookups("hit"), lookups("miss")
+    first = client.get("/opportunities/arbitrage", params={"concept": "Capital"})
+    second = client.get("/opportunities/arbitrage", params={"concept": "capital"})
+    assert second.json() == first.json()
+    assert (lookups("hit") - hits, lookups("miss") - misses) == (1, 1)
+
+    sqlite_store.write_documents([_doc("eu", "EU", 20.0)])
+    third = client.get("/opportunities/arbitrage", params={"concept": "capital"})
+    assert {item["v2"] for item in third.json()["items"]} == {5.0, 20.0}
+    assert lookups("miss") - misses == 2
@@ -0,0 +1,72 @@
+"""Claim-check helpers for oversized ``nlp.extracted`` events.
+
+When an encoded event exceeds the configured size, the producer stores the
+entity lists in the processed bucket and sends a pointer event whose
+``entities_ref`` says where the payload lives. Consumers call
+:func:`resolve_event` with the fetched payload to get the original event
+back. Storage I/O stays in each service's ``s3_utils``; this module only
+builds and checks the payloads.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Optional, Tuple
+
+from json_codec import dumps, loads
+
+CLAIM_FIELDS = ("entities", "removed_entities")
+REF_FIELD = "entities_ref"
+
+
+class ClaimCheckError(ValueError):
+    """Raised when a claimed payload is missing or does not match its pointer."""
+
+
+def claim_key(prefix: str, document_id: str, event_id: str) -> str:
+    return f"{prefix.rstrip('/')}/{document_id}/{event_id}.json"
+
+
+def split_event(event: dict) -> Tuple[dict, bytes]:
+    """Return the event without its entity lists and the serialized lists."""
+
+    pointer = {k: v for k, v in event.items() if k not in CLAIM_FIELDS}
+    payload = dumps({k: event[k] for k in CLAIM_FIELDS if k in event})
+    return pointer, payload
+
+
+def make_pointer(event: dict, uri: str) -> Tuple[dict, bytes]:
+    """Build the pointer event and the payload to store at ``uri``."""
+
+    pointer, payload = split_event(event)
+    pointer[REF_FIELD] = {
+        "uri": uri,
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "size_bytes": len(payload),
+        "entity_count": len(event.get("entities", [])),
+    }
+    return pointer, payload
+
+
+def is_pointer(event: dict) -> bool:
+    return REF_FIELD in event and "entities" not in event
+
+
+def ref_uri(event: dict) -> Optional[str]:
+    ref = event.get(REF_FIELD)
+    return ref.get("uri") if isinstance(ref, dict) else None
+
+
+def resolve_event(event: dict, payload: bytes) -> dict:
+    """Merge a claimed payload back into its pointer event."""
+
+    ref = event[REF_FIELD]
+    digest = hashlib.sha256(payload).hexdigest()
+    if digest != ref.get("sha256"):
+        raise ClaimCheckError(
+            f"Claimed payload {ref.get('uri')} has sha256 {digest}, "
+            f"expected {ref.get('sha256')}"
+        )
+    resolved = {k: v for k, v in event.items() if k != REF_FIELD}
+    resolved.update(loads(payload))
+    return resolved
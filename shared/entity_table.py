@@ -0,0 +1,319 @@
+"""Compact columnar representation of extracted entities.
+
+A dense rule yields tens of thousands of entities. Keeping each one as a
+dict with a nested ``attrs`` dict costs hundreds of bytes per entity and a
+lot of GC work, so the NLP and graph services hold them as parallel
+``array`` columns plus an interned string table instead. Conversion to the
+``nlp.extracted`` dict layout happens only at the serialization boundary
+(:meth:`EntityTable.to_dicts`).
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+ENTITY_TYPES = ("OBLIGATION", "THRESHOLD", "CITATION", "JURISDICTION")
+CHANGE_MARKERS = ("new", "changed", "unchanged")
+
+_TYPE_CODES = {name: code for code, name in enumerate(ENTITY_TYPES)}
+_CHANGE_CODES = {name: code for code, name in enumerate(CHANGE_MARKERS)}
+
+# Presence bits for the attrs that have dedicated columns. ``None`` values
+# are kept distinct from missing keys so round trips are exact.
+_HAS_ATTRS = 0x80
+_HAS_VALUE = 0x01
+_HAS_UNIT = 0x02
+_HAS_UNIT_NORMALIZED = 0x04
+_HAS_NAME = 0x08
+_COLUMN_ATTRS = ("value", "unit", "unit_normalized", "name")
+
+
+class StringTable:
+    """Interned strings addressed by integer id."""
+
+    __slots__ = ("_ids", "_values")
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def intern(self, value: str) -> int:
+        idx = self._ids.get(value)
+        if idx is None:
+            idx = len(self._values)
+            self._ids[value] = idx
+            self._values.append(value)
+        return idx
+
+    def __getitem__(self, idx: int) -> str:
+        return self._values[idx]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class EntityView:
+    """Zero-copy access to the rows of one entity type.
+
+    ``rows`` holds row numbers into the parent table; ``starts``, ``ends`` and
+    ``values`` are memoryviews over the parent columns and are indexed by row
+    number, not by position in ``rows``.
+    """
+
+    __slots__ = ("table", "rows", "starts", "ends", "values")
+
+    def __init__(self, table: "EntityTable", rows: array) -> None:
+        self.table = table
+        self.rows = rows
+        self.starts = memoryview(table.starts)
+        self.ends = memoryview(table.ends)
+        self.values = memoryview(table.values)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class EntityTable:
+    """Parallel-array storage for extracted entities."""
+
+    __slots__ = (
+        "strings",
+        "types",
+        "starts",
+        "ends",
+        "texts",
+        "values",
+        "units",
+        "units_normalized",
+        "names",
+        "changes",
+        "attr_flags",
+        "extra",
+    )
+
+    def __init__(self, strings: Optional[StringTable] = None) -> None:
+        self.strings = strings if strings is not None else StringTable()
+        self.types = array("B")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.texts = array("i")
+        self.values = array("d")
+        self.units = array("i")
+        self.units_normalized = array("i")
+        self.names = array("i")
+        self.changes = array("b")
+        self.attr_flags = array("B")
+        self.extra: Dict[int, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def _intern_optional(self, value: Optional[str]) -> int:
+        return -1 if value is None else self.strings.intern(value)
+
+    def string(self, idx: int) -> Optional[str]:
+        return None if idx < 0 else self.strings[idx]
+
+    def _push(
+        self,
+        type_code: int,
+        text: str,
+        start: int,
+        end: int,
+        flags: int,
+        value: float = math.nan,
+        unit: int = -1,
+        unit_normalized: int = -1,
+        name: int = -1,
+        change: int = -1,
+    ) -> int:
+        row = len(self.types)
+        self.types.append(type_code)
+        self.texts.append(self.strings.intern(text))
+        self.starts.append(start)
+        self.ends.append(end)
+        self.values.append(value)
+        self.units.append(unit)
+        self.units_normalized.append(unit_normalized)
+        self.names.append(name)
+        self.changes.append(change)
+        self.attr_flags.append(flags)
+        return row
+
+    def add_obligation(self, text: str, start: int, end: int) -> int:
+        return self._push(_TYPE_CODES["OBLIGATION"], text, start, end, _HAS_ATTRS)
+
+    def add_threshold(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        value: float,
+        unit: str,
+        unit_normalized: str,
+    ) -> int:
+        return self._push(
+            _TYPE_CODES["THRESHOLD"],
+            text,
+            start,
+            end,
+            _HAS_ATTRS | _HAS_VALUE | _HAS_UNIT | _HAS_UNIT_NORMALIZED,
+            value=value,
+            unit=self.strings.intern(unit),
+            unit_normalized=self.strings.intern(unit_normalized),
+        )
+
+    def add_jurisdiction(self, text: str, start: int, end: int, name: str) -> int:
+        return self._push(
+            _TYPE_CODES["JURISDICTION"],
+            text,
+            start,
+            end,
+            _HAS_ATTRS | _HAS_NAME,
+            name=self.strings.intern(name),
+        )
+
+    def append(
+        self,
+        type_: str,
+        text: str,
+        start: int,
+        end: int,
+        attrs: Optional[dict] = None,
+        change: Optional[str] = None,
+    ) -> int:
+        """Append one entity given in dict form and return its row number."""
+
+        flags = 0
+        value = unit = unit_normalized = name = None
+        if attrs is not None:
+            flags = _HAS_ATTRS
+            if "value" in attrs:
+                flags |= _HAS_VALUE
+                value = attrs["value"]
+            if "unit" in attrs:
+                flags |= _HAS_UNIT
+                unit = attrs["unit"]
+            if "unit_normalized" in attrs:
+                flags |= _HAS_UNIT_NORMALIZED
+                unit_normalized = attrs["unit_normalized"]
+            if "name" in attrs:
+                flags |= _HAS_NAME
+                name = attrs["name"]
+        row = self._push(
+            _TYPE_CODES[type_],
+            text,
+            start,
+            end,
+            flags,
+            value=math.nan if value is None else float(value),
+            unit=self._intern_optional(unit),
+            unit_normalized=self._intern_optional(unit_normalized),
+            name=self._intern_optional(name),
+            change=-1 if change is None else _CHANGE_CODES[change],
+        )
+        if attrs is not None and len(attrs) > bin(flags & 0x0F).count("1"):
+            self.extra[row] = {k: v for k, v in attrs.items() if k not in _COLUMN_ATTRS}
+        return row
+
+    @classmethod
+    def from_dicts(cls, entities: Iterable[dict]) -> "EntityTable":
+        table = cls()
+        for entity in entities:
+            table.append(
+                entity["type"],
+                entity.get("text", ""),
+                entity.get("start", 0),
+                entity.get("end", 0),
+                entity.get("attrs"),
+                entity.get("change"),
+            )
+        return table
+
+    def take(self, rows: Iterable[int]) -> "EntityTable":
+        """Return a new table with the given rows, sharing the string table."""
+
+        rows = list(rows)
+        out = EntityTable(self.strings)
+        for column in (
+            "types",
+            "starts",
+            "ends",
+            "texts",
+            "values",
+            "units",
+            "units_normalized",
+            "names",
+            "changes",
+            "attr_flags",
+        ):
+            source = getattr(self, column)
+            setattr(out, column, array(source.typecode, [source[r] for r in rows]))
+        if self.extra:
+            out.extra = {
+                new_row: self.extra[old_row]
+                for new_row, old_row in enumerate(rows)
+                if old_row in self.extra
+            }
+        return out
+
+    def sorted_by_type(self) -> "EntityTable":
+        """Group rows by entity type, keeping their relative order."""
+
+        return self.take(sorted(range(len(self.types)), key=self.types.__getitem__))
+
+    def type_name(self, row: int) -> str:
+        return ENTITY_TYPES[self.types[row]]
+
+    def text(self, row: int) -> str:
+        return self.strings[self.texts[row]]
+
+    def attrs(self, row: int) -> Optional[dict]:
+        flags = self.attr_flags[row]
+        if not flags & _HAS_ATTRS:
+            return None
+        attrs: dict = {}
+        if flags & _HAS_VALUE:
+            value = self.values[row]
+            attrs["value"] = None if math.isnan(value) else value
+        if flags & _HAS_UNIT:
+            attrs["unit"] = self.string(self.units[row])
+        if flags & _HAS_UNIT_NORMALIZED:
+            attrs["unit_normalized"] = self.string(self.units_normalized[row])
+        if flags & _HAS_NAME:
+            attrs["name"] = self.string(self.names[row])
+        if row in self.extra:
+            attrs.update(self.extra[row])
+        return attrs
+
+    def change(self, row: int) -> Optional[str]:
+        code = self.changes[row]
+        return None if code < 0 else CHANGE_MARKERS[code]
+
+    def view(self, type_: str) -> EntityView:
+        code = _TYPE_CODES[type_]
+        rows = array("i", (row for row, t in enumerate(self.types) if t == code))
+        return EntityView(self, rows)
+
+    def iter_dicts(self) -> Iterator[dict]:
+        for row in range(len(self.types)):
+            entity = {
+                "type": ENTITY_TYPES[self.types[row]],
+                "text": self.strings[self.texts[row]],
+                "start": self.starts[row],
+                "end": self.ends[row],
+            }
+            attrs = self.attrs(row)
+            if attrs is not None:
+                entity["attrs"] = attrs
+            change = self.changes[row]
+            if change >= 0:
+                entity["change"] = CHANGE_MARKERS[change]
+            yield entity
+
+    def to_dicts(self) -> List[dict]:
+        """Serialize to the ``nlp.extracted`` entity layout."""
+
+        return list(self.iter_dicts())
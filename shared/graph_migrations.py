@@ -0,0 +1,279 @@
+"""Versioned schema and data migrations for the Neo4j graph.
+
+Services declare their migrations as :class:`Migration` tuples under a
+``scope`` (``graph``, ``opportunity``). Each applied migration is recorded
+as a ``(:SchemaMigration {scope, version})`` node, so startup no longer
+replays every ``CREATE CONSTRAINT``/``CREATE INDEX`` statement and
+migrations run once and in order.
+
+Migrations are applied on service startup by :func:`apply_on_startup`. On
+an empty graph they all run before the service starts. On a populated graph
+startup applies schema-only migrations and the new indexes and constraints of
+data migrations (those with batched steps), which are idempotent and need no
+data, then runs the data migrations on a background thread: each batch is
+its own write transaction and every batched step is idempotent, so they are
+safe to run while the service writes. Readers check the recorded versions
+and switch to what a migration enables once it is recorded. The service's
+``python -m app.migrations`` command applies pending migrations by hand.
+
+:func:`explain_statements` runs ``EXPLAIN`` on a service's production
+statements and reports plans that fall back to label or all-node scans.
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import structlog
+
+logger = structlog.get_logger("graph-migrations")
+
+SCAN_OPERATORS = ("NodeByLabelScan", "AllNodesScan")
+SCHEMA_PREFIXES = ("CREATE INDEX", "CREATE CONSTRAINT")
+
+
+@dataclass(frozen=True)
+class Step:
+    """One Cypher statement of a migration.
+
+    Batched statements receive ``$batch_size``, must return the number of
+    rows they changed as ``n`` and are repeated until that is zero; they
+    must be idempotent. ``CREATE INDEX``/``CREATE CONSTRAINT`` statements
+    must use ``IF NOT EXISTS``, because startup may run them ahead of the
+    rest of their migration; drops wait for the data they served to move.
+    """
+
+    statement: str
+    batched: bool = False
+
+    @property
+    def is_schema(self) -> bool:
+        return self.statement.lstrip().upper().startswith(SCHEMA_PREFIXES)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    steps: Tuple[Step, ...]
+
+    @property
+    def is_data_migration(self) -> bool:
+        return any(step.batched for step in self.steps)
+
+
+@dataclass(frozen=True)
+class Statement:
+    """A production statement to check with ``EXPLAIN``.
+
+    ``allow_scans`` lists labels that are small enough to scan, such as a
+    dictionary of concepts.
+    """
+
+    query: str
+    params: Dict[str, object] = field(default_factory=dict)
+    allow_scans: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class ScanFinding:
+    statement: str
+    operator: str
+    details: str
+
+
+def applied_versions(session, scope: str) -> List[int]:
+    # Migrations recorded before scopes existed belong to the graph service.
+    result = session.run(
+        "MATCH (m:SchemaMigration) WHERE coalesce(m.scope, 'graph') = $scope "
+        "RETURN m.version AS version ORDER BY version",
+        scope=scope,
+    )
+    return [record["version"] for record in result]
+
+
+def run_step(session, step: Step, batch_size: int) -> int:
+    if not step.batched:
+        session.run(step.statement).consume()
+        return 0
+    total = 0
+    while True:
+        changed = session.execute_write(
+            lambda tx: tx.run(step.statement, batch_size=batch_size).single()["n"]
+        )
+        total += changed
+        if not changed:
+            return total
+
+
+def migrate(
+    session,
+    scope: str,
+    migrations: Sequence[Migration],
+    batch_size: int = 10_000,
+    schema_only: bool = False,
+) -> List[int]:
+    """Apply migrations that have not been recorded yet; return their versions.
+
+    With ``schema_only`` a pending data migration runs only its index and
+    constraint creation and stays pending; later schema-only migrations are
+    still applied.
+    """
+
+    done = set(applied_versions(session, scope))
+    applied = []
+    for migration in migrations:
+        if migration.version in done:
+            continue
+        if schema_only and migration.is_data_migration:
+            for step in migration.steps:
+                if step.is_schema:
+                    run_step(session, step, batch_size)
+            continue
+        logger.info(
+            "graph_migration_start",
+            scope=scope,
+            version=migration.version,
+            description=migration.description,
+        )
+        for step in migration.steps:
+            changed = run_step(session, step, batch_size)
+            if step.batched:
+                logger.info(
+                    "graph_migration_step",
+                    scope=scope,
+                    version=migration.version,
+                    rows=changed,
+                )
+        session.run(
+            "MERGE (m:SchemaMigration {scope: $scope, version: $version}) "
+            "SET m.description = $description, m.applied_at = timestamp()",
+            scope=scope,
+            version=migration.version,
+            description=migration.description,
+        ).consume()
+        applied.append(migration.version)
+    return applied
+
+
+def pending_versions(session, scope: str, migrations: Sequence[Migration]) -> List[int]:
+    done = set(applied_versions(session, scope))
+    return [m.version for m in migrations if m.version not in done]
+
+
+def apply_on_startup(
+    session_factory: Callable[[], object],
+    scope: str,
+    migrations: Sequence[Migration],
+) -> Optional[threading.Thread]:
+    """Apply migrations; on a populated graph, data migrations in the background.
+
+    Returns the background thread, or None when nothing was left pending.
+    """
+
+    with session_factory() as session:
+        empty = session.run("MATCH (d:Document) RETURN d LIMIT 1").single() is None
+        migrate(session, scope, migrations, schema_only=not empty)
+        pending = pending_versions(session, scope, migrations)
+    if not pending:
+        return None
+    logger.warning(
+        "graph_migrations_pending",
+        scope=scope,
+        pending=pending,
+        hint="data migrations run in the background; features that need them "
+        "use their fallback queries until they are recorded",
+    )
+
+    def run() -> None:
+        try:
+            with session_factory() as session:
+                applied = migrate(session, scope, migrations)
+        except Exception:
+            logger.exception(
+                "graph_migrations_failed",
+                scope=scope,
+                pending=pending,
+                hint="run `python -m app.migrations apply` in the service",
+            )
+            return
+        logger.info("graph_migrations_done", scope=scope, applied=applied)
+
+    thread = threading.Thread(target=run, name=f"{scope}-migrations", daemon=True)
+    thread.start()
+    return thread
+
+
+def _walk(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("children", ()):
+        yield from _walk(child)
+
+
+def _operator(plan: dict) -> str:
+    return plan.get("operatorType", "").split("@", 1)[0]
+
+
+def scan_findings(
+    name: str, plan: dict, allow_scans: Sequence[str] = ()
+) -> List[ScanFinding]:
+    """Label and all-node scans in an ``EXPLAIN`` plan."""
+
+    findings = []
+    for node in _walk(plan or {}):
+        operator = _operator(node)
+        if operator not in SCAN_OPERATORS:
+            continue
+        details = str(node.get("args", node.get("arguments", {})).get("Details", ""))
+        label = details.rpartition(":")[2].strip()
+        if operator == "NodeByLabelScan" and label in allow_scans:
+            continue
+        findings.append(ScanFinding(name, operator, details))
+    return findings
+
+
+def explain_statements(session, statements: Dict[str, Statement]) -> List[ScanFinding]:
+    findings = []
+    for name, statement in statements.items():
+        summary = session.run(f"EXPLAIN {statement.query}", statement.params).consume()
+        findings.extend(scan_findings(name, summary.plan, statement.allow_scans))
+    return findings
+
+
+def run_cli(
+    argv: Optional[List[str]],
+    *,
+    scope: str,
+    migrations: Sequence[Migration],
+    statements: Callable[[], Dict[str, Statement]],
+    session_factory: Callable[[], object],
+) -> int:
+    """``status``, ``apply`` and ``explain`` subcommands for a service."""
+
+    parser = argparse.ArgumentParser(description=f"Neo4j migrations ({scope})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="List applied and pending migrations")
+    apply = sub.add_parser("apply", help="Apply pending migrations")
+    apply.add_argument("--batch-size", type=int, default=10_000)
+    sub.add_parser("explain", help="Flag label scans in production statements")
+    args = parser.parse_args(argv)
+
+    with session_factory() as session:
+        if args.command == "status":
+            done = set(applied_versions(session, scope))
+            for migration in migrations:
+                state = "applied" if migration.version in done else "pending"
+                print(f"{migration.version:>4} {state:<8} {migration.description}")
+            return 0
+        if args.command == "apply":
+            applied = migrate(session, scope, migrations, batch_size=args.batch_size)
+            print(f"applied {len(applied)} migration(s): {applied or 'none pending'}")
+            return 0
+        findings = explain_statements(session, statements())
+    for finding in findings:
+        print(f"{finding.statement}: {finding.operator} {finding.details}")
+    print(f"{len(findings)} scan(s) found")
+    return 1 if findings else 0
@@ -0,0 +1,490 @@
+"""Storage interface for the regulatory graph, with an embedded SQLite backend.
+
+The graph service writes documents through a :class:`GraphWriter` and the
+opportunity service answers arbitrage and gap queries through a
+:class:`GraphReader`. Each service ships a Neo4j implementation of its side;
+:class:`SQLiteGraphStore` implements both on a single local file so the
+pipeline, the API and the benchmarks run without a Neo4j server
+(``GRAPH_BACKEND=sqlite``). Point both services at the same
+``GRAPH_SQLITE_PATH`` on a shared volume; SQLite in WAL mode lets the graph
+consumer write while the API reads.
+
+Both backends take the ``$docs`` entries built by the graph service's
+``document_params`` and return rows with the same columns as the Neo4j
+statements, so callers never branch on the backend.
+
+Every write that changes provisions bumps a graph change version and stamps
+the provisions it touched with it, so in-memory readers can refresh from
+:meth:`GraphReader.changes` instead of reloading the graph.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKENDS = ("neo4j", "sqlite")
+
+
+@dataclass
+class GraphChanges:
+    """Provisions written after a graph change version.
+
+    Each provision is a dict with ``pid``, ``valid_to``, ``text``,
+    ``start``, ``end``, ``doc_id``, ``source_url``, ``created_at``,
+    ``concept``, ``jurisdictions`` and ``entries``: one
+    ``{threshold, value, unit, concept, jurisdictions}`` dict per threshold.
+    A provision with ``valid_to`` set was closed since the reader's version
+    and is to be dropped. With ``reset`` the provisions are the whole open
+    graph and replace what the reader holds, because provisions were deleted
+    since its version.
+    """
+
+    version: int
+    reset: bool
+    provisions: List[dict]
+
+
+class GraphWriter(ABC):
+    @abstractmethod
+    def write_documents(self, docs: List[dict]) -> Dict[str, int]:
+        """Upsert documents in one transaction; return provision change counts.
+
+        Counts are keyed ``new_or_changed``, ``unchanged`` and ``removed``.
+        """
+
+    def close(self) -> None:
+        return None
+
+
+class GraphReader(ABC):
+    @abstractmethod
+    def arbitrage(
+        self,
+        *,
+        rel_delta: float,
+        limit: int,
+        j1: Optional[str] = None,
+        j2: Optional[str] = None,
+        concept: Optional[str] = None,
+        since: Optional[int] = None,
+    ) -> List[dict]:
+        """Threshold pairs on the same concept and unit, largest gap first.
+
+        ``since`` is in epoch milliseconds; the jurisdiction filter applies
+        only when both ``j1`` and ``j2`` are given.
+        """
+
+    @abstractmethod
+    def gaps(self, j1: str, j2: str, limit: int) -> List[dict]:
+        """Provisions in ``j1`` about concepts with no provision in ``j2``."""
+
+    @abstractmethod
+    def coverage(self) -> List[dict]:
+        """Distinct ``{jurisdiction, concept}`` pairs that have a provision.
+
+        Like every read, only provisions that are still valid count.
+        """
+
+    @abstractmethod
+    def version(self) -> Optional[int]:
+        """Current graph change version; None if the graph does not keep one."""
+
+    @abstractmethod
+    def changes(self, after: Optional[int]) -> GraphChanges:
+        """Provisions changed after version ``after``; everything if None."""
+
+    def close(self) -> None:
+        return None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+  id TEXT PRIMARY KEY,
+  source_url TEXT,
+  created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_created_at ON documents (created_at);
+CREATE TABLE IF NOT EXISTS document_jurisdictions (
+  doc_id TEXT NOT NULL,
+  jurisdiction TEXT NOT NULL,
+  PRIMARY KEY (doc_id, jurisdiction)
+);
+CREATE TABLE IF NOT EXISTS provisions (
+  pid TEXT PRIMARY KEY,
+  doc_id TEXT NOT NULL,
+  concept TEXT NOT NULL,
+  text TEXT,
+  hash TEXT,
+  start INTEGER,
+  "end" INTEGER,
+  page INTEGER,
+  tx_from INTEGER,
+  valid_from INTEGER,
+  valid_to INTEGER,
+  tx_to INTEGER,
+  updated_at INTEGER,
+  version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS provisions_doc ON provisions (doc_id, valid_to);
+CREATE INDEX IF NOT EXISTS provisions_concept ON provisions (concept);
+CREATE TABLE IF NOT EXISTS provision_jurisdictions (
+  pid TEXT NOT NULL,
+  jurisdiction TEXT NOT NULL,
+  PRIMARY KEY (pid, jurisdiction)
+);
+CREATE INDEX IF NOT EXISTS provision_jurisdictions_name
+  ON provision_jurisdictions (jurisdiction, pid);
+CREATE TABLE IF NOT EXISTS thresholds (
+  pid TEXT PRIMARY KEY,
+  value REAL,
+  unit TEXT,
+  unit_normalized TEXT
+);
+CREATE INDEX IF NOT EXISTS thresholds_unit ON thresholds (unit_normalized);
+CREATE TABLE IF NOT EXISTS provision_thresholds (
+  provision_pid TEXT NOT NULL,
+  threshold_pid TEXT NOT NULL,
+  PRIMARY KEY (provision_pid, threshold_pid)
+);
+CREATE TABLE IF NOT EXISTS graph_meta (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  version INTEGER NOT NULL,
+  reset_version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO graph_meta VALUES (1, 0, 0);
+"""
+
+SQL_UPSERT_DOCUMENT = """
+INSERT INTO documents (id, source_url, created_at) VALUES (?, ?, ?)
+ON CONFLICT (id) DO UPDATE
+  SET source_url = coalesce(excluded.source_url, documents.source_url)
+"""
+
+# Mirrors the MERGE in the Neo4j upsert: a provision that reappears is
+# reopened and keeps its original tx_from/valid_from.
+SQL_UPSERT_PROVISION = """
+INSERT INTO provisions (pid, doc_id, concept, text, hash, start, "end", page,
+                        tx_from, valid_from, updated_at, version)
+VALUES (:pid, :doc_id, :concept, :text, :hash, :start, :end, :page,
+        :now, :now, :now, :version)
+ON CONFLICT (pid) DO UPDATE
+  SET concept = excluded.concept, text = excluded.text, hash = excluded.hash,
+      start = excluded.start, "end" = excluded."end", page = excluded.page,
+      updated_at = excluded.updated_at, version = excluded.version,
+      valid_to = NULL, tx_to = NULL
+"""
+
+SQL_UPSERT_THRESHOLD = """
+INSERT INTO thresholds (pid, value, unit, unit_normalized)
+VALUES (:pid, :value, :unit, :unit_normalized)
+ON CONFLICT (pid) DO UPDATE
+  SET value = excluded.value, unit = excluded.unit,
+      unit_normalized = excluded.unit_normalized
+"""
+
+SQL_ARBITRAGE_BASE = """
+SELECT p1.concept AS concept,
+       p1.text AS text1, t1.value AS v1, t1.unit_normalized AS unit,
+       p2.text AS text2, t2.value AS v2,
+       d1.id AS doc_id_1, p1.start AS start_1, p1."end" AS end_1,
+       d2.id AS doc_id_2, p2.start AS start_2, p2."end" AS end_2,
+       d1.source_url AS source_url_1, d2.source_url AS source_url_2
+FROM provisions p1
+JOIN provision_thresholds pt1 ON pt1.provision_pid = p1.pid
+JOIN thresholds t1 ON t1.pid = pt1.threshold_pid
+JOIN provisions p2 ON p2.concept = p1.concept AND p2.pid <> p1.pid
+JOIN provision_thresholds pt2 ON pt2.provision_pid = p2.pid
+JOIN thresholds t2 ON t2.pid = pt2.threshold_pid
+JOIN documents d1 ON d1.id = p1.doc_id
+JOIN documents d2 ON d2.id = p2.doc_id
+WHERE p1.valid_to IS NULL AND p2.valid_to IS NULL
+  AND t1.unit_normalized = t2.unit_normalized
+  AND t1.unit_normalized IS NOT NULL
+  AND abs(t1.value - t2.value)
+      / CASE WHEN t1.value = 0 THEN 1 ELSE t1.value END >= :rel_delta
+{filters}
+ORDER BY abs(t1.value - t2.value) DESC
+LIMIT :limit
+"""
+
+SQL_GAP = """
+SELECT p1.concept AS concept,
+       p1.text AS example_text,
+       d.id AS doc_id,
+       p1.start AS start,
+       p1."end" AS "end",
+       d.source_url AS source_url
+FROM provision_jurisdictions pj1
+JOIN provisions p1 ON p1.pid = pj1.pid
+JOIN documents d ON d.id = p1.doc_id
+WHERE pj1.jurisdiction = :j1
+  AND p1.valid_to IS NULL
+  AND NOT EXISTS (
+    SELECT 1
+    FROM provision_jurisdictions pj2
+    JOIN provisions p2 ON p2.pid = pj2.pid
+    WHERE pj2.jurisdiction = :j2 AND p2.concept = p1.concept
+      AND p2.valid_to IS NULL
+  )
+LIMIT :limit
+"""
+
+SQL_COVERAGE = """
+SELECT DISTINCT pj.jurisdiction AS jurisdiction, p.concept AS concept
+FROM provision_jurisdictions pj
+JOIN provisions p ON p.pid = pj.pid
+WHERE p.valid_to IS NULL
+"""
+
+# Closed provisions are returned with their valid_to so readers drop them,
+# unless :closed is false (a reset reload); they need no thresholds or
+# jurisdictions.
+SQL_CHANGED_PROVISIONS = """
+SELECT p.pid, p.valid_to, p.text, p.start, p."end", p.concept,
+       d.id AS doc_id, d.source_url, d.created_at
+FROM provisions p
+JOIN documents d ON d.id = p.doc_id
+WHERE p.version > :after AND (:closed OR p.valid_to IS NULL)
+"""
+
+SQL_CHANGED_THRESHOLDS = """
+SELECT pt.provision_pid, t.pid, t.value, t.unit_normalized
+FROM provisions p
+JOIN provision_thresholds pt ON pt.provision_pid = p.pid
+JOIN thresholds t ON t.pid = pt.threshold_pid
+WHERE p.version > :after AND p.valid_to IS NULL
+"""
+
+SQL_CHANGED_JURISDICTIONS = """
+SELECT pj.pid, pj.jurisdiction
+FROM provisions p
+JOIN provision_jurisdictions pj ON pj.pid = p.pid
+WHERE p.version > :after AND p.valid_to IS NULL
+"""
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class SQLiteGraphStore(GraphWriter, GraphReader):
+    """Both sides of the graph store on one SQLite database file.
+
+    One connection is shared by the threads of a process and serialized
+    with a lock; separate processes open their own connection.
+    """
+
+    def __init__(self, path: str, timeout_s: float = 30.0) -> None:
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=timeout_s, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {
+            row[1] for row in self._conn.execute("PRAGMA table_info(provisions)")
+        }
+        if "version" not in columns:
+            self._conn.execute(
+                "ALTER TABLE provisions ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+
+    def write_documents(self, docs: List[dict]) -> Dict[str, int]:
+        # Only the latest version of a document in the batch is written.
+        docs = list({doc["doc_id"]: doc for doc in docs}.values())
+        counts = {"new_or_changed": 0, "unchanged": 0, "removed": 0}
+        with self._lock:
+            conn = self._conn
+            # BEGIN IMMEDIATE takes the write lock, so versions commit in order.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                (version,) = conn.execute(
+                    "SELECT version + 1 FROM graph_meta"
+                ).fetchone()
+                for doc in docs:
+                    self._write_document(conn, doc, counts, _now_ms(), version)
+                if counts["new_or_changed"] or counts["removed"]:
+                    conn.execute("UPDATE graph_meta SET version = ?", (version,))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return counts
+
+    def _write_document(
+        self,
+        conn: sqlite3.Connection,
+        doc: dict,
+        counts: Dict[str, int],
+        now: int,
+        version: int,
+    ) -> None:
+        doc_id = doc["doc_id"]
+        existing = dict(
+            conn.execute(
+                "SELECT pid, hash FROM provisions "
+                "WHERE doc_id = ? AND valid_to IS NULL",
+                (doc_id,),
+            ).fetchall()
+        )
+        changed = [
+            ob for ob in doc["obligations"] if existing.get(ob["pid"]) != ob["hash"]
+        ]
+        seen = {ob["pid"] for ob in doc["obligations"]}
+        removed = [pid for pid in existing if pid not in seen]
+        unchanged = {
+            ob["pid"]
+            for ob in doc["obligations"]
+            if existing.get(ob["pid"]) == ob["hash"]
+        }
+        counts["new_or_changed"] += len(changed)
+        counts["unchanged"] += len(unchanged)
+        counts["removed"] += len(removed)
+
+        conn.execute(SQL_UPSERT_DOCUMENT, (doc_id, doc["source_url"], now))
+        conn.executemany(
+            "INSERT OR IGNORE INTO document_jurisdictions VALUES (?, ?)",
+            [(doc_id, name) for name in doc["jurisdictions"]],
+        )
+        for ob in changed:
+            conn.execute(
+                SQL_UPSERT_PROVISION,
+                {
+                    "pid": ob["pid"],
+                    "doc_id": doc_id,
+                    "concept": ob["concept"] or "unspecified",
+                    "text": ob["text"],
+                    "hash": ob["hash"],
+                    "start": ob["start"],
+                    "end": ob["end"],
+                    "page": ob["page"],
+                    "now": now,
+                    "version": version,
+                },
+            )
+            conn.execute(
+                "DELETE FROM provision_jurisdictions WHERE pid = ?", (ob["pid"],)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO provision_jurisdictions VALUES (?, ?)",
+                [(ob["pid"], name) for name in doc["jurisdictions"]],
+            )
+            conn.execute(
+                "DELETE FROM provision_thresholds WHERE provision_pid = ?",
+                (ob["pid"],),
+            )
+            conn.executemany(SQL_UPSERT_THRESHOLD, ob["thresholds"])
+            conn.executemany(
+                "INSERT OR IGNORE INTO provision_thresholds VALUES (?, ?)",
+                [(ob["pid"], th["pid"]) for th in ob["thresholds"]],
+            )
+        conn.executemany(
+            "UPDATE provisions SET valid_to = ?, tx_to = ?, updated_at = ?, "
+            "version = ? WHERE pid = ? AND valid_to IS NULL",
+            [(now, now, now, version, pid) for pid in removed],
+        )
+
+    def _query(self, sql: str, params: dict) -> List[dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def arbitrage(
+        self,
+        *,
+        rel_delta: float,
+        limit: int,
+        j1: Optional[str] = None,
+        j2: Optional[str] = None,
+        concept: Optional[str] = None,
+        since: Optional[int] = None,
+    ) -> List[dict]:
+        filters = []
+        params: Dict[str, object] = {"rel_delta": rel_delta, "limit": limit}
+        if j1 and j2:
+            filters.append(
+                "  AND EXISTS (SELECT 1 FROM provision_jurisdictions"
+                " WHERE pid = p1.pid AND jurisdiction = :j1)\n"
+                "  AND EXISTS (SELECT 1 FROM provision_jurisdictions"
+                " WHERE pid = p2.pid AND jurisdiction = :j2)\n"
+            )
+            params.update(j1=j1, j2=j2)
+        if concept:
+            filters.append("  AND lower(p1.concept) = lower(:concept)\n")
+            params["concept"] = concept
+        if since is not None:
+            filters.append(
+                "  AND d1.created_at >= :since\n  AND d2.created_at >= :since\n"
+            )
+            params["since"] = since
+        sql = SQL_ARBITRAGE_BASE.format(filters="".join(filters))
+        return self._query(sql, params)
+
+    def gaps(self, j1: str, j2: str, limit: int) -> List[dict]:
+        return self._query(SQL_GAP, {"j1": j1, "j2": j2, "limit": limit})
+
+    def coverage(self) -> List[dict]:
+        return self._query(SQL_COVERAGE, {})
+
+    def version(self) -> Optional[int]:
+        with self._lock:
+            return self._conn.execute("SELECT version FROM graph_meta").fetchone()[0]
+
+    def changes(self, after: Optional[int]) -> GraphChanges:
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                version, reset_version = conn.execute(
+                    "SELECT version, reset_version FROM graph_meta"
+                ).fetchone()
+                reset = after is None or reset_version > after
+                params = {"after": -1 if reset else after, "closed": not reset}
+                provisions = {
+                    row["pid"]: {
+                        "pid": row["pid"],
+                        "valid_to": row["valid_to"],
+                        "text": row["text"],
+                        "start": row["start"],
+                        "end": row["end"],
+                        "doc_id": row["doc_id"],
+                        "source_url": row["source_url"],
+                        "created_at": row["created_at"],
+                        "concept": row["concept"],
+                        "jurisdictions": [],
+                        "entries": [],
+                    }
+                    for row in conn.execute(SQL_CHANGED_PROVISIONS, params)
+                }
+                for pid, name in conn.execute(SQL_CHANGED_JURISDICTIONS, params):
+                    provisions[pid]["jurisdictions"].append(name)
+                for pid, t_pid, value, unit in conn.execute(
+                    SQL_CHANGED_THRESHOLDS, params
+                ):
+                    provisions[pid]["entries"].append(
+                        {"threshold": t_pid, "value": value, "unit": unit}
+                    )
+            finally:
+                conn.execute("COMMIT")
+        for provision in provisions.values():
+            for entry in provision["entries"]:
+                entry.update(
+                    concept=provision["concept"],
+                    jurisdictions=provision["jurisdictions"],
+                )
+        return GraphChanges(version, reset, list(provisions.values()))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
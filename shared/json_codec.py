@@ -0,0 +1,61 @@
+"""JSON encoding for Kafka payloads, S3 objects and HTTP responses.
+
+Uses ``orjson`` when it is installed and falls back to the standard library
+otherwise. Both backends produce compact UTF-8 bytes and accept ``bytes`` or
+``str`` input, so callers never need to know which one is active.
+
+Content hashes must not go through this module: the two backends do not
+produce byte-identical output.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _stdlib_dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    return json.dumps(
+        obj, default=default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _stdlib_loads(data: bytes | bytearray | memoryview | str) -> Any:
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+if orjson is not None:
+    # stdlib json coerces non-string keys; orjson needs to be told to.
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        """Serialize ``obj`` to compact UTF-8 JSON bytes."""
+
+        return orjson.dumps(obj, default=default, option=_OPTIONS)
+
+    def loads(data: bytes | bytearray | memoryview | str) -> Any:
+        """Parse JSON from bytes or text."""
+
+        return orjson.loads(data)
+
+else:  # pragma: no cover - optional dependency
+    dumps = _stdlib_dumps
+    loads = _stdlib_loads
+
+
+class FastJSONResponse(JSONResponse):
+    """FastAPI response class rendering bodies with :func:`dumps`."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
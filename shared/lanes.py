@@ -0,0 +1,80 @@
+"""Priority lanes for the document pipeline.
+
+Documents are routed to one of two lanes so a large scanned rule never sits
+in front of small notices on the same partition:
+
+``standard``
+    The default lane, using the configured topic names unchanged.
+``bulk``
+    Large, many-page or OCR-extracted documents. Each topic gets a
+    ``.bulk`` suffix (``ingest.normalized.bulk``, ``nlp.extracted.bulk``)
+    and its own consumer group and worker pool downstream.
+
+Ingestion picks the lane with :func:`classify` and records it in the event's
+``lane`` field; NLP forwards the lane of its input so the graph service sees
+the same split.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Tuple
+
+STANDARD = "standard"
+BULK = "bulk"
+LANES = (STANDARD, BULK)
+
+
+def parse_engines(value: str) -> frozenset[str]:
+    """Parse a ``BULK_LANE_ENGINES`` setting such as ``"tesseract,textract"``."""
+
+    return frozenset(part.strip().lower() for part in value.split(",") if part.strip())
+
+
+def lane_topic(topic: str, lane: str) -> str:
+    """Return the topic carrying ``lane`` for the standard-lane ``topic``."""
+
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane {lane!r}")
+    return topic if lane == STANDARD else f"{topic}.{lane}"
+
+
+def lane_group(group_id: str, lane: str) -> str:
+    """Consumer group for ``lane``; the standard lane keeps the existing group."""
+
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane {lane!r}")
+    return group_id if lane == STANDARD else f"{group_id}-{lane}"
+
+
+def classify(
+    text_bytes: int,
+    page_count: int,
+    engine: Optional[str],
+    *,
+    min_bytes: int,
+    min_pages: int,
+    bulk_engines: Iterable[str] = (),
+) -> str:
+    """Choose a lane from a document's size, page count and extraction engine.
+
+    Documents of at least ``min_bytes`` bytes or ``min_pages`` pages go to the
+    bulk lane; a limit of zero disables that criterion.
+    """
+
+    if min_bytes and text_bytes >= min_bytes:
+        return BULK
+    if min_pages and page_count >= min_pages:
+        return BULK
+    if engine and engine.lower() in bulk_engines:
+        return BULK
+    return STANDARD
+
+
+def lane_workers(
+    prefix: str, standard_workers: int, bulk_workers: int
+) -> List[Tuple[str, str]]:
+    """Name and lane of each consumer worker, e.g. ``nlp-0`` and ``nlp-bulk-0``."""
+
+    return [(f"{prefix}-{i}", STANDARD) for i in range(standard_workers)] + [
+        (f"{prefix}-{BULK}-{i}", BULK) for i in range(bulk_workers)
+    ]
@@ -0,0 +1,117 @@
+"""Republish dead-lettered Kafka records to the topic they came from.
+
+Examples::
+
+    python shared/replay_dlq.py ingest.normalized.dlq --dry-run
+    python shared/replay_dlq.py nlp.extracted.dlq --limit 100
+    python shared/replay_dlq.py nlp.extracted.dlq --error-type ServiceUnavailable
+
+Replayed records keep their key, value and non-routing headers, start again
+at attempt zero and carry ``x-replayed-from`` (``<dlq>:<partition>:<offset>``).
+Progress is committed under the ``--group`` consumer group, so repeated runs
+continue where the previous one stopped. Filtered runs (``--error-type``)
+commit nothing, leaving the other records in place for a later replay.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+from kafka import KafkaConsumer, KafkaProducer
+from retry_ladder import (
+    HEADER_ERROR,
+    HEADER_ERROR_TYPE,
+    HEADER_ORIGINAL_TOPIC,
+    commit_record,
+    header_value,
+    passthrough_headers,
+)
+
+HEADER_REPLAYED_FROM = "x-replayed-from"
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dlq_topic", help="Dead-letter topic, e.g. nlp.extracted.dlq")
+    parser.add_argument(
+        "--bootstrap-servers",
+        default=os.environ.get("KAFKA_BOOTSTRAP_SERVERS", "redpanda:9092"),
+    )
+    parser.add_argument("--group", default="dlq-replay")
+    parser.add_argument(
+        "--to", dest="target", help="Override the destination topic for all records"
+    )
+    parser.add_argument(
+        "--error-type", help="Only replay records with this x-error-type"
+    )
+    parser.add_argument("--limit", type=int, default=0, help="Stop after N replays")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="List records without replaying them"
+    )
+    parser.add_argument(
+        "--idle-timeout-ms",
+        type=int,
+        default=5000,
+        help="Stop when no record arrives for this long",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    consumer = KafkaConsumer(
+        args.dlq_topic,
+        bootstrap_servers=args.bootstrap_servers,
+        group_id=args.group,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        consumer_timeout_ms=args.idle_timeout_ms,
+        isolation_level="read_committed",
+    )
+    producer = None
+    if not args.dry_run:
+        producer = KafkaProducer(
+            bootstrap_servers=args.bootstrap_servers, acks="all", retries=5
+        )
+
+    replayed = skipped = 0
+    try:
+        for record in consumer:
+            error_type = header_value(record.headers, HEADER_ERROR_TYPE)
+            target = args.target or header_value(record.headers, HEADER_ORIGINAL_TOPIC)
+            location = f"{record.topic}:{record.partition}:{record.offset}"
+            if args.error_type and error_type != args.error_type:
+                skipped += 1
+                continue
+            if target is None:
+                print(f"skip {location}: no {HEADER_ORIGINAL_TOPIC} header")
+                skipped += 1
+                continue
+            error = header_value(record.headers, HEADER_ERROR) or ""
+            print(f"{location} -> {target} [{error_type}] {error[:120]}")
+            if producer is not None:
+                headers = passthrough_headers(record.headers)
+                headers.append((HEADER_REPLAYED_FROM, location.encode()))
+                producer.send(
+                    target, key=record.key, value=record.value, headers=headers
+                ).get(timeout=10)
+                if not args.error_type:
+                    commit_record(consumer, record)
+            replayed += 1
+            if args.limit and replayed >= args.limit:
+                break
+    finally:
+        consumer.close()
+        if producer is not None:
+            producer.close()
+
+    verb = "would replay" if args.dry_run else "replayed"
+    print(f"{verb} {replayed} record(s), skipped {skipped}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
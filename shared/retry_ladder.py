@@ -0,0 +1,287 @@
+"""Retry topics and dead-letter routing for Kafka consumers.
+
+A record that fails processing is copied, unchanged, to the next rung of a
+ladder of delayed retry topics (``<topic>.retry.1`` ... ``<topic>.retry.N``)
+and finally to ``<topic>.dlq``; the consumer then commits past it, so one
+bad record never blocks its partition. Permanent failures such as schema
+violations skip the ladder and go straight to the dead-letter topic.
+
+Routing metadata travels in record headers:
+
+``x-error`` / ``x-error-type``
+    Failure message (truncated) and exception class of the last attempt.
+``x-attempt``
+    Number of failed attempts so far.
+``x-original-topic`` / ``x-original-partition`` / ``x-original-offset``
+    Where the record was first consumed from.
+``x-not-before``
+    Epoch milliseconds before which a retry must not be processed.
+
+Consumers subscribe to :attr:`RetryLadder.source_topics` and use a
+:class:`DelayGate` to pause retry partitions until their records are due.
+``replay_dlq.py`` republishes dead-lettered records to their original topic.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import structlog
+from kafka import KafkaConsumer, KafkaProducer, TopicPartition
+from kafka.structs import OffsetAndMetadata
+from prometheus_client import Counter
+
+logger = structlog.get_logger("retry-ladder")
+
+HEADER_ERROR = "x-error"
+HEADER_ERROR_TYPE = "x-error-type"
+HEADER_ATTEMPT = "x-attempt"
+HEADER_ORIGINAL_TOPIC = "x-original-topic"
+HEADER_ORIGINAL_PARTITION = "x-original-partition"
+HEADER_ORIGINAL_OFFSET = "x-original-offset"
+HEADER_NOT_BEFORE = "x-not-before"
+ROUTING_HEADERS = frozenset(
+    {
+        HEADER_ERROR,
+        HEADER_ERROR_TYPE,
+        HEADER_ATTEMPT,
+        HEADER_ORIGINAL_TOPIC,
+        HEADER_ORIGINAL_PARTITION,
+        HEADER_ORIGINAL_OFFSET,
+        HEADER_NOT_BEFORE,
+    }
+)
+MAX_ERROR_BYTES = 1024
+
+ROUTED_COUNTER = Counter(
+    "consumer_failed_records_routed_total",
+    "Failed records moved to a retry or dead-letter topic",
+    ["topic", "destination"],
+)
+
+Headers = List[Tuple[str, bytes]]
+
+
+def parse_delays(value: str) -> Tuple[int, ...]:
+    """Parse a ``RETRY_DELAYS_MS`` setting such as ``"5000,60000"``."""
+
+    return tuple(int(part) for part in value.split(",") if part.strip())
+
+
+def header_value(
+    headers: Optional[Iterable[Tuple[str, bytes]]], name: str
+) -> Optional[str]:
+    for key, value in headers or ():
+        if key == name and value is not None:
+            return value.decode("utf-8", errors="replace")
+    return None
+
+
+def passthrough_headers(headers: Optional[Iterable[Tuple[str, bytes]]]) -> Headers:
+    """Headers of a record without the routing metadata added by the ladder."""
+
+    return [(k, v) for k, v in headers or () if k not in ROUTING_HEADERS]
+
+
+def next_offsets(record) -> Dict[TopicPartition, OffsetAndMetadata]:
+    """Offsets that mark ``record`` as consumed, for its partition only."""
+
+    tp = TopicPartition(record.topic, record.partition)
+    return {tp: OffsetAndMetadata(record.offset + 1, "", -1)}
+
+
+def commit_record(consumer: KafkaConsumer, record) -> None:
+    """Commit the offset just past ``record`` for its partition only."""
+
+    consumer.commit(next_offsets(record))
+
+
+class RecordCommitter:
+    """Marks records consumed, optionally inside producer transactions.
+
+    In transactional mode every record is handled in its own transaction:
+    :meth:`begin` opens it, and :meth:`commit` adds the consumer offset to it
+    and commits, so output events, retry copies and the offset become
+    visible atomically. :meth:`restart` aborts whatever was produced so far
+    and opens a fresh transaction, e.g. before routing a failed record.
+    Without transactions the offset is committed directly on the consumer.
+    """
+
+    def __init__(
+        self,
+        consumer: KafkaConsumer,
+        producer: KafkaProducer,
+        group_id: str,
+        transactional: bool = False,
+    ) -> None:
+        self.consumer = consumer
+        self.producer = producer
+        self.group_id = group_id
+        self.transactional = transactional
+        if transactional:
+            producer.init_transactions()
+
+    def begin(self) -> None:
+        if self.transactional:
+            self.producer.begin_transaction()
+
+    def commit(self, record) -> None:
+        if self.transactional:
+            self.producer.send_offsets_to_transaction(
+                next_offsets(record), self.group_id
+            )
+            self.producer.commit_transaction()
+        else:
+            commit_record(self.consumer, record)
+
+    def abort(self) -> None:
+        if self.transactional:
+            self.producer.abort_transaction()
+
+    def restart(self) -> None:
+        if self.transactional:
+            self.producer.abort_transaction()
+            self.producer.begin_transaction()
+
+
+class RetryLadder:
+    """Retry and dead-letter topics for one source topic."""
+
+    def __init__(
+        self,
+        topic: str,
+        delays_ms: Sequence[int],
+        dlq_topic: Optional[str] = None,
+    ) -> None:
+        self.topic = topic
+        self.delays_ms = tuple(delays_ms)
+        self.retry_topics = [
+            f"{topic}.retry.{rung}" for rung in range(1, len(self.delays_ms) + 1)
+        ]
+        self.dlq_topic = dlq_topic or f"{topic}.dlq"
+
+    @property
+    def source_topics(self) -> List[str]:
+        """Topics the consumer should subscribe to."""
+
+        return [self.topic, *self.retry_topics]
+
+    @property
+    def topics(self) -> List[str]:
+        """Topics written by the ladder."""
+
+        return [*self.retry_topics, self.dlq_topic]
+
+    @staticmethod
+    def attempt(record) -> int:
+        value = header_value(record.headers, HEADER_ATTEMPT)
+        return int(value) if value else 0
+
+    @staticmethod
+    def not_before(record) -> Optional[int]:
+        value = header_value(record.headers, HEADER_NOT_BEFORE)
+        return int(value) if value else None
+
+    def destination(self, attempt: int, permanent: bool = False) -> Tuple[str, int]:
+        """Return the topic and delay for a record that has failed ``attempt`` times."""
+
+        if permanent or attempt > len(self.delays_ms):
+            return self.dlq_topic, 0
+        return self.retry_topics[attempt - 1], self.delays_ms[attempt - 1]
+
+    def failure_headers(
+        self, record, error: BaseException, attempt: int, delay_ms: int
+    ) -> Headers:
+        original_topic = header_value(record.headers, HEADER_ORIGINAL_TOPIC)
+        if original_topic is None:
+            original = (record.topic, record.partition, record.offset)
+        else:
+            original = (
+                original_topic,
+                header_value(record.headers, HEADER_ORIGINAL_PARTITION),
+                header_value(record.headers, HEADER_ORIGINAL_OFFSET),
+            )
+        message = str(error).encode("utf-8")[:MAX_ERROR_BYTES]
+        headers = passthrough_headers(record.headers)
+        headers.extend(
+            [
+                (HEADER_ERROR, message),
+                (HEADER_ERROR_TYPE, type(error).__name__.encode()),
+                (HEADER_ATTEMPT, str(attempt).encode()),
+                (HEADER_ORIGINAL_TOPIC, str(original[0]).encode()),
+                (HEADER_ORIGINAL_PARTITION, str(original[1]).encode()),
+                (HEADER_ORIGINAL_OFFSET, str(original[2]).encode()),
+            ]
+        )
+        if delay_ms:
+            not_before = int(time.time() * 1000) + delay_ms
+            headers.append((HEADER_NOT_BEFORE, str(not_before).encode()))
+        return headers
+
+    def route(
+        self,
+        producer: KafkaProducer,
+        record,
+        error: BaseException,
+        permanent: bool = False,
+        timeout: float = 10.0,
+    ) -> str:
+        """Copy a failed record to its next retry topic or the DLQ.
+
+        Returns the destination topic. Raises if the copy could not be
+        flushed, in which case the caller must not commit the record.
+        """
+
+        attempt = self.attempt(record) + 1
+        topic, delay_ms = self.destination(attempt, permanent)
+        headers = self.failure_headers(record, error, attempt, delay_ms)
+        future = producer.send(
+            topic, key=record.key, value=record.value, headers=headers
+        )
+        future.get(timeout=timeout)
+        ROUTED_COUNTER.labels(topic=self.topic, destination=topic).inc()
+        logger.warning(
+            "record_routed",
+            source=record.topic,
+            offset=record.offset,
+            destination=topic,
+            attempt=attempt,
+            error=str(error)[:200],
+        )
+        return topic
+
+
+class DelayGate:
+    """Pauses retry partitions until their next record is due."""
+
+    def __init__(self) -> None:
+        self._paused: Dict[TopicPartition, float] = {}
+
+    def hold(
+        self, consumer: KafkaConsumer, record, not_before_ms: Optional[int]
+    ) -> bool:
+        """Pause the record's partition if it is not due yet.
+
+        The partition is rewound to the record so it is fetched again after
+        :meth:`release_due` resumes it. Returns whether the record was held;
+        callers must then skip the remaining records of that partition.
+        """
+
+        if not not_before_ms or not_before_ms <= time.time() * 1000:
+            return False
+        tp = TopicPartition(record.topic, record.partition)
+        consumer.seek(tp, record.offset)
+        consumer.pause(tp)
+        self._paused[tp] = not_before_ms / 1000
+        return True
+
+    def release_due(self, consumer: KafkaConsumer) -> None:
+        now = time.time()
+        due = [tp for tp, resume_at in self._paused.items() if resume_at <= now]
+        if not due:
+            return
+        assigned = consumer.assignment()
+        consumer.resume(*(tp for tp in due if tp in assigned))
+        for tp in due:
+            del self._paused[tp]
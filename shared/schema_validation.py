@@ -0,0 +1,195 @@
+"""Precompiled validators for the event schemas in ``data-schemas/``.
+
+Every ``*.schema.json`` file is loaded once per process and compiled into a
+generated validator function with ``fastjsonschema``; when that package is
+unavailable the registry falls back to a prebuilt ``jsonschema`` validator.
+Schemas are addressed by file name without the ``.schema.json`` suffix, e.g.
+``nlp.extracted``.
+
+Hot paths can use :class:`SampledValidator` to validate every event during
+warm-up and then only one in ``sample_rate`` events in steady state.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import structlog
+from prometheus_client import Counter
+
+try:
+    import fastjsonschema
+except ImportError:  # pragma: no cover - optional dependency
+    fastjsonschema = None
+
+logger = structlog.get_logger("schema-validation")
+
+SCHEMA_DIR_ENV = "DATA_SCHEMAS_DIR"
+SCHEMA_SUFFIX = ".schema.json"
+
+VALIDATIONS_COUNTER = Counter(
+    "schema_validations_total", "Schema validations performed", ["schema", "result"]
+)
+
+# Draft 7 treats ``format`` as an annotation unless a format checker is
+# configured, which is how the services have always validated. fastjsonschema
+# asserts formats by default, so its built-in ones are overridden to accept
+# any value.
+_ANNOTATION_FORMATS = (
+    "date",
+    "date-time",
+    "email",
+    "hostname",
+    "idn-email",
+    "idn-hostname",
+    "ipv4",
+    "ipv6",
+    "iri",
+    "iri-reference",
+    "json-pointer",
+    "regex",
+    "relative-json-pointer",
+    "time",
+    "uri",
+    "uri-reference",
+    "uri-template",
+)
+
+
+class SchemaValidationError(ValueError):
+    """Raised when a payload does not conform to its event schema."""
+
+    def __init__(self, schema: str, message: str) -> None:
+        super().__init__(f"{schema}: {message}")
+        self.schema = schema
+        self.message = message
+
+
+def default_schema_dir() -> Path:
+    """Return ``data-schemas/`` next to the shared modules (repo or image)."""
+
+    override = os.environ.get(SCHEMA_DIR_ENV)
+    if override:
+        return Path(override)
+    return Path(__file__).resolve().parent.parent / "data-schemas"
+
+
+if fastjsonschema is not None:
+    _ENGINE_ERRORS: tuple = (fastjsonschema.JsonSchemaValueException,)
+else:  # pragma: no cover - optional dependency
+    from jsonschema import ValidationError as _FallbackError
+
+    _ENGINE_ERRORS = (_FallbackError,)
+
+
+def _compile_fast(schema: dict) -> Callable[[Any], Any]:
+    formats = {name: (lambda value: True) for name in _ANNOTATION_FORMATS}
+    return fastjsonschema.compile(schema, formats=formats)
+
+
+def _compile_fallback(schema: dict) -> Callable[[Any], Any]:
+    from jsonschema import Draft7Validator
+
+    return Draft7Validator(schema).validate
+
+
+class SchemaRegistry:
+    """All event schemas under a directory, compiled once."""
+
+    def __init__(self, schema_dir: Optional[Path] = None) -> None:
+        self.schema_dir = Path(schema_dir) if schema_dir else default_schema_dir()
+        self.schemas: Dict[str, dict] = {}
+        self._validators: Dict[str, Callable[[Any], Any]] = {}
+        compile_schema = _compile_fast if fastjsonschema else _compile_fallback
+        for path in sorted(self.schema_dir.rglob(f"*{SCHEMA_SUFFIX}")):
+            name = path.name[: -len(SCHEMA_SUFFIX)]
+            schema = json.loads(path.read_text())
+            self.schemas[name] = schema
+            self._validators[name] = compile_schema(schema)
+        logger.info(
+            "schemas_compiled",
+            count=len(self._validators),
+            engine="fastjsonschema" if fastjsonschema else "jsonschema",
+        )
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._validators
+
+    def validate(self, name: str, payload: Any) -> None:
+        """Validate ``payload`` against schema ``name``."""
+
+        try:
+            validator = self._validators[name]
+        except KeyError:
+            raise KeyError(f"Unknown schema {name!r} in {self.schema_dir}") from None
+        try:
+            validator(payload)
+        except _ENGINE_ERRORS as exc:
+            VALIDATIONS_COUNTER.labels(schema=name, result="invalid").inc()
+            raise SchemaValidationError(name, exc.message) from exc
+        VALIDATIONS_COUNTER.labels(schema=name, result="valid").inc()
+
+
+class SampledValidator:
+    """Validate every event during warm-up, then one in ``sample_rate``.
+
+    ``sample_rate`` of 1 validates every event; 0 disables validation after
+    warm-up.
+    """
+
+    def __init__(
+        self,
+        registry: SchemaRegistry,
+        name: str,
+        sample_rate: int = 1,
+        warmup: int = 0,
+    ) -> None:
+        if name not in registry:
+            raise KeyError(f"Unknown schema {name!r} in {registry.schema_dir}")
+        self._registry = registry
+        self.name = name
+        self.sample_rate = sample_rate
+        self.warmup = warmup
+        self._seen = itertools.count()
+
+    def should_validate(self) -> bool:
+        seen = next(self._seen)
+        if seen < self.warmup:
+            return True
+        if self.sample_rate <= 0:
+            return False
+        return (seen - self.warmup) % self.sample_rate == 0
+
+    def __call__(self, payload: Any) -> bool:
+        """Validate ``payload`` if it is sampled; return whether it was checked."""
+
+        if not self.should_validate():
+            return False
+        self._registry.validate(self.name, payload)
+        return True
+
+
+_registry: Optional[SchemaRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> SchemaRegistry:
+    """Return the process-wide registry, compiling schemas on first use."""
+
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SchemaRegistry()
+    return _registry
+
+
+def sampled_validator(
+    name: str, sample_rate: int = 1, warmup: int = 0
+) -> SampledValidator:
+    return SampledValidator(get_registry(), name, sample_rate, warmup)
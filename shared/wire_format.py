@@ -0,0 +1,181 @@
+"""Encoding of inter-service Kafka events.
+
+Events are JSON by default. Producers can opt into ``msgpack-v1``, a
+MessagePack encoding in which entity lists (``entities`` and
+``removed_entities``) are written as positional rows following the
+``nlp.extracted`` schema instead of repeating key names in every entity.
+The encoding is announced in the :data:`WIRE_FORMAT_HEADER` record header;
+records without the header are JSON, so readers of either kind keep working
+and consumers accept both.
+
+Row layout, version 1::
+
+    [type, text, start, end, change, attrs]
+
+``type`` and ``change`` are indexes into :data:`ENTITY_TYPES` and
+:data:`CHANGE_MARKERS` (``-1`` when there is no change marker). ``attrs`` is
+``None`` when the entity has no attrs, otherwise ``[mask, *values]`` where
+bit ``i`` of ``mask`` marks that :data:`ATTR_KEYS` ``[i]`` is present, in
+which case its value follows in key order. Bit 7 marks a trailing dict with
+any attrs outside :data:`ATTR_KEYS`. The layout is fixed per version;
+schema changes that need a different layout get a new version.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from entity_table import CHANGE_MARKERS, ENTITY_TYPES
+from json_codec import dumps, loads
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+WIRE_FORMAT_HEADER = "regengine-wire-format"
+JSON = "json"
+MSGPACK_V1 = "msgpack-v1"
+WIRE_FORMATS = (JSON, MSGPACK_V1)
+
+ENTITY_LIST_FIELDS = ("entities", "removed_entities")
+ATTR_KEYS = ("value", "unit", "unit_normalized", "name", "concept", "page")
+
+_TYPE_CODES = {name: code for code, name in enumerate(ENTITY_TYPES)}
+_CHANGE_CODES = {name: code for code, name in enumerate(CHANGE_MARKERS)}
+_HAS_EXTRA = 0x80
+
+Headers = List[Tuple[str, bytes]]
+
+
+class WireFormatError(ValueError):
+    """Raised when an event cannot be encoded or decoded."""
+
+
+def resolve_format(name: Optional[str]) -> str:
+    """Normalize a configured format, falling back to JSON if unavailable."""
+
+    fmt = (name or JSON).strip().lower()
+    if fmt not in WIRE_FORMATS:
+        raise WireFormatError(f"Unknown event wire format {name!r}")
+    if fmt == MSGPACK_V1 and msgpack is None:
+        return JSON
+    return fmt
+
+
+def compression_type(name: Optional[str]) -> Optional[str]:
+    """Map a ``KAFKA_COMPRESSION_TYPE`` setting to a producer argument."""
+
+    value = (name or "").strip().lower()
+    return None if value in {"", "none"} else value
+
+
+def _pack_attrs(attrs: Optional[dict]) -> Optional[list]:
+    if attrs is None:
+        return None
+    row: list = [0]
+    mask = 0
+    for bit, key in enumerate(ATTR_KEYS):
+        if key in attrs:
+            mask |= 1 << bit
+            row.append(attrs[key])
+    if len(row) - 1 < len(attrs):
+        mask |= _HAS_EXTRA
+        row.append({k: v for k, v in attrs.items() if k not in ATTR_KEYS})
+    row[0] = mask
+    return row
+
+
+def _unpack_attrs(row: Optional[Sequence]) -> Optional[dict]:
+    if row is None:
+        return None
+    mask = row[0]
+    attrs: dict = {}
+    pos = 1
+    for bit, key in enumerate(ATTR_KEYS):
+        if mask & (1 << bit):
+            attrs[key] = row[pos]
+            pos += 1
+    if mask & _HAS_EXTRA:
+        attrs.update(row[pos])
+    return attrs
+
+
+def pack_entities(entities: Iterable[dict]) -> List[list]:
+    rows = []
+    for entity in entities:
+        change = entity.get("change")
+        rows.append(
+            [
+                _TYPE_CODES[entity["type"]],
+                entity["text"],
+                entity["start"],
+                entity["end"],
+                -1 if change is None else _CHANGE_CODES[change],
+                _pack_attrs(entity.get("attrs")),
+            ]
+        )
+    return rows
+
+
+def unpack_entities(rows: Iterable[Sequence]) -> List[dict]:
+    entities = []
+    for type_code, text, start, end, change, attrs_row in rows:
+        entity = {
+            "type": ENTITY_TYPES[type_code],
+            "text": text,
+            "start": start,
+            "end": end,
+        }
+        attrs = _unpack_attrs(attrs_row)
+        if attrs is not None:
+            entity["attrs"] = attrs
+        if change >= 0:
+            entity["change"] = CHANGE_MARKERS[change]
+        entities.append(entity)
+    return entities
+
+
+def encode_event(event: dict, fmt: str = JSON) -> Tuple[bytes, Headers]:
+    """Serialize ``event`` and return the record value and headers."""
+
+    if fmt == JSON:
+        return dumps(event), [(WIRE_FORMAT_HEADER, JSON.encode())]
+    if fmt != MSGPACK_V1:
+        raise WireFormatError(f"Unknown event wire format {fmt!r}")
+    if msgpack is None:  # pragma: no cover - optional dependency
+        raise WireFormatError("msgpack is not installed")
+    body = dict(event)
+    for field in ENTITY_LIST_FIELDS:
+        if body.get(field) is not None:
+            body[field] = pack_entities(body[field])
+    return msgpack.packb(body, use_bin_type=True), [
+        (WIRE_FORMAT_HEADER, MSGPACK_V1.encode())
+    ]
+
+
+def header_format(headers: Optional[Iterable[Tuple[str, bytes]]]) -> str:
+    for key, value in headers or ():
+        if key == WIRE_FORMAT_HEADER and value:
+            return value.decode("ascii", errors="replace")
+    return JSON
+
+
+def decode_event(value: bytes, headers: Optional[Iterable[Tuple[str, bytes]]]) -> Any:
+    """Deserialize a record value according to its wire format header."""
+
+    fmt = header_format(headers)
+    if fmt == JSON:
+        return loads(value)
+    if fmt != MSGPACK_V1:
+        raise WireFormatError(f"Unsupported event wire format {fmt!r}")
+    if msgpack is None:  # pragma: no cover - optional dependency
+        raise WireFormatError("Received msgpack event but msgpack is not installed")
+    try:
+        body = msgpack.unpackb(value, raw=False, strict_map_key=False)
+        for field in ENTITY_LIST_FIELDS:
+            if body.get(field) is not None:
+                body[field] = unpack_entities(body[field])
+    except (ValueError, TypeError, IndexError, KeyError, AttributeError) as exc:
+        raise WireFormatError(f"Malformed {MSGPACK_V1} event: {exc}") from exc
+    return body
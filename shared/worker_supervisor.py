@@ -0,0 +1,175 @@
+"""Supervised worker processes for Kafka consumers.
+
+The NLP and graph services historically ran their Kafka consumers as daemon
+threads inside the uvicorn process, which makes CPU-heavy extraction compete
+with `/health` and `/metrics` for the GIL. `WorkerSupervisor` runs each
+consumer in its own process instead and restarts it with exponential backoff
+when it crashes. Metrics reach the API process through the Prometheus
+multiprocess mode (``PROMETHEUS_MULTIPROC_DIR``). The directory must be
+emptied before the API process first imports ``prometheus_client``, so the
+container entrypoint clears it; files of a previous run would otherwise be
+aggregated into the new one.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import structlog
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    generate_latest,
+)
+
+logger = structlog.get_logger("worker-supervisor")
+
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+WORKER_ID_ENV = "CONSUMER_WORKER_ID"
+
+WORKER_RESTARTS = Counter(
+    "consumer_worker_restarts_total", "Consumer worker process restarts", ["worker"]
+)
+
+
+@dataclass(frozen=True)
+class WorkerSpec:
+    """A consumer entrypoint to run in a dedicated process.
+
+    ``target`` and ``stop`` must be importable module-level callables so they
+    can be pickled into a spawned child process.
+    """
+
+    name: str
+    target: Callable[..., None]
+    stop: Callable[[], None]
+    args: tuple = field(default_factory=tuple)
+
+
+def _worker_main(spec: WorkerSpec) -> None:  # pragma: no cover - child process
+    os.environ[WORKER_ID_ENV] = spec.name
+
+    def _handle_term(signum, frame):
+        spec.stop()
+
+    signal.signal(signal.SIGTERM, _handle_term)
+    signal.signal(signal.SIGINT, _handle_term)
+    spec.target(*spec.args)
+
+
+class WorkerSupervisor:
+    """Start, monitor and restart consumer worker processes."""
+
+    def __init__(
+        self,
+        specs: list[WorkerSpec],
+        *,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 60.0,
+        healthy_after: float = 30.0,
+        stop_timeout: float = 15.0,
+    ) -> None:
+        self._specs = {spec.name: spec for spec in specs}
+        self._backoff_initial = backoff_initial
+        self._backoff_max = backoff_max
+        self._healthy_after = healthy_after
+        self._stop_timeout = stop_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._procs: dict[str, multiprocessing.process.BaseProcess] = {}
+        self._started_at: dict[str, float] = {}
+        self._backoff: dict[str, float] = {}
+        self._restart_at: dict[str, float] = {}
+        self._shutdown = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        for name in self._specs:
+            self._spawn(name)
+        self._monitor = threading.Thread(
+            target=self._watch, name="worker-supervisor", daemon=True
+        )
+        self._monitor.start()
+
+    def stop(self) -> None:
+        self._shutdown.set()
+        for proc in self._procs.values():
+            if proc.is_alive():
+                proc.terminate()
+        deadline = time.monotonic() + self._stop_timeout
+        for name, proc in self._procs.items():
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():  # pragma: no cover - stuck worker
+                logger.warning("worker_kill", worker=name, pid=proc.pid)
+                proc.kill()
+                proc.join()
+            _mark_dead(proc.pid)
+        if self._monitor is not None:
+            self._monitor.join(timeout=2.0)
+
+    def alive(self) -> dict[str, bool]:
+        return {name: proc.is_alive() for name, proc in self._procs.items()}
+
+    def _spawn(self, name: str) -> None:
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self._specs[name],),
+            name=f"consumer-{name}",
+            daemon=False,
+        )
+        proc.start()
+        self._procs[name] = proc
+        self._started_at[name] = time.monotonic()
+        logger.info("worker_started", worker=name, pid=proc.pid)
+
+    def _watch(self) -> None:
+        while not self._shutdown.wait(1.0):
+            now = time.monotonic()
+            for name, proc in list(self._procs.items()):
+                if proc.is_alive():
+                    if now - self._started_at[name] >= self._healthy_after:
+                        self._backoff.pop(name, None)
+                    continue
+                if name not in self._restart_at:
+                    delay = self._backoff.get(name, self._backoff_initial)
+                    self._backoff[name] = min(delay * 2, self._backoff_max)
+                    self._restart_at[name] = now + delay
+                    _mark_dead(proc.pid)
+                    logger.error(
+                        "worker_exited",
+                        worker=name,
+                        pid=proc.pid,
+                        exitcode=proc.exitcode,
+                        restart_in=delay,
+                    )
+                elif now >= self._restart_at[name] and not self._shutdown.is_set():
+                    del self._restart_at[name]
+                    WORKER_RESTARTS.labels(worker=name).inc()
+                    self._spawn(name)
+
+
+def _mark_dead(pid: Optional[int]) -> None:
+    if pid is None or not os.environ.get(MULTIPROC_ENV):
+        return
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Return Prometheus exposition data aggregated across worker processes."""
+
+    if os.environ.get(MULTIPROC_ENV):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST